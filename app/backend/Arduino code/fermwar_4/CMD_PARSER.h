@@ -23,6 +23,7 @@ enum commands {
   R_MOSHION,     // A motion interpolation point
   R_EXECUTE,     // exacute the stored moshion 
   R_GET_WIGHT,    // Starting unloading the part into the basket
+  R_PROTO,       // select the text or binary moshion point protocol
   R_HAND,        // uP is ready to transmit
   L_HAND,        // uC is ready to receive
   RECELABLE_NUM_COMMANDS   // The number of commands
@@ -34,6 +35,7 @@ const COMMAND RECIEVABLE_COMMAND[] = {
   { R_MOSHION, "R_MOSHION", storeMoshioin},
   { R_EXECUTE, "R_EXECUTE", executPlanedMove},
   { R_GET_WIGHT, "R_GET_WIGHT", getWight},
+  { R_PROTO, "R_PROTO", setProtocol},
   { L_HAND, "L_HAND", ReaduC}
 };
 
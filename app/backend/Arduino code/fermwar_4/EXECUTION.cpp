@@ -6,6 +6,9 @@ static MOSHION RobotMoshionPlan = { NULL, 0 };  // Structure to hold motion plan
 
 int MOSHIOSTATE = SETTINGUP;
 
+// Text points until the uP negotiates a binary protocol with R_PROTO
+int PointProtocol = TEXT_POINTS;
+
 // Declare and initialize the current point index
 volatile int CurrentPoint = 0;
 
@@ -60,83 +63,239 @@ bool allocateMoveData(char* strCommandLine) {
 }
 
 //---------------------------------------------------------------------------------------------------------------------
-// DESCRIPTION: Stores motion data received over serial communication.
-//              Expects a series of newline-terminated strings containing STEP_CNT and STEP_FR values.
-// ARGUMENTS:   strCommandLine - Not used in this function.
-// RETURN VALUE: True if the motion data is successfully stored, False otherwise.
-bool storeMoshioin(char* strCommandLine) {
-  POINT_INTERP pointMoshion;        // Structure to hold motion point data
+// DESCRIPTION: Select the protocol used for the moshion points that follow R_MOSHION.
+//              "BIN2" selects acknowledged binary frames, "BIN1" plain binary frames and
+//              "TEXT" the newline-terminated text points.
+// ARGUMENTS:   strCommandLine - Command line containing the protocol name
+// RETURN VALUE: True if the protocol is known, False otherwise
+bool setProtocol(char* strCommandLine) {
+  char* token = strtok(strCommandLine, seps);  // Get the protocol name
+
+  if (token == NULL) {
+    print_error(MISSING_DATA, "setProtocol", 0);
+    ErrorState = STATE;
+    STATE = ERROR;  // Transition to the ERROR state
+    return false;
+  }
+
+  if (strcmp(token, "BIN2") == 0) {
+    PointProtocol = BIN2_POINTS;
+  } else if (strcmp(token, "BIN1") == 0) {
+    PointProtocol = BIN1_POINTS;
+  } else if (strcmp(token, "TEXT") == 0) {
+    PointProtocol = TEXT_POINTS;
+  } else {
+    print_error(INVALID_COMMAND_ARGUMENTS, "setProtocol");
+    ErrorState = STATE;
+    STATE = ERROR;  // Transition to the ERROR state
+    return false;
+  }
+  Serial.printf("proto %s\n", token);  // tell the uP which protocol is in use
+  return true;
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Read one newline-terminated text moshion point "f1, f2, f3, f4, f5, f6, time".
+// ARGUMENTS:   pointMoshion - Point to fill in
+// RETURN VALUE: True if the point was read, False otherwise
+static bool readPointLine(POINT_INTERP* pointMoshion) {
   int paramaterNnumber = 7;         // Number of parameters expected
   char* token = NULL;               // Current token to analyze for STEP_CNT
   char inputBuffer[maxBufferSize];  // Array to hold input received over serial
   int bufferIndex = 0;              // Initialize buffer index
-  volatile int pointCNT = 0;        // Counter for motion points
 
-  // Check if data dump is in progress or if a motion plan is already allocated
-  if (isState(MOSHIOSTATE, SETUP)) {
+  //  flush Serial input
+  while (Serial.available()) Serial.read();
+  memset(inputBuffer, '\0', sizeof(inputBuffer));  // Clear the input buffer
 
-    Serial.printf("storing %d\n", RobotMoshionPlan.MOVECNT);
+  // Wait until data is available on the serial line
+  while (!Serial.available()) {
+    // Do nothing
+  }
 
-    // Loop through each motion point
-    for (; pointCNT < RobotMoshionPlan.MOVECNT; pointCNT++) {
-      //  flush Serial input
-      while (Serial.available()) Serial.read();
-      memset(inputBuffer, '\0', sizeof(inputBuffer));  // Clear the input buffer
+  memset(inputBuffer, '\0', sizeof(inputBuffer));  // Clear the input buffer
+  bufferIndex = 0;
+
+  // Loop to read data until a newline character is encountered
+  while (true) {
+    // Read the next character
+    char inChar = readSerialByte();
 
-      // Wait until data is available on the serial line
-      while (!Serial.available()) {
-        // Do nothing
+    // Check for newline character
+    if (inChar == '\n') {
+      inputBuffer[bufferIndex] = '\0';  // Terminate the input string
+      break;                            // Exit the loop if newline character is encountered
+    } else {
+      // Add the character to the input buffer if it's not a newline
+      if (bufferIndex < maxBufferSize - 2) {
+        inputBuffer[bufferIndex++] = inChar;
+      } else {
+        // Print an error if the buffer is full
+        print_error(INPUT_BUFFER_FULL, "storeMoshioin");
+        return false;
       }
+    }
+  }
 
-      memset(inputBuffer, '\0', sizeof(inputBuffer));  // Clear the input buffer
-      bufferIndex = 0;
+  // Iterate through and extract all the parameters
+  for (int paramater = 0; paramater < paramaterNnumber; paramater++) {
+    // Get the current token or continue from the last position
+    token = strtok((paramater == 0) ? inputBuffer : NULL, seps);
 
-      // Loop to read data until a newline character is encountered
-      while (true) {
-        // Wait until data is available on the serial line
-        while (!Serial.available()) {
-          // Do nothing
-        }
+    // Check if any data is missing
+    if (token == NULL) {
+      print_error(MISSING_DATA, "storeMoshioin", paramater);
+      return false;
+    }
+    if (paramater == paramaterNnumber - 1) pointMoshion->TIME = (int)atoi(token);
+    else pointMoshion->Frequency[paramater] = (int)atoi(token);
+  }
+  return true;
+}
 
-        // Read the next character
-        char inChar = Serial.read();
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Read one binary moshion point frame, see FRAME_SYNC for the layout.
+//              Bytes before the sync word are skipped so a partial frame cannot shift the stream.
+// ARGUMENTS:   pointMoshion - Point to fill in
+//              sequence - Filled with the sequence number of a BIN2 frame, NULL for BIN1 frames
+// RETURN VALUE: True if the frame passed its length and CRC check, False otherwise
+static bool readPointFrame(POINT_INTERP* pointMoshion, uint32_t* sequence) {
+  uint8_t frame[sizeof(uint16_t) + SEQUENCED_FRAME_PAYLOAD];  // Length and payload, the bytes the CRC covers
+  uint16_t payload = sequence == NULL ? POINT_FRAME_PAYLOAD : SEQUENCED_FRAME_PAYLOAD;  // Expected payload length
+  uint8_t previous = 0;                                        // Byte read before the current one
+  uint8_t current = readSerialByte();                          // Byte being checked for the sync word
+
+  // Hunt for the sync word
+  while (!(previous == FRAME_SYNC[0] && current == FRAME_SYNC[1])) {
+    previous = current;
+    current = readSerialByte();
+  }
 
-        // Check for newline character
-        if (inChar == '\n') {
-          inputBuffer[bufferIndex] = '\0';  // Terminate the input string
-          break;                            // Exit the loop if newline character is encountered
-        } else {
-          // Add the character to the input buffer if it's not a newline
-          if (bufferIndex < maxBufferSize - 2) {
-            inputBuffer[bufferIndex++] = inChar;
-          } else {
-            // Print an error if the buffer is full
-            print_error(INPUT_BUFFER_FULL, "storeMoshioin");
-            ErrorState = STATE;
-            STATE = ERROR;  // Transition to the ERROR state
-            return false;
-          }
-        }
-      }
+  frame[0] = readSerialByte();
+  frame[1] = readSerialByte();
+  uint16_t length = frame[0] | (frame[1] << 8);  // Payload length, little-endian
 
-      // Iterate through and extract all the parameters
-      for (int paramater = 0; paramater < paramaterNnumber; paramater++) {
-        // Get the current token or continue from the last position
-        token = strtok((paramater == 0) ? inputBuffer : NULL, seps);
-
-        // Check if any data is missing
-        if (token == NULL) {
-          print_error(MISSING_DATA, "storeMoshioin", paramater);
-          ErrorState = STATE;
-          STATE = ERROR;  // Transition to the ERROR state
-          return false;
-        }
-        if (paramater == paramaterNnumber - 1) pointMoshion.TIME = (int)atoi(token);
-        else pointMoshion.Frequency[paramater] = (int)atoi(token);
+  if (length != payload) return false;
+
+  for (uint16_t i = 0; i < length; i++) {
+    frame[sizeof(uint16_t) + i] = readSerialByte();
+  }
+
+  uint16_t crc = readSerialByte();
+  crc |= readSerialByte() << 8;
+
+  if (crc16_ccitt(frame, sizeof(uint16_t) + length) != crc) return false;
+
+  // The Teensy is little-endian so the payload copies straight into the point
+  uint8_t* point = &frame[sizeof(uint16_t)];
+  if (sequence != NULL) {
+    memcpy(sequence, point, sizeof(uint32_t));
+    point += sizeof(uint32_t);
+  }
+  memcpy(pointMoshion->Frequency, point, 6 * sizeof(int32_t));
+  memcpy(&pointMoshion->TIME, point + 6 * sizeof(int32_t), sizeof(int32_t));
+  return true;
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Drop bytes from the serial line until it has been quiet for DRAIN_QUIET_MS.
+//              Frames the uP resent after an ACK timeout can still be on the way when the last
+//              point is stored, and would otherwise be read as commands. The uP sends nothing
+//              else until the MoshionState change that follows the upload.
+// ARGUMENTS:   None
+// RETURN VALUE: None
+static void drainResentFrames() {
+  unsigned long quietSince = millis();  // Time the last byte was dropped
+
+  while (millis() - quietSince < DRAIN_QUIET_MS) {
+    if (Serial.available()) {
+      Serial.read();
+      quietSince = millis();
+    }
+  }
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Store the points of a BIN2 upload. Points are stored in sequence order and every
+//              frame is answered so the uP can keep a window of frames in flight. Duplicates of
+//              stored points are acknowledged again and a gap or bad frame is NAKed once, the uP
+//              then resends from the NAKed point. Resent frames still arriving after the last
+//              point are dropped.
+// ARGUMENTS:   None
+// RETURN VALUE: True if every point was stored, False after MAX_BAD_FRAMES bad frames in a row
+static bool storeSequencedPoints() {
+  POINT_INTERP pointMoshion;  // Structure to hold motion point data
+  uint32_t sequence = 0;      // Sequence number of the frame just read
+  int pointCNT = 0;           // Next point to store
+  int nakedPoint = -1;        // Point the last NAK asked for, so a gap is only NAKed once
+  int badFrames = 0;          // Bad frames in a row
+
+  while (pointCNT < RobotMoshionPlan.MOVECNT) {
+    if (!readPointFrame(&pointMoshion, &sequence)) {
+      if (++badFrames >= MAX_BAD_FRAMES) {
+        print_error(BAD_POINT_FRAME, "storeMoshioin", pointCNT);
+        return false;
       }
+      sequence = RobotMoshionPlan.MOVECNT;  // Treat it as a gap
+    }
+
+    if (sequence == (uint32_t)pointCNT) {
       // Store pointMoshion struct in RobotMoshionPlan.Points array
       pointMoshion.INDEX = pointCNT;
       RobotMoshionPlan.Points[pointCNT] = pointMoshion;
+      Serial.printf("ack %d\n", pointCNT);
+      pointCNT++;
+      badFrames = 0;
+    } else if (sequence < (uint32_t)pointCNT) {
+      Serial.printf("ack %d\n", pointCNT - 1);  // a resent point that is already stored
+    } else if (nakedPoint != pointCNT) {
+      Serial.printf("nak %d\n", pointCNT);
+      nakedPoint = pointCNT;
+    }
+  }
+  drainResentFrames();
+  return true;
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Stores motion data received over serial communication.
+//              Expects MOVECNT points, either newline-terminated strings of frequencies and time
+//              or binary point frames in the protocol selected with R_PROTO.
+// ARGUMENTS:   strCommandLine - Not used in this function.
+// RETURN VALUE: True if the motion data is successfully stored, False otherwise.
+bool storeMoshioin(char* strCommandLine) {
+  POINT_INTERP pointMoshion;        // Structure to hold motion point data
+  volatile int pointCNT = 0;        // Counter for motion points
+  bool received = false;            // Whether the current point was read
+
+  // Check if data dump is in progress or if a motion plan is already allocated
+  if (isState(MOSHIOSTATE, SETUP)) {
+
+    Serial.printf("storing %d\n", RobotMoshionPlan.MOVECNT);
+
+    if (PointProtocol == BIN2_POINTS) {
+      received = storeSequencedPoints();
+    } else {
+      // Loop through each motion point
+      for (received = true; received && pointCNT < RobotMoshionPlan.MOVECNT; pointCNT++) {
+        if (PointProtocol == BIN1_POINTS) {
+          received = readPointFrame(&pointMoshion, NULL);
+          if (!received) print_error(BAD_POINT_FRAME, "storeMoshioin", pointCNT);
+        } else {
+          received = readPointLine(&pointMoshion);
+        }
+        // Store pointMoshion struct in RobotMoshionPlan.Points array
+        pointMoshion.INDEX = pointCNT;
+        if (received) RobotMoshionPlan.Points[pointCNT] = pointMoshion;
+      }
+    }
+
+    if (!received) {
+      //  flush the rest of the upload so it is not read as commands
+      while (Serial.available()) Serial.read();
+      ErrorState = STATE;
+      STATE = ERROR;  // Transition to the ERROR state
+      return false;
     }
     // Serial.print("data Reacap\n");
     // int CurrentFrequency = 0;
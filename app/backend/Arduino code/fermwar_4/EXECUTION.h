@@ -5,7 +5,21 @@
 // Constants
 const int dutyCycle = 127;  // 50% duty cycle
 
+// Binary moshion point frame: FRAME_SYNC, uint16 payload length, payload, uint16 CRC-16/CCITT.
+// The payload is Frequency[6] and TIME as little-endian int32 and the CRC covers the length and payload.
+// BIN2 frames put a uint32 sequence number in front of the point and every frame is answered with
+// "ack <n>" (points up to n are stored) or "nak <n>" (resend from point n).
+const uint8_t FRAME_SYNC[] = { 0xA5, 0x5A };
+const uint16_t POINT_FRAME_PAYLOAD = 7 * sizeof(int32_t);
+const uint16_t SEQUENCED_FRAME_PAYLOAD = sizeof(uint32_t) + POINT_FRAME_PAYLOAD;
+const int MAX_BAD_FRAMES = 32;  // Bad frames in a row before a BIN2 upload is abandoned
+const unsigned long DRAIN_QUIET_MS = 50;  // Quiet time after the last BIN2 point that ends the upload
+
+// Protocols the moshion points can be sent in, selected with R_PROTO
+enum PointProtocols { TEXT_POINTS, BIN1_POINTS, BIN2_POINTS };
+
 // External variables
+extern int PointProtocol;          // Protocol of the moshion points that follow R_MOSHION
 extern volatile int CurrentPoint;  // Current motion point index
 extern IntervalTimer PointTimer;   // Declare the timer object globally
 
@@ -36,6 +50,9 @@ bool setMoveDelay(char* strCommandLine);
 // store the data dump of the moshion
 bool storeMoshioin(char* strCommandLine);
 
+// Select the text or binary moshion point protocol
+bool setProtocol(char* strCommandLine);
+
 // Execute a planned move
 bool executPlanedMove(char* strCommandLine);
 
@@ -78,4 +78,32 @@ void readSerialData(char* inputBuffer) {
       }
     }
   }
-}
\ No newline at end of file
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Block until a byte is available on the serial line and read it
+// ARGUMENTS:   None
+// RETURN VALUE: The byte read
+uint8_t readSerialByte() {
+  // Wait until data is available on the serial line
+  while (!Serial.available()) {
+    // Do nothing
+  }
+  return (uint8_t)Serial.read();
+}
+
+//---------------------------------------------------------------------------------------------------------------------
+// DESCRIPTION: Compute the CRC-16/CCITT (polynomial 0x1021) of a buffer
+// ARGUMENTS:   data - Bytes to checksum
+//              length - Number of bytes in data
+//              crc - Initial CRC value, 0xFFFF for a new checksum
+// RETURN VALUE: The CRC of the buffer
+uint16_t crc16_ccitt(const uint8_t* data, size_t length, uint16_t crc) {
+  for (size_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
@@ -33,6 +33,7 @@ const char SepperDirPins[] =    { 26, 7, 8, 9, 24, 25};
 #define MISSING_DATA -7               // Missing data for a command argument
 #define BAD_TIMMER_SETUP -8           // the timmer for trasishiong moshion did not get setup right
 #define TIMER_INIT_FAILURE -9        // when the moshion timer fasils to intit
+#define BAD_POINT_FRAME -10           // a binary moshion point frame failed its length or CRC check
 
 
 // Structure to hold error information
@@ -61,12 +62,16 @@ const ERROR_COMMAND SYSTEM_ERROR[] = {
   { MEMORY_ALLOCATION_FAILD, "Error in %s, Memory allocation failed\n" },
   { MISSING_DATA, "Error in %s, The %d command argument was not provided\n" },
   { BAD_TIMMER_SETUP,  "Error in %s, Motion Timme did not setup all hardware timers are being used"},
+  { TIMER_INIT_FAILURE, "Error in %s, The motion timer failed to initialize\n" },
+  { BAD_POINT_FRAME, "Error in %s, Point frame %d failed its length or CRC check\n" },
 };
 
 //----------------------------- Function Prototypes -------------------------------------------------------------------
 void print_error(int error_index, ...);  // Print error message
 int dsprintf(const char* fmt, ...);      // Print formatted string
 void readSerialData(char*);              // Read serial data
+uint8_t readSerialByte();                // Block until one serial byte is read
+uint16_t crc16_ccitt(const uint8_t* data, size_t length, uint16_t crc = 0xFFFF);  // CRC-16/CCITT of a buffer
 
 float mapf(float, float, float, float, float);  // Map a float value from one range to another
 
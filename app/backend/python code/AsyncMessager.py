@@ -0,0 +1,393 @@
+import asyncio
+import concurrent.futures
+import functools
+import queue
+import threading
+import serial
+from Messager import *
+
+class AsyncMesageer(Mesageer):
+    """asyncio transport for the robot, with the same protocol and message bus as Mesageer.
+
+    pyserial has no asyncio support, so blocking port calls run on the loop's default executor.
+    That keeps it portable to Windows COM ports, where the event loop cannot watch a serial handle.
+    Lines are dispatched on the event loop thread. Under TkAsyncBridge that is not the Tk thread,
+    so subscribers hand widget updates to TkAsyncBridge.call_in_tk.
+    """
+
+    READ_TIMEOUT = 0.05
+
+    def __init__(self, serial_port: str):
+        """Initialize the AsyncMesageer instance.
+
+        Args:
+            serial_port (str): Serial port name.
+        """
+        super().__init__(serial_port)
+        self.reader_task = None
+        self._upload_replies = asyncio.Queue()
+        self.message_stack.unsubscribe(self._upload_subscription)
+        self._upload_subscription = self.message_stack.subscribe(("ack ", "nak "), self._upload_replies.put_nowait)
+
+    async def _run_blocking(self, function, *args, **kwargs):
+        """Run a blocking port call on the default executor.
+
+        Args:
+            function (callable): The blocking call.
+            *args: Its positional arguments.
+            **kwargs: Its keyword arguments.
+
+        Returns:
+            Any: What the call returned.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+    async def connect(self, baud_rate: int = None, timeout: int = None, binary: bool = True):
+        """Open the port, perform the leftHand/rightHand handshake and negotiate the point protocol.
+
+        Args:
+            baud_rate (int, optional): Baud rate for serial communication. Defaults to None.
+            timeout (int, optional): Timeout for the connection attempt. Defaults to None.
+            binary (bool, optional): Try to negotiate binary moshion points. Defaults to True.
+
+        Raises:
+            RobotConnectionTimeout: If the robot does not confirm the connection in time.
+        """
+        if baud_rate is None:
+            baud_rate = self.baud_rate
+        if timeout is None:
+            timeout = self.timeout
+
+        try:
+            if isinstance(self.port, str):
+                self.serial = await self._run_blocking(serial.Serial, self.port, baud_rate, timeout=self.READ_TIMEOUT)
+                await asyncio.sleep(1)
+            else:
+                self.serial = self.port
+
+            self.message_stack.clear()
+            self._stop_reading.clear()
+            self.reader_task = asyncio.create_task(self._read_lines())
+
+            # Repeat leftHand once a second until the robot answers
+            confirmed = asyncio.wrap_future(self.expect("rightHand"))
+            deadline = asyncio.get_running_loop().time() + timeout
+            while not confirmed.done():
+                if asyncio.get_running_loop().time() > deadline:
+                    confirmed.cancel()
+                    raise RobotConnectionTimeout("Timeout reached. No connection confirmation received.")
+                await self._run_blocking(self.serial.write, b"leftHand\n")
+                await asyncio.wait({confirmed}, timeout=1)
+
+            print("Teensy has confirmed the connection.")
+            self.is_connected = True
+
+            if binary:
+                await self.negotiate_protocol()
+
+        except Exception as e:
+            print(f"Error connecting to the robot: {e}")
+            self.message_stack.clear()
+            raise
+
+    async def _read_lines(self):
+        """Read the port on the executor and dispatch completed lines on the event loop thread."""
+        try:
+            while not self._stop_reading.is_set():
+                data = await self._run_blocking(self._read_available)
+                if data:
+                    self._put_lines(data)
+        except Exception as e:
+            print(f"An error occurred while reading data: {e}")
+
+    def _read_available(self) -> bytes:
+        """Read everything waiting, or block for up to READ_TIMEOUT for one byte.
+
+        Returns:
+            bytes: The bytes read.
+        """
+        return self.serial.read(self.serial.in_waiting or 1)
+
+    async def send_message(self, message: str):
+        """Send a text message to the robot.
+
+        Args:
+            message (str): Message to send.
+        """
+        try:
+            if self.serial and self.serial.is_open:
+                if message is not None:
+                    if not message.endswith("\n"):
+                        message += "\n"
+                    await self._run_blocking(self.serial.write, message.encode('utf-8'))
+                else:
+                    print("Message not found and is empty")
+            else:
+                print("Serial port is not open")
+        except Exception as e:
+            print(f"An error occurred while sending message: {e}")
+
+    async def wait_for(self, expected: str = None, prefix=None, timeout: float = None) -> str:
+        """Wait, without blocking the event loop, for a line equal to expected or starting with prefix.
+
+        Args:
+            expected (str, optional): Exact line to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, to wait for. Defaults to None.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If no matching line arrived in time.
+
+        Returns:
+            str: The matching line.
+        """
+        return await wait_for_reply_async(self.expect(expected, prefix), timeout)
+
+    async def request(self, message: str, expected: str = None, prefix=None, timeout: float = None) -> str:
+        """Send a message and wait for its reply without blocking the event loop.
+
+        Args:
+            message (str): Message to send.
+            expected (str, optional): Exact reply to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, of the reply. Defaults to None.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If the reply did not arrive in time.
+
+        Returns:
+            str: The reply.
+        """
+        reply = self.expect(expected, prefix)
+        await self.send_message(message)
+        return await wait_for_reply_async(reply, timeout)
+
+    async def negotiate_protocol(self, timeout: float = None) -> str:
+        """Ask the firmware for the best binary moshion point protocol it supports, see Mesageer.negotiate_protocol.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each reply. Defaults to PROTOCOL_TIMEOUT.
+
+        Returns:
+            str: The protocol in use, "BIN2", "BIN1" or "TEXT".
+        """
+        if timeout is None:
+            timeout = self.PROTOCOL_TIMEOUT
+
+        self.protocol = "TEXT"
+        for protocol in self.PROTOCOLS:
+            try:
+                response = await self.request(f"R_PROTO {protocol}", prefix=("proto", "Error"), timeout=timeout)
+            except RobotConnectionTimeout:
+                continue
+
+            if response == f"proto {protocol}":
+                self.protocol = protocol
+                break
+
+        print(f"Using the {self.protocol} moshion point protocol")
+        return self.protocol
+
+    async def send_moshion(self, points: list):
+        """Send the points of an R_MOSHION upload in the negotiated protocol.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+
+        Returns:
+            dict: Throughput of a BIN2 upload as returned by upload_moshion, otherwise None.
+        """
+        if self.protocol == "BIN2":
+            return await self.upload_moshion(points)
+
+        if not self.binary_protocol:
+            for point in points:
+                await self.send_message(point)
+            return None
+
+        try:
+            if self.serial and self.serial.is_open:
+                await self._run_blocking(self.serial.write, b"".join(pack_point_frame(point) for point in points))
+            else:
+                print("Serial port is not open")
+        except Exception as e:
+            print(f"An error occurred while sending moshion: {e}")
+        return None
+
+    async def upload_moshion(self, points: list, window: int = None) -> dict:
+        """Stream the points of an R_MOSHION upload as BIN2 frames, see Mesageer.upload_moshion.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+            window (int, optional): Frames in flight. Defaults to WINDOW_SIZE.
+
+        Raises:
+            RobotConnectionTimeout: If MAX_RETRIES timeouts pass without an acknowledgement.
+
+        Returns:
+            dict: Points, bytes sent, seconds, points/s, bytes/s and frames retransmitted,
+                or None if the firmware abandoned the upload.
+        """
+        upload = UploadWindow(points, window or self.WINDOW_SIZE, self.MAX_RETRIES)
+
+        # Drop late replies to the previous upload
+        while not self._upload_replies.empty():
+            self._upload_replies.get_nowait()
+
+        errors = self.message_stack.subscribe("Error", self._upload_replies.put_nowait)
+        try:
+            while not upload.done:
+                data = upload.pending()
+                if data:
+                    await self._run_blocking(self.serial.write, data)
+
+                try:
+                    response = await asyncio.wait_for(self._upload_replies.get(), self.ACK_TIMEOUT)
+                except asyncio.TimeoutError:
+                    upload.on_timeout()
+                    continue
+
+                if not upload.on_reply(response):
+                    print(f"Moshion upload abandoned by the robot: {response}")
+                    return None
+        finally:
+            self.message_stack.unsubscribe(errors)
+
+        self.upload_stats = upload.stats()
+        print(upload)
+        return self.upload_stats
+
+    async def run_moshion(self, points: list, timeout: float = None) -> dict:
+        """Allocate, upload and execute a moshion, returning once the robot has finished it.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+            timeout (float, optional): Seconds to wait for each reply, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If a reply did not arrive in time.
+
+        Returns:
+            dict: Throughput of a BIN2 upload as returned by upload_moshion, otherwise None.
+        """
+        await self.request(f"R_MOVES {len(points)}", "MoshionState changed to: 1", timeout=timeout)
+        await self.request(f"R_MOSHION {len(points)}", f"storing {len(points)}", timeout=timeout)
+
+        stored = self.expect("MoshionState changed to: 2")
+        stats = await self.send_moshion(points)
+        await wait_for_reply_async(stored, timeout)
+
+        await self.request(f"R_EXECUTE {len(points)}", "MoshionState changed to: 0", timeout=timeout)
+        return stats
+
+    async def close_connection(self):
+        """Stop the reader task and close the serial connection."""
+        self._stop_reading.set()
+        if self.reader_task is not None:
+            await self.reader_task
+            self.reader_task = None
+        if self.serial and self.serial.is_open:
+            await self._run_blocking(self.serial.close)
+        self.is_connected = False
+
+    def __repr__(self):
+        return f"AsyncMesageer('{self.port}')"
+
+async def wait_for_reply_async(future, timeout: float = None) -> str:
+    """Await a Future returned by MessageBus.expect without blocking the event loop.
+
+    Args:
+        future (Future): The expectation.
+        timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+    Raises:
+        RobotConnectionTimeout: If the line did not arrive in time.
+
+    Returns:
+        str: The matching line.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise RobotConnectionTimeout(f"No reply from the robot within {timeout} s")
+
+class TkAsyncBridge:
+    """Run an asyncio event loop on its own thread beside a Tk mainloop, so the GUI keeps rendering while the robot is busy.
+
+    The loop runs freely with run_forever, so executor hops and future callbacks cost no Tk tick.
+    Coroutines are started from the Tk thread with submit. Their done callbacks, and anything passed
+    to call_in_tk, are queued and run by Tk every interval_ms, where they may update widgets.
+    """
+
+    INTERVAL_MS = 10
+
+    def __init__(self, root, interval_ms: int = None):
+        """Initialize the TkAsyncBridge instance, start the loop thread and start polling for Tk calls.
+
+        Args:
+            root (tk.Misc): Any Tk widget, normally the application window.
+            interval_ms (int, optional): Milliseconds between polls for Tk calls. Defaults to INTERVAL_MS.
+        """
+        self.root = root
+        self.interval_ms = interval_ms or self.INTERVAL_MS
+        self.loop = asyncio.new_event_loop()
+        self._tk_calls = queue.Queue()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._after_id = None
+        self._poll()
+
+    def _poll(self):
+        """Run the calls queued for the Tk thread and schedule the next poll."""
+        try:
+            while True:
+                try:
+                    function, args = self._tk_calls.get_nowait()
+                except queue.Empty:
+                    break
+                function(*args)
+        finally:
+            self._after_id = self.root.after(self.interval_ms, self._poll)
+
+    def call_in_tk(self, function, *args):
+        """Run a function on the Tk thread at its next poll, e.g. a widget update from a bus subscriber.
+
+        Args:
+            function (callable): The function to run.
+            *args: Its positional arguments.
+        """
+        self._tk_calls.put((function, args))
+
+    def submit(self, coroutine, callback=None) -> concurrent.futures.Future:
+        """Start a coroutine on the bridged loop.
+
+        Args:
+            coroutine (Coroutine): The coroutine to run, e.g. AsyncMesageer.run_moshion(points).
+            callback (callable, optional): Called on the Tk thread with the finished Future. Defaults to None.
+
+        Returns:
+            concurrent.futures.Future: The result of the coroutine.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        if callback is not None:
+            future.add_done_callback(functools.partial(self.call_in_tk, callback))
+        return future
+
+    async def _cancel_tasks(self):
+        """Cancel every other task on the loop and wait for them to finish."""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Stop polling, cancel what is still running, then stop and close the loop."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+        asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
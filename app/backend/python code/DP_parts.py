@@ -5,7 +5,15 @@ import matplotlib.patches as patches
 import random
 import uuid
 import json
+import ast
+import os
+import threading
+import timeit
+from spatial_index import RectangleIndex
 
+PARTS_SCHEMA_VERSION = 4
+PART_COLUMNS = ("ID, Name, Width, Height, FullWeight, HalfWeight, EmptyWeight, CurrentWeight, InService, "
+                "PositionX, PositionY, PositionZ, OrientationX, OrientationY, OrientationZ")
 
 
 class Box:
@@ -37,6 +45,18 @@ class Box:
         self.position = position
         self.orientation = orientation
     
+    @classmethod
+    def from_row(cls, row: tuple) -> "Box":
+        """Build a Box from a row of the Parts table.
+
+        Args:
+            row (tuple): The columns of PART_COLUMNS in order.
+
+        Returns:
+            Box: The part, with its position and orientation as (x, y, z) tuples of floats.
+        """
+        return cls(*row[:9], tuple(row[9:12]), tuple(row[12:15]))
+
     def __str__(self) -> str:
         """Return a string representation of the Box object."""
         return f"ID: {self.ID}\nName: {self.name}\nWidth: {self.width}\nHeight: {self.height}\nFull Weight: {self.FullWeight}\nHalf Weight: {self.HalfWeight}\nEmpty Weight: {self.EmptyWeight}\nCurrent Weight: {self.CurrentWeight}\nIn Service: {self.InService}\nPosition: {self.position}\nOrientation: {self.orientation}"
@@ -56,8 +76,98 @@ class stack_pointer:
         self.priority = priority
         self.NumBoxes = NumBoxes
 
+class ConnectionManager:
+    """Hand out SQLite connections for a PartsDatabase.
+
+    Persistent connections are opened once per thread, in WAL mode so readers do not block the
+    writer, and are kept until close_all. SQLite prepares each distinct query once per connection and
+    reuses it from the statement cache. With persistent off every connect opens a new connection
+    and every release closes it, as PartsDatabase always did.
+    """
+
+    CACHED_STATEMENTS = 128
+
+    def __init__(self, db_name: str, persistent: bool = True):
+        """Initialize the ConnectionManager.
+
+        Args:
+            db_name (str): Name of the database file.
+            persistent (bool, optional): Keep one connection open per thread. Defaults to True.
+        """
+        self.db_name = db_name
+        self.persistent = persistent
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """sqlite3.Connection: The calling thread's connection, None before connect."""
+        return getattr(self._local, "conn", None)
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """sqlite3.Cursor: The calling thread's cursor, None before connect."""
+        return getattr(self._local, "cursor", None)
+
+    def connect(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it if needed.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        if self.persistent and self.conn is not None:
+            return self.conn
+
+        if self.persistent:
+            conn = sqlite3.connect(self.db_name, cached_statements=self.CACHED_STATEMENTS, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                self._connections.append(conn)
+        else:
+            conn = sqlite3.connect(self.db_name)
+
+        self._local.conn = conn
+        self._local.cursor = conn.cursor()
+        return conn
+
+    def release(self) -> None:
+        """Release the calling thread's connection, closing it unless connections are persistent.
+
+        A transaction a failed write left open is rolled back first, otherwise a persistent connection
+        would keep the database locked for every other connection.
+        """
+        if self.conn is not None and self.conn.in_transaction:
+            self.conn.rollback()
+        if not self.persistent and self.conn is not None:
+            self.conn.close()
+            self._local.conn = None
+            self._local.cursor = None
+
+    def close_all(self) -> None:
+        """Close every persistent connection, e.g. when the application exits."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+def remove_db_files(db_name: str) -> None:
+    """Delete a database file together with its WAL and shared-memory files.
+
+    Args:
+        db_name (str): Name of the database file.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+
 class PartsDatabase:
-    def __init__(self, db_name="parts_db", grid_size: tuple = (1.40, 1.40), shelf_height: float = 0.01, margin: float = 0.01, offset_x: float = 0.01, offset_y: float = 0.01):
+    MAX_QUERY_KEYS = 500  # Keys per bulk query, under SQLite's limit on bound parameters
+    SEARCH_LIMIT = 50  # Matches search_parts returns by default
+
+    def __init__(self, db_name="parts_db", grid_size: tuple = (1.40, 1.40), shelf_height: float = 0.01, margin: float = 0.01, offset_x: float = 0.01, offset_y: float = 0.01, persistent: bool = True):
         """Initialize the PartsDatabase.
 
         Args:
@@ -67,8 +177,11 @@ class PartsDatabase:
             margin (float, optional): Margin between boxes. Defaults to 0.01.
             offset_x (float, optional): Offset from the origin along the x-axis. Defaults to 0.01.
             offset_y (float, optional): Offset from the origin along the y-axis. Defaults to 0.01.
+            persistent (bool, optional): Keep connections open between calls, see ConnectionManager. Defaults to True.
         """
         self.db_name = db_name
+        self.connections = ConnectionManager(db_name, persistent)
+        self.search_index = False  # Set once the full-text part search index exists
         self.grid_size = grid_size
         self.shelf_height = shelf_height
         self.margin = margin
@@ -78,6 +191,7 @@ class PartsDatabase:
         self.load_pointers_from_json()  # Load pointers from JSON
         self.stacking_pointer = stack_pointer()
         self.no_go_rectangles = []  # List to store "NO_GO" rectangles
+        self.no_go_index = RectangleIndex()  # Grid index over no_go_rectangles, same order
 
         self.NORTH_WALL = (0.0, 1.0, 0.0)
         self.EAST_WALL = (1.0, 0.0, 0.0)
@@ -135,45 +249,51 @@ class PartsDatabase:
         except Exception as e:
             print(f"Error updating pointers to JSON file: {e}")
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """sqlite3.Connection: The calling thread's connection to the database."""
+        return self.connections.conn
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """sqlite3.Cursor: The calling thread's cursor."""
+        return self.connections.cursor
+
     def connect(self) -> bool:
         """Establish connection to the database."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
+            self.connections.connect()
             return True
         except sqlite3.Error as e:
             print(f"Error connecting to the database: {e}")
             return False
 
     def disconnect(self) -> bool:
-        """Close connection to the database."""
+        """Release the connection to the database, it stays open if connections are persistent."""
         try:
             if self.conn:
-                self.conn.close()
+                self.connections.release()
                 return True
         except sqlite3.Error as e:
             print(f"Error disconnecting from the database: {e}")
             return False
 
+    def close(self) -> None:
+        """Close every connection to the database."""
+        self.connections.close_all()
+
     def create_parts_table(self) -> bool:
-        """Create 'Parts' table in the database if it doesn't exist."""
+        """Create 'Parts' table in the database if it doesn't exist, migrating an older table."""
         try:
             self.connect()
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Parts (
-                    ID TEXT NOT NULL,
-                    Name TEXT NOT NULL,
-                    Width REAL NOT NULL,
-                    Height REAL NOT NULL,
-                    FullWeight REAL NOT NULL,
-                    HalfWeight REAL NOT NULL,
-                    EmptyWeight REAL NOT NULL,
-                    CurrentWeight REAL,
-                    InService INTEGER,
-                    Position TEXT NOT NULL,
-                    Orientation TEXT NOT NULL
-                )
-            """)
+            columns = [column[1] for column in self.cursor.execute("PRAGMA table_info(Parts)")]
+            if columns and "PartKey" not in columns:
+                return self.migrate_parts_table()
+
+            indexed = self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'PartsSearch'").fetchone()
+            self._create_schema()
+            if self.search_index and not indexed:
+                self.cursor.execute("INSERT INTO PartsSearch (PartsSearch) VALUES ('rebuild')")
             self.conn.commit()
             return True
         except sqlite3.Error as e:
@@ -182,6 +302,119 @@ class PartsDatabase:
         finally:
             self.disconnect()
 
+    def _create_schema(self) -> None:
+        """Create the typed 'Parts' table and its indexes on the current connection.
+
+        PartKey is last so readers of 'SELECT *' keep their column indexes. It is the key of the search
+        index, an implicit rowid would not do as VACUUM may renumber it.
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Parts (
+                ID TEXT NOT NULL UNIQUE,
+                Name TEXT NOT NULL,
+                Width REAL NOT NULL,
+                Height REAL NOT NULL,
+                FullWeight REAL NOT NULL,
+                HalfWeight REAL NOT NULL,
+                EmptyWeight REAL NOT NULL,
+                CurrentWeight REAL,
+                InService INTEGER,
+                PositionX REAL NOT NULL,
+                PositionY REAL NOT NULL,
+                PositionZ REAL NOT NULL,
+                OrientationX REAL NOT NULL,
+                OrientationY REAL NOT NULL,
+                OrientationZ REAL NOT NULL,
+                PartKey INTEGER PRIMARY KEY
+            )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS Parts_Name ON Parts (Name)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS Parts_Name_nocase ON Parts (Name COLLATE NOCASE)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS Parts_InService ON Parts (InService)")
+        self._create_search_index()
+        self.cursor.execute(f"PRAGMA user_version = {PARTS_SCHEMA_VERSION}")
+
+    def _create_search_index(self) -> None:
+        """Create the trigram full-text index of part names and IDs, kept in step with 'Parts' by triggers.
+
+        SQLite builds without FTS5 leave search_parts to prefix matches only.
+        """
+        try:
+            self.cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS PartsSearch
+                USING fts5(Name, ID, content='Parts', content_rowid='PartKey', tokenize='trigram')
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"Part search index unavailable, searching by prefix only: {e}")
+            self.search_index = False
+            return
+
+        self.search_index = True
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS Parts_search_insert AFTER INSERT ON Parts BEGIN
+                INSERT INTO PartsSearch (rowid, Name, ID) VALUES (new.PartKey, new.Name, new.ID);
+            END
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS Parts_search_delete AFTER DELETE ON Parts BEGIN
+                INSERT INTO PartsSearch (PartsSearch, rowid, Name, ID) VALUES ('delete', old.PartKey, old.Name, old.ID);
+            END
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS Parts_search_update AFTER UPDATE OF Name, ID ON Parts BEGIN
+                INSERT INTO PartsSearch (PartsSearch, rowid, Name, ID) VALUES ('delete', old.PartKey, old.Name, old.ID);
+                INSERT INTO PartsSearch (rowid, Name, ID) VALUES (new.PartKey, new.Name, new.ID);
+            END
+        """)
+
+    def migrate_parts_table(self) -> bool:
+        """Move an older 'Parts' table to the current schema.
+
+        Legacy tables store Position and Orientation as text, which is parsed once here so lookups never
+        have to. Typed tables without PartKey are copied as they are and their search index is rebuilt.
+        The whole migration is one transaction, and when the old table holds an ID more than once the
+        last row wins.
+
+        Returns:
+            bool: True if the table was migrated or was already typed, False otherwise.
+        """
+        try:
+            self.connect()
+            columns = [column[1] for column in self.cursor.execute("PRAGMA table_info(Parts)")]
+            if not columns or "PartKey" in columns:
+                return True
+
+            self.cursor.execute("BEGIN")
+            # The search index and its triggers are keyed on the old implicit rowid
+            for trigger in ("Parts_search_insert", "Parts_search_delete", "Parts_search_update"):
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.cursor.execute("DROP TABLE IF EXISTS PartsSearch")
+            self.cursor.execute("ALTER TABLE Parts RENAME TO Parts_legacy")
+            self._create_schema()
+            if "Position" in columns:
+                rows = self.cursor.execute("""
+                    SELECT ID, Name, Width, Height, FullWeight, HalfWeight, EmptyWeight, CurrentWeight, InService, Position, Orientation
+                    FROM Parts_legacy ORDER BY rowid
+                """).fetchall()
+                rows = [(*row[:9], *(float(value) for value in ast.literal_eval(row[9])), *(float(value) for value in ast.literal_eval(row[10])))
+                        for row in rows]
+            else:
+                rows = self.cursor.execute(f"SELECT {PART_COLUMNS} FROM Parts_legacy ORDER BY rowid").fetchall()
+            self.cursor.executemany(f"INSERT OR REPLACE INTO Parts ({PART_COLUMNS}) VALUES ({', '.join('?' * 15)})", rows)
+            self.cursor.execute("DROP TABLE Parts_legacy")
+            if self.search_index:
+                # Replaced duplicates skip the delete trigger, so index the final rows in one pass
+                self.cursor.execute("INSERT INTO PartsSearch (PartsSearch) VALUES ('rebuild')")
+            self.conn.commit()
+            print(f"Migrated {len(rows)} parts in '{self.db_name}' to schema version {PARTS_SCHEMA_VERSION}")
+            return True
+        except (sqlite3.Error, ValueError, SyntaxError) as e:
+            self.conn.rollback()
+            print(f"Error migrating 'Parts' table: {e}")
+            return False
+        finally:
+            self.disconnect()
+
     def add_no_go_rectangle(self, x, y, width, height) -> bool:
         """Add a 'NO_GO' rectangle to the grid.
 
@@ -193,12 +426,11 @@ class PartsDatabase:
         """
         try:
             self.no_go_rectangles.append(patches.Rectangle((x, y), width, height, facecolor="gray"))
+            self.no_go_index.insert(x, y, width, height)
             return True
         except Exception as e:
             print(f"Error NO Go zone: {e}")
             return False
-        finally:
-            self.disconnect()
 
     def add_part(self, box: Box) -> bool:
         """Add a part to the PartsDatabase.
@@ -225,12 +457,7 @@ class PartsDatabase:
             elif (
                 self.stacking_pointer.xcor + box.width + self.margin > self.grid_size[0]
                 or self.stacking_pointer.ycor + box.height + self.margin > self.grid_size[1]
-                or any(
-                    self.is_overlap(
-                        self.stacking_pointer.xcor, self.stacking_pointer.ycor, box.width, box.height, rect
-                    )
-                    for rect in self.no_go_rectangles
-                )
+                or len(self.no_go_index.overlapping(self.stacking_pointer.xcor, self.stacking_pointer.ycor, box.width, box.height))
             ):
                 # Move to the next row if the new box doesn't fit in the current row or overlaps with "NO_GO" space
                 self.stacking_pointer.xcor = round(self.offset_x, 3)
@@ -243,9 +470,8 @@ class PartsDatabase:
 
                 # Check if the current position is just before the "NO_GO" rectangle
                 overlapping_rectangles = [
-                    rect for rect in self.no_go_rectangles if self.is_overlap(
-                        self.stacking_pointer.xcor, self.stacking_pointer.ycor, 0, box.height, rect
-                    )
+                    self.no_go_rectangles[index]
+                    for index in self.no_go_index.overlapping(self.stacking_pointer.xcor, self.stacking_pointer.ycor, 0, box.height)
                 ]
 
                 if overlapping_rectangles:
@@ -308,10 +534,7 @@ class PartsDatabase:
         try:
             self.connect()
             # Execute SQL query to insert the part into the database
-            self.cursor.execute("""
-                INSERT INTO Parts (ID, Name, Width, Height, FullWeight, HalfWeight, EmptyWeight, CurrentWeight, InService, Position, Orientation)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            self.cursor.execute(f"INSERT INTO Parts ({PART_COLUMNS}) VALUES ({', '.join('?' * 15)})", (
                 box.ID,
                 box.name,
                 box.width,
@@ -321,8 +544,8 @@ class PartsDatabase:
                 box.EmptyWeight,
                 box.CurrentWeight,
                 box.InService,
-                str(box.position), 
-                str(box.orientation)
+                *(float(value) for value in box.position),
+                *(float(value) for value in box.orientation)
             ))
             self.conn.commit()
             return True
@@ -344,12 +567,12 @@ class PartsDatabase:
         try:
             self.connect()
             # Execute SQL query to retrieve the part with the specified name
-            self.cursor.execute("SELECT * FROM Parts WHERE name=?", (part_name,))
+            self.cursor.execute(f"SELECT {PART_COLUMNS} FROM Parts WHERE name=?", (part_name,))
             # Fetch the first row returned by the query
             row = self.cursor.fetchone()
             # If a row is found, construct a Box object from the data and return it
             if row:
-                return Box(*row)
+                return Box.from_row(row)
             else:
                 print(f"No part with name '{part_name}' found.")
                 return None
@@ -371,12 +594,12 @@ class PartsDatabase:
         try:
             self.connect()
             # Execute SQL query to retrieve the part with the specified ID
-            self.cursor.execute("SELECT * FROM Parts WHERE ID=?", (part_ID,))
+            self.cursor.execute(f"SELECT {PART_COLUMNS} FROM Parts WHERE ID=?", (part_ID,))
             # Fetch the first row returned by the query
             row = self.cursor.fetchone()
             # If a row is found, construct a Box object from the data and return it
             if row:
-                return Box(*row)
+                return Box.from_row(row)
             else:
                 print(f"No part with ID '{part_ID}' found.")
                 return None
@@ -386,6 +609,111 @@ class PartsDatabase:
         finally:
             self.disconnect()
 
+    def get_parts_by_names(self, part_names: list) -> dict:
+        """Retrieve several parts from the database by name in one query.
+
+        Args:
+            part_names (list): The names of the parts to retrieve.
+
+        Returns:
+            dict: Part name -> Box for the parts found, in the order requested.
+        """
+        return self._get_parts_by("Name", part_names)
+
+    def get_parts_by_ids(self, part_IDs: list) -> dict:
+        """Retrieve several parts from the database by ID in one query.
+
+        Args:
+            part_IDs (list): The IDs of the parts to retrieve.
+
+        Returns:
+            dict: Part ID -> Box for the parts found, in the order requested.
+        """
+        return self._get_parts_by("ID", part_IDs)
+
+    def _get_parts_by(self, column: str, keys: list) -> dict:
+        """Retrieve the parts whose column matches any of the keys.
+
+        Like get_part_by_name, the first stored part wins when a name is stored more than once.
+
+        Args:
+            column (str): "Name" or "ID".
+            keys (list): The values to look up.
+
+        Returns:
+            dict: Key -> Box for the keys found, in the order requested.
+        """
+        keys = list(dict.fromkeys(keys))
+        key_index = PART_COLUMNS.split(", ").index(column)
+        rows = {}
+        try:
+            self.connect()
+            for start in range(0, len(keys), self.MAX_QUERY_KEYS):
+                chunk = keys[start:start + self.MAX_QUERY_KEYS]
+                self.cursor.execute(f"SELECT {PART_COLUMNS} FROM Parts WHERE {column} IN ({', '.join('?' * len(chunk))}) ORDER BY PartKey", chunk)
+                for row in self.cursor.fetchall():
+                    rows.setdefault(row[key_index], row)
+        except sqlite3.Error as e:
+            print(f"Error retrieving parts: {e}")
+            return {}
+        finally:
+            self.disconnect()
+
+        missing = [key for key in keys if key not in rows]
+        if missing:
+            print(f"No parts with {column} {missing} found.")
+        return {key: Box.from_row(rows[key]) for key in keys if key in rows}
+
+    def search_parts(self, text: str, limit: int = None) -> list:
+        """Find the best matching parts for a search box, e.g. while the user types.
+
+        Matches are ranked by tier: names starting with the text, IDs starting with it, then names or
+        IDs containing it. Each tier reads its index only as far as the limit, so the cost does not
+        grow with the catalog. Substring matches need at least three characters, the trigram size.
+        Name matching ignores ASCII case and ID prefixes are matched exactly.
+
+        Args:
+            text (str): The text typed so far.
+            limit (int, optional): Most parts to return. Defaults to SEARCH_LIMIT.
+
+        Returns:
+            list: Matching Box objects, best first.
+        """
+        limit = limit or self.SEARCH_LIMIT
+        text = text.strip()
+        if not text:
+            return []
+
+        end = text + "\U0010ffff"  # Sorts after every string starting with text
+        tiers = [
+            (f"SELECT PartKey, {PART_COLUMNS} FROM Parts WHERE Name COLLATE NOCASE >= ? AND Name COLLATE NOCASE < ? "
+             f"ORDER BY Name COLLATE NOCASE LIMIT ?", (text, end)),
+            (f"SELECT PartKey, {PART_COLUMNS} FROM Parts WHERE ID >= ? AND ID < ? ORDER BY ID LIMIT ?", (text, end)),
+        ]
+        if self.search_index and len(text) >= 3:
+            phrase = '"' + text.replace('"', '""') + '"'
+            tiers.append((f"SELECT Parts.PartKey, {', '.join('Parts.' + column for column in PART_COLUMNS.split(', '))} "
+                          f"FROM PartsSearch JOIN Parts ON Parts.PartKey = PartsSearch.rowid WHERE PartsSearch MATCH ? LIMIT ?", (phrase,)))
+
+        matches = {}
+        try:
+            self.connect()
+            for query, parameters in tiers:
+                # Ask for enough rows to fill the limit even when earlier tiers found some of them
+                for row in self.cursor.execute(query, (*parameters, limit + len(matches))):
+                    if len(matches) == limit:
+                        break
+                    matches.setdefault(row[0], row[1:])
+                if len(matches) == limit:
+                    break
+        except sqlite3.Error as e:
+            print(f"Error searching parts: {e}")
+            return []
+        finally:
+            self.disconnect()
+
+        return [Box.from_row(row) for row in matches.values()]
+
     def update_part_by_name(self, part_name: str, **kwargs) -> bool:
         """Update properties of a part by its name.
 
@@ -451,6 +779,55 @@ def generate_random_part_names(nouns):
     nouns.remove(random_nut_name)  # Remove the chosen noun from the list
     return random_nut_name
 
+def migrate_parts_db(db_name: str = "parts_db") -> bool:
+    """One-shot migration of a parts database file to the typed, indexed 'Parts' schema.
+
+    Args:
+        db_name (str, optional): Name of the database file. Defaults to "parts_db".
+
+    Returns:
+        bool: True if the file now uses the typed schema, False otherwise.
+    """
+    db = PartsDatabase(db_name)
+    migrated = db.migrate_parts_table()
+    db.close()
+    return migrated
+
+def run_lookup_benchmark(db_name: str = "benchmark_parts.db", parts: int = 200, lookups: int = 2000, repeats: int = 3) -> dict:
+    """Time get_part_by_name with a connection per call against persistent connections.
+
+    The database file is filled with parts before timing and removed afterwards.
+
+    Args:
+        db_name (str, optional): Scratch database file. Defaults to "benchmark_parts.db".
+        parts (int, optional): Number of parts stored. Defaults to 200.
+        lookups (int, optional): Lookups per timing run. Defaults to 2000.
+        repeats (int, optional): Number of timing runs; the fastest one is kept. Defaults to 3.
+
+    Returns:
+        dict: Seconds per lookup for "per call" and "persistent" connections.
+    """
+    names = [f"Part {index}" for index in range(parts)]
+    try:
+        db = PartsDatabase(db_name)
+        for index, name in enumerate(names):
+            db.store_part(Box(str(index), name, 0.1, 0.1, 15, 10, 5, 12, False, [0.0, 0.0, 0.0], NORTH_WALL))
+        db.close()
+
+        wanted = [random.choice(names) for _ in range(lookups)]
+        results = {}
+        for label, persistent in (("per call", False), ("persistent", True)):
+            db = PartsDatabase(db_name, persistent=persistent)
+            seconds = min(timeit.repeat(lambda: [db.get_part_by_name(name) for name in wanted], number=1, repeat=repeats))
+            db.close()
+            results[label] = seconds/lookups
+            print(f"{label:>10}: {results[label] * 1e6:8.1f} us per lookup")
+
+        print(f"Persistent connections are {results['per call']/results['persistent']:.1f}x faster")
+        return results
+    finally:
+        remove_db_files(db_name)
+
 def main():
     box_w = 0.100
     box_h = 0.092
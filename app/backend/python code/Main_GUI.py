@@ -11,7 +11,6 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import tkinter as tk
 from queue import LifoQueue
-import ast
 from scipy.spatial.transform import Rotation
 import random
 import threading
@@ -25,6 +24,9 @@ from Motors import *
 from VelocityPFP import *
 from moshionPlanning import *
 from Messager import *
+from AsyncMessager import *
+from quaternions import *
+from plan_compiler import *
 
 LARGE_FONT = ("Verdana", 12)
 
@@ -283,221 +285,6 @@ def handle_response(expected_r: str = None, expected_prefix: str = None, dataWri
                 print(f">>> {response}")
                 continue
 
-def rotation_matrix_to_quaternion(rotation_matrix: np.ndarray) -> np.ndarray:
-    """
-    Convert a 3x3 rotation matrix into a quaternion.
-
-    Args:
-        rotation_matrix (np.array): A 3x3 rotation matrix.
-
-    Returns:
-        np.array: A 4-element array representing the quaternion.
-    """
-    R = np.array(rotation_matrix, dtype=np.float64)
-    
-    trace = np.trace(R)
-    
-    if trace > 0:
-        S = 2.0 * np.sqrt(trace + 1.0)
-        qw = 0.25 * S
-        qx = (R[2, 1] - R[1, 2]) / S
-        qy = (R[0, 2] - R[2, 0]) / S
-        qz = (R[1, 0] - R[0, 1]) / S
-    elif (R[0, 0] > R[1, 1]) and (R[0, 0] > R[2, 2]):
-        S = 2.0 * np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
-        qw = (R[2, 1] - R[1, 2]) / S
-        qx = 0.25 * S
-        qy = (R[0, 1] + R[1, 0]) / S
-        qz = (R[0, 2] + R[2, 0]) / S
-    elif R[1, 1] > R[2, 2]:
-        S = 2.0 * np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
-        qw = (R[0, 2] - R[2, 0]) / S
-        qx = (R[0, 1] + R[1, 0]) / S
-        qy = 0.25 * S
-        qz = (R[1, 2] + R[2, 1]) / S
-    else:
-        S = 2.0 * np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
-        qw = (R[1, 0] - R[0, 1]) / S
-        qx = (R[0, 2] + R[2, 0]) / S
-        qy = (R[1, 2] + R[2, 1]) / S
-        qz = 0.25 * S
-    
-    quaternion = np.array([qw, qx, qy, qz])
-
-    return quaternion
-
-def quaternion_to_rotation_matrix(quaternion: np.ndarray) -> np.ndarray:
-    """
-    Convert a quaternion into a 3x3 rotation matrix.
-
-    Args:
-        quaternion (list or np.array): A 4-element list or array representing the quaternion.
-
-    Returns:
-        np.array: A 3x3 rotation matrix.
-    """
-    q = np.array(quaternion, dtype=np.float64)
-    q = q / np.linalg.norm(q)
-
-    w, x, y, z = q
-    rotation_matrix = np.array([[1 - 2*y*y - 2*z*z, 2*x*y - 2*w*z, 2*x*z + 2*w*y],
-                                 [2*x*y + 2*w*z, 1 - 2*x*x - 2*z*z, 2*y*z - 2*w*x],
-                                 [2*x*z - 2*w*y, 2*y*z + 2*w*x, 1 - 2*x*x - 2*y*y]])
-
-    return rotation_matrix
-
-def quaternion_multiply_2q(q1: np.ndarray, q2: np.ndarray) -> np.ndarray :
-    """
-    Multiply two quaternions.
-
-    Args:
-        q1 (np.array): The first quaternion [w, x, y, z].
-        q2 (np.array): The second quaternion [w, x, y, z].
-
-    Returns:
-        np.array: The resulting quaternion.
-    """
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
-    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
-    return np.array([w, x, y, z])
-
-def rotate_quaternion(quat: np.ndarray, angle_x:float, angle_y:float, angle_z:float) -> np.ndarray :
-    """
-    Rotate a quaternion around the unit vectors.
-
-    Args:
-        quat (np.array): The original quaternion [w, x, y, z].
-        angle_x (float): Angle to rotate around the x-axis (in radians).
-        angle_y (float): Angle to rotate around the y-axis (in radians).
-        angle_z (float): Angle to rotate around the z-axis (in radians).
-
-    Returns:
-        np.array: The rotated quaternion [w, x, y, z].
-    """
-    # Quaternion representing the rotation around x-axis
-    qx = np.array([np.cos(angle_x / 2), np.sin(angle_x / 2), 0, 0])
-    
-    # Quaternion representing the rotation around y-axis
-    qy = np.array([np.cos(angle_y / 2), 0, np.sin(angle_y / 2), 0])
-    
-    # Quaternion representing the rotation around z-axis
-    qz = np.array([np.cos(angle_z / 2), 0, 0, np.sin(angle_z / 2)])
-    
-    # Combine the rotations by quaternion multiplication
-    rotated_quat = quaternion_multiply_2q(quaternion_multiply_2q(quaternion_multiply_2q(quat, qx), qy), qz)
-
-    return rotated_quat
-
-def quaternion_slerp(q1: np.ndarray, q2: np.ndarray, t: float) -> np.ndarray:
-    """
-    Perform spherical linear interpolation (slerp) between two quaternions.
-
-    Args:
-        q1 (numpy.ndarray): The first quaternion as a 4-element numpy array [w, x, y, z].
-        q2 (numpy.ndarray): The second quaternion as a 4-element numpy array [w, x, y, z].
-        t (float): Interpolation parameter. It ranges from 0 to 1. 
-                   For t=0, the resulting quaternion is equal to q1.
-                   For t=1, the resulting quaternion is equal to q2.
-
-    Returns:
-        numpy.ndarray: The interpolated quaternion as a 4-element numpy array [w, x, y, z].
-    """
-    # Ensure quaternions are normalized
-    q1 = q1 / np.linalg.norm(q1)
-    q2 = q2 / np.linalg.norm(q2)
-
-    dot_product = np.dot(q1, q2)
-    
-    # Determine the sign
-    if dot_product < 0.0:
-        q1 = -q1
-        dot_product = -dot_product
-
-    # Clamp dot product to ensure stability
-    dot_product = min(1.0, max(-1.0, dot_product))
-    
-    # Calculate the angle between the quaternions
-    theta_0 = np.arccos(dot_product)
-    sin_theta_0 = np.sin(theta_0)
-    
-    # Perform interpolation
-    s0 = np.sin((1 - t) * theta_0) / sin_theta_0
-    s1 = np.sin(t * theta_0) / sin_theta_0
-    
-    return (s0 * q1) + (s1 * q2)
-
-def quaternion_to_euler(quaternion):
-    """Convert quaternion to Euler angles.
-
-    Args:
-        quaternion (np.array): Quaternion in the form [w, x, y, z].
-
-    Returns:
-        np.array: Euler angles in the form [roll, pitch, yaw].
-    """
-    w, x, y, z = quaternion
-    # Roll (x-axis rotation)
-    sinr_cosp = 2.0 * (w * x + y * z)
-    cosr_cosp = 1.0 - 2.0 * (x * x + y * y)
-    roll = np.arctan2(sinr_cosp, cosr_cosp)
-
-    # Pitch (y-axis rotation)
-    sinp = 2.0 * (w * y - z * x)
-    if np.abs(sinp) >= 1:
-        pitch = np.sign(sinp) * np.pi / 2  # Use +/-90 degrees if out of range
-    else:
-        pitch = np.arcsin(sinp)
-
-    # Yaw (z-axis rotation)
-    siny_cosp = 2.0 * (w * z + x * y)
-    cosy_cosp = 1.0 - 2.0 * (y * y + z * z)
-    yaw = np.arctan2(siny_cosp, cosy_cosp)
-
-    return np.array([roll, pitch, yaw])
-
-def rotation_matrix_to_euler_angles(R: np.ndarray):
-    """
-    Convert a 3x3 rotation matrix to Euler angles.
-
-    Parameters:
-    R : numpy.ndarray
-        3x3 rotation matrix.
-
-    Returns:
-    numpy.ndarray
-        Euler angles in radians as [roll, pitch, yaw].
-        
-    Notes:
-        - This function assumes the rotation matrix represents a proper rotation (orthogonal matrix).
-        - Gimbal lock may occur when the pitch angle approaches ±90 degrees.
-          In such cases, the resulting roll and yaw angles may become ambiguous.
-          Consider handling gimbal lock cases accordingly in your application.
-    """
-    # Input validation
-    if R.shape != (3, 3):
-        raise ValueError("Input matrix must be a 3x3 array.")
-
-    # Calculate sin of pitch angle
-    sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
-    
-    # Check for gimbal lock
-    singular = sy < 1e-6
-
-    if not singular:
-        roll = np.arctan2(R[2, 1], R[2, 2])
-        pitch = np.arctan2(-R[2, 0], sy)
-        yaw = np.arctan2(R[1, 0], R[0, 0])
-    else:
-        roll = np.arctan2(-R[1, 2], R[1, 1])
-        pitch = np.arctan2(-R[2, 0], sy)
-        yaw = 0
-
-    return np.array([roll, pitch, yaw])
-
 LARGE_FONT = ("Verdana", 12)
 DROP_OFF_ZONE = (0, -0.73, 0.03)
 DROP_OFF_ORIENTATION = rotate_quaternion([1, 0, 0, 0], np.pi/2, 0, np.pi)
@@ -517,6 +304,13 @@ lifting_distance = 0.015
 Hight_drop_off_box = 0.1
 Gripper_offset = [0, -0.2, 0.006]
 
+PLAN_SETTINGS = dict(idle_position=IDLE_POSITION, idle_orientation=IDLE_ORIENTATION, working_position=WORKING_POSITION,
+                     jogging_start=JOGGING_START, jogging_orientation=JOGGING_START_ORIENTATION,
+                     drop_off_orientation=DROP_OFF_ORIENTATION, weighting_position=WEIGHTING_POSITION,
+                     weighting_orientation=WEIGHTING_ORIENTATION, insertion_distance=insershion_distance,
+                     lifting_distance=lifting_distance, drop_off_height=Hight_drop_off_box,
+                     gripper_offset=np.array(Gripper_offset) + [0, -RROTASHION_BUFFER_DIS, 0])
+
 NORTH_WALL = (0.0, 1.0, 0.0)
 EAST_WALL = (1.0, 0.0, 0.0)
 WEST_WALL = (-1.0, 0.0, 0.0)
@@ -557,6 +351,12 @@ class RobotCart(tk.Tk):
         self.logged_in = False
         self.admin_page = 0
 
+        # Robot communication runs on an event loop stepped by the Tk mainloop, so the GUI keeps
+        # drawing while a move uploads and executes
+        self.async_bridge = TkAsyncBridge(self)
+        # self.MSG = AsyncMesageer("COM12")
+        # self.async_bridge.submit(self.MSG.connect())
+
         # Create a container frame to hold the pages
         container = tk.Frame(self)
         container.pack(side="top", fill="both", expand=True)
@@ -1166,52 +966,40 @@ class MainUserPage(PageBase):
         self.load_suggestions(current_text)
 
     def load_suggestions(self, prefix: str) -> None:
-        """Load suggestions based on the provided part name or part ID prefix.
+        """Load the best matching parts for the provided part name or part ID text.
 
         Args:
-            prefix (str): The prefix used for searching part names or part IDs.
+            prefix (str): The text used for searching part names or part IDs, see PartsDatabase.search_parts.
         """
-        try:
-            # Establish a connection to the Parts database
-            self.parts_db.connect()
-
-            # Execute a SQL query to select records from the Parts table with a matching part name or part ID
-            query = "SELECT * FROM Parts WHERE Name LIKE ? OR ID LIKE ?"
-            self.parts_db.cursor.execute(query, ('%' + prefix + '%', '%' + prefix + '%'))
-
-            # Fetch all the data from the executed query
-            data = self.parts_db.cursor.fetchall()
+        # An empty search box shows the whole catalog again
+        if not prefix.strip():
+            self.load_data()
+            return
 
-            # Configure tags for alternate row colors and low weight indication
-            self.parts_treeview.tag_configure('oddrow', background='white')
-            self.parts_treeview.tag_configure('evenrow', background='lightblue')
-            self.parts_treeview.tag_configure('lowweight', background='lightcoral')  # Add a tag for low weight
+        # Get the best matches on part name or part ID from the search index
+        parts = self.parts_db.search_parts(prefix)
 
-            # Clear existing content in the parts_treeview
-            self.parts_treeview.delete(*self.parts_treeview.get_children())
+        # Configure tags for alternate row colors and low weight indication
+        self.parts_treeview.tag_configure('oddrow', background='white')
+        self.parts_treeview.tag_configure('evenrow', background='lightblue')
+        self.parts_treeview.tag_configure('lowweight', background='lightcoral')  # Add a tag for low weight
 
-            # Iterate through the retrieved data and insert it into the parts_treeview
-            for idx, record in enumerate(data):
-                # Determine the tag for alternate row coloring
-                tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-                # Determine the service status for display
-                service = "In Service" if record[8] == 1 else " "
+        # Clear existing content in the parts_treeview
+        self.parts_treeview.delete(*self.parts_treeview.get_children())
 
-                # Check if CurrentWeight is below 5 and set a different tag for low weight
-                if record[7] < record[6]:  
-                    tag = 'lowweight'
+        # Iterate through the matches and insert them into the parts_treeview
+        for idx, part in enumerate(parts):
+            # Determine the tag for alternate row coloring
+            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+            # Determine the service status for display
+            service = "In Service" if part.InService == 1 else " "
 
-                # Insert the data into the parts_treeview with specified tags
-                self.parts_treeview.insert(parent='', index='end', iid=idx, text='', values=(record[1], record[0], service, record[7]), tags=(tag,))
+            # Check if CurrentWeight is below EmptyWeight and set a different tag for low weight
+            if part.CurrentWeight < part.EmptyWeight:
+                tag = 'lowweight'
 
-        finally:
-            try:
-                # Ensure the database is disconnected in the 'finally' block
-                self.parts_db.disconnect()
-            except Exception as disconnect_error:
-                # Handle any potential error during disconnection
-                error_msg = f"Error disconnecting from the database: {str(disconnect_error)}"
-                self.popup_error(error_msg)
+            # Insert the data into the parts_treeview with specified tags
+            self.parts_treeview.insert(parent='', index='end', iid=idx, text='', values=(part.name, part.ID, service, part.CurrentWeight), tags=(tag,))
 
     def search_and_update_treeview(self, part_name: str) -> None:
         """Search for parts and update the parts_treeview based on the search."""
@@ -1300,7 +1088,7 @@ class MoshionPlanningPage(PageBase):
 
         max_acc = 10000
         max_vel = 10000
-        self.planner = PathPlanner(max_acc, max_vel)
+        self.planner = PathPlanner(max_acc, max_vel, retention="ring")
 
         self.PathShow = False
 
@@ -1335,12 +1123,12 @@ class MoshionPlanningPage(PageBase):
         self.parts_db = PartsDatabase()
 
         # Create a pth panner for moshion planning
-        self.planner = PathPlanner(max_acc, max_vel)
+        self.planner = PathPlanner(max_acc, max_vel, retention="ring")
 
         #urdf_file_path = "E:\\Capstone\\app\\backend\\python code\\urdf_tes2.urdf"
         urdf_file_path = "C:\\Users\\zachl\\Capstone2024\\app\\backend\\python code\\urdf_tes2.urdf"
         #urdf_file_path = "//home//zachl//Capstone//app/backend//python code//urdf_tes2.urdf"
-        self.robot = RobotArm(urdf_file_path, IDLE_AGLE_POSITION)
+        self.robot = RobotArm(urdf_file_path, IDLE_AGLE_POSITION, ik_cache_size=IK_CACHE_SIZE)
 
         # Create a PartsDatabase instance for handling parts data
         self.db_path = 'C:\\Users\\zachl\\Capstone2024\\parts_db'
@@ -1545,145 +1333,7 @@ class MoshionPlanningPage(PageBase):
 
     def generate_return_robot_path(self):
         """Generate paths and velocity profiles for each part."""
-
-        depbug_stage = 14
-        self.travle_paths = []
-        self.travle_orientation = []
-        travle_alinements = []
-        travle_stop = []
-        over_wrap = False
-        self.planner.clear_saved_paths()
-
-        # leav the idle position and 
-        if depbug_stage > 0:
-            T0 = self.planner.generate_path(IDLE_POSITION, WORKING_POSITION, linear=True)
-            T0_orientation = [IDLE_ORIENTATION for _ in range(len(T0))]
-
-            self.travle_paths.append(T0)
-            self.travle_orientation.append(T0_orientation)
-
-        # go to the drop off zone
-        if depbug_stage > 1:
-            T0 = self.planner.generate_path(WORKING_POSITION, JOGGING_START, linear=False)
-            T0_orientation = [T0_orientation[-1] for _ in range(len(T0))]
-
-            self.travle_paths.append(T0)
-            self.travle_orientation.append(T0_orientation)
-
-        for index, (location, orientation) in enumerate(zip(self.locations.values(), self.orientations.values())):
-            over_wrap = False
-            location = np.array(location) + Gripper_offset + [0, -RROTASHION_BUFFER_DIS, 0]
-
-            if depbug_stage > 2:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, 0, -insershion_distance)) + DROP_OFF_ZONE
-                T1 = self.planner.generate_path(JOGGING_START, Pickup_point, linear=False)
-                T1_orientation = [quaternion_slerp(T0_orientation[-1], DROP_OFF_ORIENTATION, t) for t in np.linspace(0, 1, len(T1), endpoint=True)]
-                self.travle_paths.append(T1)
-                self.travle_orientation.append(T1_orientation)
-
-            if depbug_stage > 3:
-                T2 = self.planner.generate_path(T1[-1], DROP_OFF_ZONE, linear=True)
-                T2_orientation = [T1_orientation[-1] for _ in range(len(T2))]
-                self.travle_paths.append(T2)
-                self.travle_orientation.append(T2_orientation)
-
-            if depbug_stage > 4:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + DROP_OFF_ZONE
-                T3 = self.planner.generate_path(T2[-1], Pickup_point, linear=True)
-                T3_orientation = [T2_orientation[-1] for _ in range(len(T3))]
-                self.travle_paths.append(T3)
-                self.travle_orientation.append(T3_orientation)
-
-            if depbug_stage > 5:
-                T4 = self.planner.generate_path(T3[-1], WEIGHTING_POSITION, linear=True)
-                T4_orientation = [WEIGHTING_ORIENTATION for _ in range(len(T4))]
-                self.travle_paths.append(T4)
-                self.travle_orientation.append(T4_orientation)
-                travle_stop.append(5)
-
-
-            if depbug_stage > 6:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + WEIGHTING_POSITION
-                T5 = self.planner.generate_path(T4[-1], Pickup_point, linear=True)
-                T5_orientation = [WEIGHTING_ORIENTATION for _ in range(len(T5))]
-                self.travle_paths.append(T5)
-                self.travle_orientation.append(T5_orientation)
-
-
-            if depbug_stage > 7:
-                T6 = self.planner.generate_path(T5[-1], location, linear=False)
-
-                delta_angles = XY_angle(T5[-1], location)
-                if (-np.pi/2 > delta_angles >= -np.pi):
-                    delta_angles =  np.linspace(0, np.pi, len(T6), endpoint=True)
-                elif (0 > delta_angles >= -np.pi/2):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T6), endpoint=True)
-                elif (0 < delta_angles <= np.pi/2):
-                    delta_angles =  np.linspace(0, -np.pi/2, len(T6), endpoint=True)
-                elif (np.pi/2 < delta_angles <= np.pi):
-                    over_wrap = True
-                    delta_angles =  np.linspace(0, -np.pi, len(T6), endpoint=True)
-                
-                T6_orientation = [rotate_quaternion(T5_orientation[-1], 0, rad, 0) for rad in delta_angles]
-                self.travle_paths.append(T6)
-                self.travle_orientation.append(T6_orientation)
-
-            if depbug_stage > 8:
-                insershion_point = np.dot(quaternion_to_rotation_matrix(T6_orientation[-1]), (0, 0, insershion_distance)) + location
-                T7 = self.planner.generate_path(location, insershion_point, linear=True)
-                T7_orientation =  [T6_orientation[-1] for _ in range(len(T7))]
-                self.travle_paths.append(T7)
-                self.travle_orientation.append(T7_orientation)
-
-            if depbug_stage > 9:
-                lifing_point = np.dot(quaternion_to_rotation_matrix(T7_orientation[-1]), (0, lifting_distance, 0)) + T7[-1]
-                T8 = self.planner.generate_path(T7[-1], lifing_point, linear=True)
-                T8_orientation = [T7_orientation[-1] for _ in range(len(T8))]
-                self.travle_paths.append(T8)
-                self.travle_orientation.append(T8_orientation)
-
-            if depbug_stage > 10:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T8_orientation[-1]), (0, 0, -insershion_distance)) + T8[-1]
-                T9 = self.planner.generate_path(T8[-1], retracked_point, linear=True)
-                T9_orientation = [T8_orientation[-1] for _ in range(len(T9))]
-                self.travle_paths.append(T9)
-                self.travle_orientation.append(T9_orientation)
-
-            if over_wrap:
-                TOW_MID_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + WEIGHTING_POSITION
-                TOW = self.planner.generate_path(T9[-1], TOW_MID_point, linear=False)
-                TOW_orientation = [rotate_quaternion(T9_orientation[-1], 0, -rad, 0) for rad in delta_angles]
-                self.travle_paths.append(TOW)
-                self.travle_orientation.append(TOW_orientation)
-
-                if depbug_stage > 11:
-                    T10= self.planner.generate_path(TOW[-1], JOGGING_START, linear=False)
-                    T10_orientation = [quaternion_slerp(TOW_orientation[-1], IDLE_ORIENTATION, t) for t in np.linspace(0, 1, len(T10), endpoint=True)]
-                    self.travle_paths.append(T10)
-                    self.travle_orientation.append(T10_orientation)
-      
-            else:
-
-                if depbug_stage > 11:
-                    T10= self.planner.generate_path(T9[-1], JOGGING_START, linear=False)
-                    T10_orientation = [quaternion_slerp(T9_orientation[-1], IDLE_ORIENTATION, t) for t in np.linspace(0, 1, len(T10), endpoint=True)]
-                    self.travle_paths.append(T10)
-                    self.travle_orientation.append(T10_orientation)
-
-        if depbug_stage > 12:
-            T11 =  self.planner.generate_path(JOGGING_START, WORKING_POSITION, linear=False)
-            T11_orientation = [T10_orientation[-1] for _ in range(len(T11))]
-            self.travle_paths.append(T11)
-            self.travle_orientation.append(T11_orientation)
-
-        if depbug_stage > 13:
-            T12 =  self.planner.generate_path(WORKING_POSITION, IDLE_POSITION, linear=True)
-            T12_orientation = [T11_orientation[-1] for _ in range(len(T12))]
-            self.travle_paths.append(T12)
-            self.travle_orientation.append(T12_orientation)
-
-        # Plot the 3D paths
-        self.show_path()
+        self.compile_plan(False)
 
     def set_cart_data(self, cart_data):
         """Set the cart data for motion planning.
@@ -1700,24 +1350,22 @@ class MoshionPlanningPage(PageBase):
         Fetch information for each part in the cart from the PartsDatabase and store it in the part_info_dict.
         """
         
-        # Retrieve and store information for specified parts
-        for part_name_to_find in self.part_names_to_fetch:
-            part = self.parts_db.get_part_by_name(part_name_to_find)
-            if part:
-                # Construct a dictionary with part information
-                self.part_info_dict[part_name_to_find] = {
-                    'ID': part.ID,
-                    'PartName': part.name,
-                    'LocationX': ast.literal_eval(part.position)[0],
-                    'LocationY': ast.literal_eval(part.position)[1],
-                    'LocationZ': ast.literal_eval(part.position)[2],
-                    'Orientation': ast.literal_eval(part.orientation),
-                    'FullWeight': part.FullWeight,
-                    'HalfWeight': part.HalfWeight,
-                    'EmptyWeight': part.EmptyWeight,
-                    'CurrentWeight': part.CurrentWeight,
-                    'InService': part.InService
-                }
+        # Retrieve and store information for the whole order in one query
+        for part_name_to_find, part in self.parts_db.get_parts_by_names(self.part_names_to_fetch).items():
+            # Construct a dictionary with part information
+            self.part_info_dict[part_name_to_find] = {
+                'ID': part.ID,
+                'PartName': part.name,
+                'LocationX': part.position[0],
+                'LocationY': part.position[1],
+                'LocationZ': part.position[2],
+                'Orientation': part.orientation,
+                'FullWeight': part.FullWeight,
+                'HalfWeight': part.HalfWeight,
+                'EmptyWeight': part.EmptyWeight,
+                'CurrentWeight': part.CurrentWeight,
+                'InService': part.InService
+            }
         self.get_part_locations()
 
     def get_part_locations(self):
@@ -1737,126 +1385,17 @@ class MoshionPlanningPage(PageBase):
 
     def generate_robot_path(self):
         """Generate paths and velocity profiles for each part."""
+        self.compile_plan(True)
 
-        depbug_stage = 14
-        self.travle_paths = []
-        self.travle_orientation = []
-        travle_alinements = []
-        travle_stop = []
-        over_wrap = False
-        self.planner.clear_saved_paths()
+    def compile_plan(self, pickip_dropoff: bool):
+        """Compile the pick or return plan for the parts in locations and plot it.
 
-        # leav the idle position and 
-        if depbug_stage > 0:
-            T0 = self.planner.generate_path(IDLE_POSITION, WORKING_POSITION, linear=True)
-            T0_orientation = [IDLE_ORIENTATION for _ in range(len(T0))]
-
-            self.travle_paths.append(T0)
-            self.travle_orientation.append(T0_orientation)
-
-        # go to the drop off zone
-        if depbug_stage > 1:
-            T0 = self.planner.generate_path(WORKING_POSITION, JOGGING_START, linear=False)
-            T0_orientation = [T0_orientation[-1] for _ in range(len(T0))]
-
-            self.travle_paths.append(T0)
-            self.travle_orientation.append(T0_orientation)
-
-        for index, (location, orientation) in enumerate(zip(self.locations.values(), self.orientations.values())):
-            over_wrap = False
-            location = np.array(location) + Gripper_offset + [0, -RROTASHION_BUFFER_DIS, 0]
-
-            if depbug_stage > 2:
-                T1 = self.planner.generate_path(JOGGING_START, location, linear=False)
-
-                delta_angles = XY_angle(JOGGING_START, location)
-                if (-np.pi/2 > delta_angles >= -np.pi):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T1))
-                    over_wrap = True
-                elif (0 > delta_angles >= -np.pi/2):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T1))
-                elif (0 < delta_angles <= np.pi/2):
-                    delta_angles =  np.linspace(0, -np.pi/2, len(T1))
-                elif (np.pi/2 < delta_angles <= np.pi):
-                    delta_angles =  np.linspace(0, -np.pi, len(T1))
-
-                T1_orientation = [rotate_quaternion(T0_orientation[-1], rad, 0, 0) for rad in delta_angles]
-                insershion_point = np.dot(quaternion_to_rotation_matrix(T1_orientation[-1]), (0, 0, insershion_distance)) + location
-                self.travle_paths.append(T1)
-                self.travle_orientation.append(T1_orientation)
-
-            if depbug_stage > 3:
-                T2 = self.planner.generate_path(T1[-1], insershion_point, linear=True)
-                T2_orientation = [T1_orientation[-1] for _ in range(len(T2))]
-                self.travle_paths.append(T2)
-                self.travle_orientation.append(T2_orientation)
-
-            if depbug_stage > 4:
-                lifing_point = np.dot(quaternion_to_rotation_matrix(T2_orientation[-1]), (-lifting_distance, 0, 0)) + T2[-1]
-                T3 = self.planner.generate_path(insershion_point, lifing_point, linear=True)
-                T3_orientation = [T2_orientation[-1] for _ in range(len(T3))]
-                self.travle_paths.append(T3)
-                self.travle_orientation.append(T3_orientation)
-
-            if depbug_stage > 5:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T3_orientation[-1]), (0, 0, -insershion_distance)) + T3[-1]
-                T4 = self.planner.generate_path(lifing_point, retracked_point, linear=True)
-                T4_orientation = [T3_orientation[-1] for _ in range(len(T4))]
-                self.travle_paths.append(T4)
-                self.travle_orientation.append(T4_orientation)
-
-            if over_wrap:
-                TOW = self.planner.generate_path(T4[-1], JOGGING_START, linear=False)
-                TOW_orientation = [rotate_quaternion(T4_orientation[-1], 0, -rad, 0) for rad in delta_angles]
-                self.travle_paths.append(TOW)
-                self.travle_orientation.append(TOW_orientation)
-
-                Drop_off_hight = np.dot(quaternion_to_rotation_matrix(T4_orientation[-1]), (-Hight_drop_off_box, 0, 0)) + DROP_OFF_ZONE
-                T5 = self.planner.generate_path(TOW[-1], Drop_off_hight, linear=False)
-                delta_angles = np.linspace(0, -np.pi/2, len(T5), endpoint=True)
-                T5_orientation = [rotate_quaternion(TOW_orientation[-1], 0, rad, 0) for rad in delta_angles]
-                self.travle_paths.append(T5)
-                self.travle_orientation.append(T5_orientation)
-            else:
-                if depbug_stage > 6:
-                    Drop_off_hight = np.dot(quaternion_to_rotation_matrix(T4_orientation[-1]), (-Hight_drop_off_box, 0, 0)) + DROP_OFF_ZONE
-                    
-                    T5 = self.planner.generate_path(retracked_point, Drop_off_hight, linear=False)
-                    delta_angles = np.linspace(0, -np.pi, len(T5))
-                    T5_orientation = [rotate_quaternion(T4_orientation[-1], rad, 0, 0) for rad in delta_angles]
-                    self.travle_paths.append(T5)
-                    self.travle_orientation.append(T5_orientation)
-
-            if depbug_stage > 7:
-                T6 = self.planner.generate_path(T5[-1], DROP_OFF_ZONE, linear=True)
-                T6_orientation = [T5_orientation[-1] for _ in range(len(T6))]
-                self.travle_paths.append(T6)
-                self.travle_orientation.append(T6_orientation)
-
-            if depbug_stage > 8:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T6_orientation[-1]), (0, 0, -insershion_distance)) + T6[-1]
-                T7 = self.planner.generate_path(T6[-1], retracked_point, linear=True)
-                T7_orientation = [T6_orientation[-1] for _ in range(len(T7))]
-                self.travle_paths.append(T7)
-                self.travle_orientation.append(T7_orientation)
-
-            if depbug_stage > 9:
-                T8 = self.planner.generate_path(T7[-1], JOGGING_START, linear=False)
-                T8_orientation = [quaternion_slerp(T7_orientation[-1], JOGGING_START_ORIENTATION, t) for t in np.linspace(0, 1, len(T8), endpoint=True)]
-                self.travle_paths.append(T8)
-                self.travle_orientation.append(T8_orientation)
-
-        if depbug_stage > 10:
-            T9 = self.planner.generate_path(JOGGING_START, WORKING_POSITION, linear=False)
-            T9_orientation = [T8_orientation[-1] for _ in range(len(T9))]
-            self.travle_paths.append(T9)
-            self.travle_orientation.append(T9_orientation)
-
-        if depbug_stage > 11:
-            T10 = self.planner.generate_path(WORKING_POSITION, IDLE_POSITION, linear=True)
-            T10_orientation = [T9_orientation[-1] for _ in range(len(T10))]
-            self.travle_paths.append(T10)
-            self.travle_orientation.append(T10_orientation)
+        Args:
+            pickip_dropoff (bool): True to pick the parts, False to return them.
+        """
+        self.planner.clear_saved_paths()
+        self.plan = PlanCompiler(self.planner, **PLAN_SETTINGS).compile(self.locations, DROP_OFF_ZONE, pickip_dropoff)
+        self.travle_paths, self.travle_orientation = self.plan.paths(), self.plan.orientations()
 
         # Plot the 3D paths
         self.show_path()
@@ -1868,22 +1407,14 @@ class MoshionPlanningPage(PageBase):
         self.planner.clear_saved_paths()
 
     def animate_robot(self):
-        positions_ani = []
-        orientations_ani = []
-        travle_alinements = []
         if self.PathShow:
+            orientations_ani = self.plan.segment_rotation_matrices()
 
-            for i in range(len(self.travle_orientation)):
-                for j in range(len(self.travle_orientation[i])):
-                    ani = quaternion_to_rotation_matrix(self.travle_orientation[i][j])
-                    orientations_ani.append(ani)
-
-            for i in range(len(self.travle_paths)):
-                positions_ani.extend(self.travle_paths[i]) 
-
-            travle_alinements = ["all"] * len(positions_ani)
+            # Solve every segment on its own core, then animate the joint trajectory in order
+            segment_angles = np.concatenate(self.robot.calculate_ik_segments(self.travle_paths, orientations_ani))
 
-            self.robot.animate_ik(positions_ani, orientations_ani, travle_alinements)
+            # Skip the targets the IK could not solve
+            self.robot.animate_fk(segment_angles[np.all(np.isfinite(segment_angles), axis=1)])
         else:
             print("Must start sim")
    
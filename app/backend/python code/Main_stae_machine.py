@@ -4,7 +4,6 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import tkinter as tk
 from queue import LifoQueue
-import ast
 from scipy.spatial.transform import Rotation
 import random
 import threading
@@ -18,6 +17,8 @@ from Motors import *
 from VelocityPFP import *
 from moshionPlanning import *
 from Messager import *
+from quaternions import *
+from plan_compiler import *
 
 # plt.ion()
 
@@ -234,221 +235,6 @@ def handle_response(expected_r: str = None, expected_prefix: str = None, dataWri
                 print(f">>> {response}")
                 continue
 
-def rotation_matrix_to_quaternion(rotation_matrix: np.ndarray) -> np.ndarray:
-    """
-    Convert a 3x3 rotation matrix into a quaternion.
-
-    Args:
-        rotation_matrix (np.array): A 3x3 rotation matrix.
-
-    Returns:
-        np.array: A 4-element array representing the quaternion.
-    """
-    R = np.array(rotation_matrix, dtype=np.float64)
-    
-    trace = np.trace(R)
-    
-    if trace > 0:
-        S = 2.0 * np.sqrt(trace + 1.0)
-        qw = 0.25 * S
-        qx = (R[2, 1] - R[1, 2]) / S
-        qy = (R[0, 2] - R[2, 0]) / S
-        qz = (R[1, 0] - R[0, 1]) / S
-    elif (R[0, 0] > R[1, 1]) and (R[0, 0] > R[2, 2]):
-        S = 2.0 * np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
-        qw = (R[2, 1] - R[1, 2]) / S
-        qx = 0.25 * S
-        qy = (R[0, 1] + R[1, 0]) / S
-        qz = (R[0, 2] + R[2, 0]) / S
-    elif R[1, 1] > R[2, 2]:
-        S = 2.0 * np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
-        qw = (R[0, 2] - R[2, 0]) / S
-        qx = (R[0, 1] + R[1, 0]) / S
-        qy = 0.25 * S
-        qz = (R[1, 2] + R[2, 1]) / S
-    else:
-        S = 2.0 * np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
-        qw = (R[1, 0] - R[0, 1]) / S
-        qx = (R[0, 2] + R[2, 0]) / S
-        qy = (R[1, 2] + R[2, 1]) / S
-        qz = 0.25 * S
-    
-    quaternion = np.array([qw, qx, qy, qz])
-
-    return quaternion
-
-def quaternion_to_rotation_matrix(quaternion: np.ndarray) -> np.ndarray:
-    """
-    Convert a quaternion into a 3x3 rotation matrix.
-
-    Args:
-        quaternion (list or np.array): A 4-element list or array representing the quaternion.
-
-    Returns:
-        np.array: A 3x3 rotation matrix.
-    """
-    q = np.array(quaternion, dtype=np.float64)
-    q = q / np.linalg.norm(q)
-
-    w, x, y, z = q
-    rotation_matrix = np.array([[1 - 2*y*y - 2*z*z, 2*x*y - 2*w*z, 2*x*z + 2*w*y],
-                                 [2*x*y + 2*w*z, 1 - 2*x*x - 2*z*z, 2*y*z - 2*w*x],
-                                 [2*x*z - 2*w*y, 2*y*z + 2*w*x, 1 - 2*x*x - 2*y*y]])
-
-    return rotation_matrix
-
-def quaternion_multiply_2q(q1: np.ndarray, q2: np.ndarray) -> np.ndarray :
-    """
-    Multiply two quaternions.
-
-    Args:
-        q1 (np.array): The first quaternion [w, x, y, z].
-        q2 (np.array): The second quaternion [w, x, y, z].
-
-    Returns:
-        np.array: The resulting quaternion.
-    """
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
-    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
-    return np.array([w, x, y, z])
-
-def rotate_quaternion(quat: np.ndarray, angle_x:float, angle_y:float, angle_z:float) -> np.ndarray :
-    """
-    Rotate a quaternion around the unit vectors.
-
-    Args:
-        quat (np.array): The original quaternion [w, x, y, z].
-        angle_x (float): Angle to rotate around the x-axis (in radians).
-        angle_y (float): Angle to rotate around the y-axis (in radians).
-        angle_z (float): Angle to rotate around the z-axis (in radians).
-
-    Returns:
-        np.array: The rotated quaternion [w, x, y, z].
-    """
-    # Quaternion representing the rotation around x-axis
-    qx = np.array([np.cos(angle_x / 2), np.sin(angle_x / 2), 0, 0])
-    
-    # Quaternion representing the rotation around y-axis
-    qy = np.array([np.cos(angle_y / 2), 0, np.sin(angle_y / 2), 0])
-    
-    # Quaternion representing the rotation around z-axis
-    qz = np.array([np.cos(angle_z / 2), 0, 0, np.sin(angle_z / 2)])
-    
-    # Combine the rotations by quaternion multiplication
-    rotated_quat = quaternion_multiply_2q(quaternion_multiply_2q(quaternion_multiply_2q(quat, qx), qy), qz)
-
-    return rotated_quat
-
-def quaternion_slerp(q1: np.ndarray, q2: np.ndarray, t: float) -> np.ndarray:
-    """
-    Perform spherical linear interpolation (slerp) between two quaternions.
-
-    Args:
-        q1 (numpy.ndarray): The first quaternion as a 4-element numpy array [w, x, y, z].
-        q2 (numpy.ndarray): The second quaternion as a 4-element numpy array [w, x, y, z].
-        t (float): Interpolation parameter. It ranges from 0 to 1. 
-                   For t=0, the resulting quaternion is equal to q1.
-                   For t=1, the resulting quaternion is equal to q2.
-
-    Returns:
-        numpy.ndarray: The interpolated quaternion as a 4-element numpy array [w, x, y, z].
-    """
-    # Ensure quaternions are normalized
-    q1 = q1 / np.linalg.norm(q1)
-    q2 = q2 / np.linalg.norm(q2)
-
-    dot_product = np.dot(q1, q2)
-    
-    # Determine the sign
-    if dot_product < 0.0:
-        q1 = -q1
-        dot_product = -dot_product
-
-    # Clamp dot product to ensure stability
-    dot_product = min(1.0, max(-1.0, dot_product))
-    
-    # Calculate the angle between the quaternions
-    theta_0 = np.arccos(dot_product)
-    sin_theta_0 = np.sin(theta_0)
-    
-    # Perform interpolation
-    s0 = np.sin((1 - t) * theta_0) / sin_theta_0
-    s1 = np.sin(t * theta_0) / sin_theta_0
-    
-    return (s0 * q1) + (s1 * q2)
-
-def quaternion_to_euler(quaternion):
-    """Convert quaternion to Euler angles.
-
-    Args:
-        quaternion (np.array): Quaternion in the form [w, x, y, z].
-
-    Returns:
-        np.array: Euler angles in the form [roll, pitch, yaw].
-    """
-    w, x, y, z = quaternion
-    # Roll (x-axis rotation)
-    sinr_cosp = 2.0 * (w * x + y * z)
-    cosr_cosp = 1.0 - 2.0 * (x * x + y * y)
-    roll = np.arctan2(sinr_cosp, cosr_cosp)
-
-    # Pitch (y-axis rotation)
-    sinp = 2.0 * (w * y - z * x)
-    if np.abs(sinp) >= 1:
-        pitch = np.sign(sinp) * np.pi / 2  # Use +/-90 degrees if out of range
-    else:
-        pitch = np.arcsin(sinp)
-
-    # Yaw (z-axis rotation)
-    siny_cosp = 2.0 * (w * z + x * y)
-    cosy_cosp = 1.0 - 2.0 * (y * y + z * z)
-    yaw = np.arctan2(siny_cosp, cosy_cosp)
-
-    return np.array([roll, pitch, yaw])
-
-def rotation_matrix_to_euler_angles(R: np.ndarray):
-    """
-    Convert a 3x3 rotation matrix to Euler angles.
-
-    Parameters:
-    R : numpy.ndarray
-        3x3 rotation matrix.
-
-    Returns:
-    numpy.ndarray
-        Euler angles in radians as [roll, pitch, yaw].
-        
-    Notes:
-        - This function assumes the rotation matrix represents a proper rotation (orthogonal matrix).
-        - Gimbal lock may occur when the pitch angle approaches ±90 degrees.
-          In such cases, the resulting roll and yaw angles may become ambiguous.
-          Consider handling gimbal lock cases accordingly in your application.
-    """
-    # Input validation
-    if R.shape != (3, 3):
-        raise ValueError("Input matrix must be a 3x3 array.")
-
-    # Calculate sin of pitch angle
-    sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
-    
-    # Check for gimbal lock
-    singular = sy < 1e-6
-
-    if not singular:
-        roll = np.arctan2(R[2, 1], R[2, 2])
-        pitch = np.arctan2(-R[2, 0], sy)
-        yaw = np.arctan2(R[1, 0], R[0, 0])
-    else:
-        roll = np.arctan2(-R[1, 2], R[1, 1])
-        pitch = np.arctan2(-R[2, 0], sy)
-        yaw = 0
-
-    return np.array([roll, pitch, yaw])
-
 LARGE_FONT = ("Verdana", 12)
 DROP_OFF_ZONE = (0, -0.73, 0.03)
 DROP_OFF_ORIENTATION = rotate_quaternion([1, 0, 0, 0], np.pi/2, 0, np.pi)
@@ -468,6 +254,13 @@ lifting_distance = 0.015
 Hight_drop_off_box = 0.1
 Gripper_offset = [0, -0.2, 0.006]
 
+PLAN_SETTINGS = dict(idle_position=IDLE_POSITION, idle_orientation=IDLE_ORIENTATION, working_position=WORKING_POSITION,
+                     jogging_start=JOGGING_START, jogging_orientation=JOGGING_START_ORIENTATION,
+                     drop_off_orientation=DROP_OFF_ORIENTATION, weighting_position=WEIGHTING_POSITION,
+                     weighting_orientation=WEIGHTING_ORIENTATION, insertion_distance=insershion_distance,
+                     lifting_distance=lifting_distance, drop_off_height=Hight_drop_off_box,
+                     gripper_offset=np.array(Gripper_offset) + [0, -RROTASHION_BUFFER_DIS, 0])
+
 NORTH_WALL = (0.0, 1.0, 0.0)
 EAST_WALL = (1.0, 0.0, 0.0)
 WEST_WALL = (-1.0, 0.0, 0.0)
@@ -522,22 +315,20 @@ def state1(part_names_to_fetch, parts_db):
                 - 'InService': Flag indicating if the part is in service
     """
     part_info_dict = {}
-    for part_name_to_find in part_names_to_fetch:
-        # Get part information from the parts database
-        part = parts_db.get_part_by_name(part_name_to_find)
-        if part:
-            # Construct a dictionary with part information
-            part_info_dict[part_name_to_find] = {
-                'PartName': part.name,
-                'LocationX': ast.literal_eval(part.position)[0],
-                'LocationY': ast.literal_eval(part.position)[1],
-                'LocationZ': ast.literal_eval(part.position)[2],
-                'Orientation': ast.literal_eval(part.orientation),
-                'FullWeight': part.FullWeight,
-                'HalfWeight': part.HalfWeight,
-                'EmptyWeight': part.EmptyWeight,
-                'InService': part.InService
-            }
+    # Get part information for the whole order from the parts database in one query
+    for part_name_to_find, part in parts_db.get_parts_by_names(part_names_to_fetch).items():
+        # Construct a dictionary with part information
+        part_info_dict[part_name_to_find] = {
+            'PartName': part.name,
+            'LocationX': part.position[0],
+            'LocationY': part.position[1],
+            'LocationZ': part.position[2],
+            'Orientation': part.orientation,
+            'FullWeight': part.FullWeight,
+            'HalfWeight': part.HalfWeight,
+            'EmptyWeight': part.EmptyWeight,
+            'InService': part.InService
+        }
     return part_info_dict
 
 def state2(part_info_dict):
@@ -583,247 +374,14 @@ def state3(pickip_dropoff,locations, orientations, drop_off_zone, planner):
     Returns:
         tuple: A tuple containing lists of travel paths, orientations, and alignment flags for the robotic arm.
             - travle_paths (list): List of travel paths for the robotic arm.
-            - travle_orientation (list): List of orientations corresponding to the travel paths.
+            - travle_orientation (list): List of (n, 4) quaternion arrays corresponding to the travel paths.
             - travle_alinements (list): List of alignment flags for the robotic arm.
     """
-    depbug_stage = 14
-    travle_paths = []
-    travle_orientation = []
-    travle_alinements = []
-    travle_stop = []
-    over_wrap = False
-
-
-    # leav the idle position and 
-    if depbug_stage > 0:
-        T0 = planner.generate_path(IDLE_POSITION, WORKING_POSITION, linear=True)
-        T0_orientation = [IDLE_ORIENTATION for _ in range(len(T0))]
-
-        travle_paths.append(T0)
-        travle_orientation.append(T0_orientation)
-
-    # go to the drop off zone
-    if depbug_stage > 1:
-        T0 = planner.generate_path(WORKING_POSITION, JOGGING_START, linear=False)
-        T0_orientation = [T0_orientation[-1] for _ in range(len(T0))]
-
-        travle_paths.append(T0)
-        travle_orientation.append(T0_orientation)
-
-    if pickip_dropoff:
-        for index, (location, orientation) in enumerate(zip(locations.values(), orientations.values())):
-            over_wrap = False
-            location = np.array(location) + Gripper_offset + [0, -RROTASHION_BUFFER_DIS, 0]
-
-            if depbug_stage > 2:
-                T1 = planner.generate_path(JOGGING_START, location, linear=False)
-
-                delta_angles = XY_angle(JOGGING_START, location)
-                if (-np.pi/2 > delta_angles >= -np.pi):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T1))
-                    over_wrap = True
-                elif (0 > delta_angles >= -np.pi/2):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T1))
-                elif (0 < delta_angles <= np.pi/2):
-                    delta_angles =  np.linspace(0, -np.pi/2, len(T1))
-                elif (np.pi/2 < delta_angles <= np.pi):
-                    delta_angles =  np.linspace(0, -np.pi, len(T1))
-
-                T1_orientation = [rotate_quaternion(T0_orientation[-1], rad, 0, 0) for rad in delta_angles]
-                insershion_point = np.dot(quaternion_to_rotation_matrix(T1_orientation[-1]), (0, 0, insershion_distance)) + location
-                travle_paths.append(T1)
-                travle_orientation.append(T1_orientation)
-
-            if depbug_stage > 3:
-                T2 = planner.generate_path(T1[-1], insershion_point, linear=True)
-                T2_orientation = [T1_orientation[-1] for _ in range(len(T2))]
-                travle_paths.append(T2)
-                travle_orientation.append(T2_orientation)
-
-            if depbug_stage > 4:
-                lifing_point = np.dot(quaternion_to_rotation_matrix(T2_orientation[-1]), (-lifting_distance, 0, 0)) + T2[-1]
-                T3 = planner.generate_path(insershion_point, lifing_point, linear=True)
-                T3_orientation = [T2_orientation[-1] for _ in range(len(T3))]
-                travle_paths.append(T3)
-                travle_orientation.append(T3_orientation)
-
-            if depbug_stage > 5:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T3_orientation[-1]), (0, 0, -insershion_distance)) + T3[-1]
-                T4 = planner.generate_path(lifing_point, retracked_point, linear=True)
-                T4_orientation = [T3_orientation[-1] for _ in range(len(T4))]
-                travle_paths.append(T4)
-                travle_orientation.append(T4_orientation)
-
-            if over_wrap:
-                TOW = planner.generate_path(T4[-1], JOGGING_START, linear=False)
-                TOW_orientation = [rotate_quaternion(T4_orientation[-1], 0, -rad, 0) for rad in delta_angles]
-                travle_paths.append(TOW)
-                travle_orientation.append(TOW_orientation)
-
-                Drop_off_hight = np.dot(quaternion_to_rotation_matrix(T4_orientation[-1]), (-Hight_drop_off_box, 0, 0)) + drop_off_zone
-                T5 = planner.generate_path(TOW[-1], Drop_off_hight, linear=False)
-                delta_angles = np.linspace(0, -np.pi/2, len(T5), endpoint=True)
-                T5_orientation = [rotate_quaternion(TOW_orientation[-1], 0, rad, 0) for rad in delta_angles]
-                travle_paths.append(T5)
-                travle_orientation.append(T5_orientation)
-            else:
-                if depbug_stage > 6:
-                    Drop_off_hight = np.dot(quaternion_to_rotation_matrix(T4_orientation[-1]), (-Hight_drop_off_box, 0, 0)) + drop_off_zone
-                    
-                    T5 = planner.generate_path(retracked_point, Drop_off_hight, linear=False)
-                    delta_angles = np.linspace(0, -np.pi, len(T5))
-                    T5_orientation = [rotate_quaternion(T4_orientation[-1], rad, 0, 0) for rad in delta_angles]
-                    travle_paths.append(T5)
-                    travle_orientation.append(T5_orientation)
-
-            if depbug_stage > 7:
-                T6 = planner.generate_path(T5[-1], drop_off_zone, linear=True)
-                T6_orientation = [T5_orientation[-1] for _ in range(len(T6))]
-                travle_paths.append(T6)
-                travle_orientation.append(T6_orientation)
-
-            if depbug_stage > 8:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T6_orientation[-1]), (0, 0, -insershion_distance)) + T6[-1]
-                T7 = planner.generate_path(T6[-1], retracked_point, linear=True)
-                T7_orientation = [T6_orientation[-1] for _ in range(len(T7))]
-                travle_paths.append(T7)
-                travle_orientation.append(T7_orientation)
-
-            if depbug_stage > 9:
-                T8 = planner.generate_path(T7[-1], JOGGING_START, linear=False)
-                T8_orientation = [quaternion_slerp(T7_orientation[-1], JOGGING_START_ORIENTATION, t) for t in np.linspace(0, 1, len(T8), endpoint=True)]
-                travle_paths.append(T8)
-                travle_orientation.append(T8_orientation)
-
-        if depbug_stage > 10:
-            T9 = planner.generate_path(JOGGING_START, WORKING_POSITION, linear=False)
-            T9_orientation = [T8_orientation[-1] for _ in range(len(T9))]
-            travle_paths.append(T9)
-            travle_orientation.append(T9_orientation)
-
-        if depbug_stage > 11:
-            T10 = planner.generate_path(WORKING_POSITION, IDLE_POSITION, linear=True)
-            T10_orientation = [T9_orientation[-1] for _ in range(len(T10))]
-            travle_paths.append(T10)
-            travle_orientation.append(T10_orientation)
-    else:
-        for index, (location, orientation) in enumerate(zip(locations.values(), orientations.values())):
-            over_wrap = False
-            location = np.array(location) + Gripper_offset + [0, -RROTASHION_BUFFER_DIS, 0]
-
-            if depbug_stage > 2:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, 0, -insershion_distance)) + drop_off_zone
-                T1 = planner.generate_path(JOGGING_START, Pickup_point, linear=False)
-                T1_orientation = [quaternion_slerp(T0_orientation[-1], DROP_OFF_ORIENTATION, t) for t in np.linspace(0, 1, len(T1), endpoint=True)]
-                travle_paths.append(T1)
-                travle_orientation.append(T1_orientation)
-
-            if depbug_stage > 3:
-                T2 = planner.generate_path(T1[-1], drop_off_zone, linear=True)
-                T2_orientation = [T1_orientation[-1] for _ in range(len(T2))]
-                travle_paths.append(T2)
-                travle_orientation.append(T2_orientation)
-
-            if depbug_stage > 4:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + drop_off_zone
-                T3 = planner.generate_path(T2[-1], Pickup_point, linear=True)
-                T3_orientation = [T2_orientation[-1] for _ in range(len(T3))]
-                travle_paths.append(T3)
-                travle_orientation.append(T3_orientation)
-
-            if depbug_stage > 5:
-                T4 = planner.generate_path(T3[-1], WEIGHTING_POSITION, linear=True)
-                T4_orientation = [WEIGHTING_ORIENTATION for _ in range(len(T4))]
-                travle_paths.append(T4)
-                travle_orientation.append(T4_orientation)
-                travle_stop.append(5)
-
-
-            if depbug_stage > 6:
-                Pickup_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + WEIGHTING_POSITION
-                T5 = planner.generate_path(T4[-1], Pickup_point, linear=True)
-                T5_orientation = [WEIGHTING_ORIENTATION for _ in range(len(T5))]
-                travle_paths.append(T5)
-                travle_orientation.append(T5_orientation)
-
-
-            if depbug_stage > 7:
-                T6 = planner.generate_path(T5[-1], location, linear=False)
-
-                delta_angles = XY_angle(T5[-1], location)
-                if (-np.pi/2 > delta_angles >= -np.pi):
-                    delta_angles =  np.linspace(0, np.pi, len(T6), endpoint=True)
-                elif (0 > delta_angles >= -np.pi/2):
-                    delta_angles =  np.linspace(0, np.pi/2, len(T6), endpoint=True)
-                elif (0 < delta_angles <= np.pi/2):
-                    delta_angles =  np.linspace(0, -np.pi/2, len(T6), endpoint=True)
-                elif (np.pi/2 < delta_angles <= np.pi):
-                    over_wrap = True
-                    delta_angles =  np.linspace(0, -np.pi, len(T6), endpoint=True)
-                
-                T6_orientation = [rotate_quaternion(T5_orientation[-1], 0, rad, 0) for rad in delta_angles]
-                travle_paths.append(T6)
-                travle_orientation.append(T6_orientation)
-
-            if depbug_stage > 8:
-                insershion_point = np.dot(quaternion_to_rotation_matrix(T6_orientation[-1]), (0, 0, insershion_distance)) + location
-                T7 = planner.generate_path(location, insershion_point, linear=True)
-                T7_orientation =  [T6_orientation[-1] for _ in range(len(T7))]
-                travle_paths.append(T7)
-                travle_orientation.append(T7_orientation)
-
-            if depbug_stage > 9:
-                lifing_point = np.dot(quaternion_to_rotation_matrix(T7_orientation[-1]), (0, lifting_distance, 0)) + T7[-1]
-                T8 = planner.generate_path(T7[-1], lifing_point, linear=True)
-                T8_orientation = [T7_orientation[-1] for _ in range(len(T8))]
-                travle_paths.append(T8)
-                travle_orientation.append(T8_orientation)
-
-            if depbug_stage > 10:
-                retracked_point = np.dot(quaternion_to_rotation_matrix(T8_orientation[-1]), (0, 0, -insershion_distance)) + T8[-1]
-                T9 = planner.generate_path(T8[-1], retracked_point, linear=True)
-                T9_orientation = [T8_orientation[-1] for _ in range(len(T9))]
-                travle_paths.append(T9)
-                travle_orientation.append(T9_orientation)
-
-            if over_wrap:
-                TOW_MID_point = np.dot(quaternion_to_rotation_matrix(DROP_OFF_ORIENTATION), (0, -Hight_drop_off_box, 0)) + WEIGHTING_POSITION
-                TOW = planner.generate_path(T9[-1], TOW_MID_point, linear=False)
-                TOW_orientation = [rotate_quaternion(T9_orientation[-1], 0, -rad, 0) for rad in delta_angles]
-                travle_paths.append(TOW)
-                travle_orientation.append(TOW_orientation)
-
-                if depbug_stage > 11:
-                    T10= planner.generate_path(TOW[-1], JOGGING_START, linear=False)
-                    T10_orientation = [quaternion_slerp(TOW_orientation[-1], IDLE_ORIENTATION, t) for t in np.linspace(0, 1, len(T10), endpoint=True)]
-                    travle_paths.append(T10)
-                    travle_orientation.append(T10_orientation)
-      
-            else:
-
-                if depbug_stage > 11:
-                    T10= planner.generate_path(T9[-1], JOGGING_START, linear=False)
-                    T10_orientation = [quaternion_slerp(T9_orientation[-1], IDLE_ORIENTATION, t) for t in np.linspace(0, 1, len(T10), endpoint=True)]
-                    travle_paths.append(T10)
-                    travle_orientation.append(T10_orientation)
-
-        if depbug_stage > 12:
-            T11 = planner.generate_path(JOGGING_START, WORKING_POSITION, linear=False)
-            T11_orientation = [T10_orientation[-1] for _ in range(len(T11))]
-            travle_paths.append(T11)
-            travle_orientation.append(T11_orientation)
-
-        if depbug_stage > 13:
-            T12 = planner.generate_path(WORKING_POSITION, IDLE_POSITION, linear=True)
-            T12_orientation = [T11_orientation[-1] for _ in range(len(T12))]
-            travle_paths.append(T12)
-            travle_orientation.append(T12_orientation)
-
-    travle_alinements = ["all"] * len(travle_paths)
+    plan = PlanCompiler(planner, **PLAN_SETTINGS).compile(locations, drop_off_zone, pickip_dropoff)
 
     planner.plot_3d_path()
     
-    return travle_paths, travle_orientation, travle_alinements, travle_stop
+    return plan.as_lists()
 
 def state4(travle_paths, travle_orientation, travle_alinements, urdf_file_path, travle_stop):
     """
@@ -837,26 +395,21 @@ def state4(travle_paths, travle_orientation, travle_alinements, urdf_file_path,
         travle_stop (list): when to stop puase the robot
     """
     # Initialize the RobotArm with the URDF file path
-    robot = RobotArm(urdf_file_path, IDLE_AGLE_POSITION)
+    robot = RobotArm(urdf_file_path, IDLE_AGLE_POSITION, ik_cache_size=IK_CACHE_SIZE)
 
-    orientations_ani = []
-    for i in range(len(travle_orientation)):
-        for j in range(len(travle_orientation[i])):
-            ani = quaternion_to_rotation_matrix(travle_orientation[i][j])
-            orientations_ani.append(ani)
+    orientations_ani = [quaternions_to_rotation_matrices(orientation) for orientation in travle_orientation]
 
-    positions_ani = []
-    for i in range(len(travle_paths)):
-        positions_ani.extend(travle_paths[i])
+    # Solve every segment on its own core, then animate the joint trajectory in order
+    segment_angles = robot.calculate_ik_segments(travle_paths, orientations_ani)
+    angles_ani = np.concatenate(segment_angles)
+    angles_ani = angles_ani[np.all(np.isfinite(angles_ani), axis=1)]  # Skip the targets the IK could not solve
 
     fig, ax = plt.subplots(subplot_kw={'projection': '3d'}, figsize=(12, 8))
     ax.set_xlim3d(-1, 1)
     ax.set_ylim3d(-1, 1)
     ax.set_zlim3d(-1, 1)
 
-    travle_alinements = ["all"] * len(positions_ani)
-
-    robot.animate_ik(positions_ani, orientations_ani, travle_alinements, ax=ax, fig=fig)
+    robot.animate_fk(angles_ani, ax=ax, fig=fig)
 
 
 
@@ -991,9 +544,7 @@ def joggingXYZ(init_angles):
         # get the dirsired quaternion
         end_quaternion = rotate_quaternion([1, 0, 0, 0], inputs[3], inputs[4], inputs[5])
 
-        for t in np.linspace(0, 1, 50):
-            V_rot_theta = quaternion_slerp(Pre_ORI, end_quaternion, t)
-            New_ORI.append(quaternion_to_rotation_matrix(V_rot_theta))
+        New_ORI = list(quaternions_to_rotation_matrices(quaternion_slerp_batch(Pre_ORI, end_quaternion, np.linspace(0, 1, 50))))
 
         COR_path = [Pre_COR for _ in range(0, len(New_ORI), 1)]
         New_ORI_MODE = ["all" for _ in range(0, len(New_ORI), 1)]
@@ -1083,7 +634,7 @@ def joggingXYZ(init_angles):
     COR_planner = PathPlanner(max_acc, max_vel)
 
     urdf_file_path = "app\\backend\\python code\\urdf_tes2.urdf"
-    robot = RobotArm(urdf_file_path, init_angles)
+    robot = RobotArm(urdf_file_path, init_angles, ik_cache_size=IK_CACHE_SIZE)
     FK = robot.calculate_fk([init_angles], 1)
 
     controll = []
@@ -1140,71 +691,28 @@ def joggingAngles(init_angles):
         entry.grid(row=i, column=1)
         angle_entries.append(entry)
 
-    BaceRotate = MotionProfileGenerator(13, 12, 'Shoulder Rotate Motor')
-    SholderLift = MotionProfileGenerator(13, 12, 'Shoulder Lift Motor')
-    Elbow = MotionProfileGenerator(13, 12, 'Elbow Motor')
-    ElbowRotate = MotionProfileGenerator(13, 12, 'Forearm Rotate Motor')
-    Wrist = MotionProfileGenerator(13, 12, 'Wrist Motor')
-    WristRotate = MotionProfileGenerator(13, 12, 'Wrist Rotate Motor')
-    
     def send_angles():
         nonlocal TRANFORM_MASK
 
         new_angles = list(float(entry.get()) for entry in angle_entries)
         last_angle = np.rad2deg([robot.last_angles[1],robot.last_angles[2], robot.last_angles[4], robot.last_angles[5], robot.last_angles[7], robot.last_angles[8]])
 
-        BaceRotate.Set_displacement(abs(new_angles[0] - last_angle[0]))
-        SholderLift.Set_displacement(abs(new_angles[1] - last_angle[1]))
-        Elbow.Set_displacement(abs(new_angles[2] - last_angle[2]))
-        ElbowRotate.Set_displacement(abs(new_angles[3] - last_angle[3]))
-        Wrist.Set_displacement(abs(new_angles[4] - last_angle[4]))
-        WristRotate.Set_displacement(abs(new_angles[5] - last_angle[5]))
-
-
-
-        sys_time = max(BaceRotate.move_time, 
-                       SholderLift.move_time, 
-                       Elbow.move_time, 
-                       ElbowRotate.move_time, 
-                       Wrist.move_time, 
-                       WristRotate.move_time)
+        # Shared move time of the six motors (13 deg/s^2, 12 deg/s limits)
+        displacements = np.array(new_angles) - last_angle
+        sys_time = synchronized_move_time(displacements, 13, 12)
         
         if sys_time >0:
-            BaceRotate.Set_move_time(sys_time)
-            SholderLift.Set_move_time(sys_time)
-            Elbow.Set_move_time(sys_time)
-            ElbowRotate.Set_move_time(sys_time)
-            Wrist.Set_move_time(sys_time)
-            WristRotate.Set_move_time(sys_time)
-
             # Generate time values for motion profiles
             time_values = np.linspace(0, sys_time, int(sys_time/0.05))
 
-            BaceRotate.Generator_profile(time_values)
-            SholderLift.Generator_profile(time_values)
-            Elbow.Generator_profile(time_values)
-            ElbowRotate.Generator_profile(time_values)
-            Wrist.Generator_profile(time_values)
-            WristRotate.Generator_profile(time_values)
-
-            BaceDisplacement = last_angle[0] + BaceRotate.displacements if new_angles[0] - last_angle[0] > 0 else last_angle[0] - BaceRotate.displacements
-            SholderLiftDisplacement = last_angle[1] + SholderLift.displacements if new_angles[1] - last_angle[1] > 0 else last_angle[1] - SholderLift.displacements
-            ElbowDisplacement = last_angle[2] + Elbow.displacements if new_angles[2] - last_angle[2] > 0 else last_angle[2] - Elbow.displacements
-            ElbowRotateDisplacement = last_angle[3] + ElbowRotate.displacements if new_angles[3] - last_angle[3] > 0 else last_angle[3] - ElbowRotate.displacements
-            WristDisplacement = last_angle[4] + Wrist.displacements if new_angles[4] - last_angle[4] > 0 else last_angle[4] - Wrist.displacements
-            WristRotateDisplacement = last_angle[5] + WristRotate.displacements if new_angles[5] - last_angle[5] > 0 else last_angle[5] - WristRotate.displacements
-
-            combined_arrays  = list(zip(BaceDisplacement, 
-                                        SholderLiftDisplacement, 
-                                        ElbowDisplacement, 
-                                        ElbowRotateDisplacement, 
-                                        WristDisplacement, 
-                                        WristRotateDisplacement))
+            _, profiles = generate_synchronized_profiles(displacements, 13, 12, time_values, sys_time)
+
+            combined_arrays  = list(zip(*(last_angle[:, None] + profiles)))
             
             for move in combined_arrays:
                 print(move)
             
-            movement_results = controller.move_motors(combined_arrays)
+            movement_results = controller.move_motors(controller.decimate(combined_arrays))
 
 
             for  move in movement_results:
@@ -1215,24 +723,7 @@ def joggingAngles(init_angles):
                 MoveTime += [int(num) for num in move.strip().split(',')][-1]
             print(f"Move time in seconts: {MoveTime * 1e-6} Sec")
 
-            expected_response = "MoshionState changed to: 1"
-            MSG.send_message(f"R_MOVES {len(movement_results)}")
-            handle_response(expected_response, None, None, MSG.message_stack) # weight until i get the my response
-            
-
-            expected_response = f"storing {len(movement_results)}"
-            MSG.send_message(f"R_MOSHION {len(movement_results)}")
-            handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-            
-
-            expected_response = "MoshionState changed to: 2"
-            for move in movement_results:
-                MSG.send_message(move)
-            handle_response(expected_response, None, None, MSG.message_stack) # weight until i get the my response
-
-            expected_response = "MoshionState changed to: 0"
-            MSG.send_message(f"R_EXECUTE {len(movement_results)}")
-            handle_response(expected_response, None, None, MSG.message_stack) # weight until i get the my response
+            MSG.run_moshion(movement_results) # weight until the robot has finished the move
 
         new_angles = np.deg2rad([0, new_angles[0], new_angles[1], 0, new_angles[2], new_angles[3], 0, new_angles[4], new_angles[5]])
         FK = robot.calculate_fk([new_angles], 1)
@@ -1,22 +1,378 @@
 import serial
+import struct
+import binascii
 import threading
 import time
-from queue import LifoQueue
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from queue import Queue, Empty
+
+# Binary moshion point frame, matching fermwar_4/EXECUTION.h:
+# FRAME_SYNC, uint16 payload length, 6 frequencies and the time as int32, uint16 CRC-16/CCITT
+# of the length and payload. Everything is little-endian. BIN2 frames put a uint32 sequence
+# number in front of the point.
+FRAME_SYNC = b"\xA5\x5A"
+POINT_STRUCT = struct.Struct("<7i")
+SEQUENCED_POINT_STRUCT = struct.Struct("<I7i")
+FRAME_LENGTH = struct.Struct("<H")
+FRAME_CRC = struct.Struct("<H")
+
+def crc16_ccitt(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT (polynomial 0x1021) as computed by the firmware's crc16_ccitt.
+
+    Args:
+        data (bytes): Bytes to checksum.
+        crc (int, optional): Initial CRC value. Defaults to 0xFFFF.
+
+    Returns:
+        int: The CRC of the data.
+    """
+    return binascii.crc_hqx(data, crc)
+
+def pack_point_frame(point, sequence: int = None) -> bytes:
+    """Pack one moshion point into a binary frame.
+
+    Args:
+        point (str | sequence): Either a text point "f1, f2, f3, f4, f5, f6, time" as built by
+            MoshionController.move_motors or the seven integers themselves.
+        sequence (int, optional): Sequence number of a BIN2 frame. Defaults to None for a BIN1 frame.
+
+    Returns:
+        bytes: The framed point.
+    """
+    if isinstance(point, str):
+        point = point.strip().split(',')
+    values = [int(value) for value in point]
+    if sequence is None:
+        payload = POINT_STRUCT.pack(*values)
+    else:
+        payload = SEQUENCED_POINT_STRUCT.pack(sequence, *values)
+    body = FRAME_LENGTH.pack(len(payload)) + payload
+    return FRAME_SYNC + body + FRAME_CRC.pack(crc16_ccitt(body))
+
+def unpack_point_frame(frame: bytes, sequenced: bool = False) -> tuple:
+    """Unpack a binary frame built by pack_point_frame.
+
+    Args:
+        frame (bytes): The framed point.
+        sequenced (bool, optional): Whether the frame is a BIN2 frame. Defaults to False.
+
+    Raises:
+        ValueError: If the sync word, length or CRC is wrong.
+
+    Returns:
+        tuple: The six frequencies followed by the time, led by the sequence number for BIN2 frames.
+    """
+    layout = SEQUENCED_POINT_STRUCT if sequenced else POINT_STRUCT
+    if frame[:len(FRAME_SYNC)] != FRAME_SYNC:
+        raise ValueError("Point frame is missing its sync word")
+    body = frame[len(FRAME_SYNC):-FRAME_CRC.size]
+    (length,) = FRAME_LENGTH.unpack_from(body)
+    if length != layout.size or len(body) != FRAME_LENGTH.size + length:
+        raise ValueError(f"Point frame has a bad length of {length}")
+    (crc,) = FRAME_CRC.unpack(frame[-FRAME_CRC.size:])
+    if crc16_ccitt(body) != crc:
+        raise ValueError("Point frame failed its CRC check")
+    return layout.unpack_from(body, FRAME_LENGTH.size)
 
 class RobotConnectionTimeout(Exception):
     pass
 
+class MessageBus:
+    """FIFO dispatcher for the lines received from the robot.
+
+    The reader thread puts every line on the bus. A line goes to every subscriber whose prefix
+    it starts with and resolves every pending expectation it matches. Lines nobody claimed are
+    kept, oldest first, in a bounded backlog read with the Queue style get, so code written
+    against the old message stack keeps working.
+    """
+
+    BACKLOG_SIZE = 1000
+
+    def __init__(self, backlog_size: int = None):
+        """Initialize the MessageBus instance.
+
+        Args:
+            backlog_size (int, optional): Unclaimed lines to keep, the oldest are dropped first. Defaults to BACKLOG_SIZE.
+        """
+        self._backlog = deque(maxlen=backlog_size or self.BACKLOG_SIZE)
+        self._condition = threading.Condition()
+        self._subscribers = {}
+        self._expectations = []
+        self._next_handle = 0
+
+    def put(self, message: str):
+        """Dispatch one received line.
+
+        Subscriber callbacks run on the calling thread, normally the reader thread, so they
+        should return quickly.
+
+        Args:
+            message (str): The received line.
+        """
+        with self._condition:
+            callbacks = [callback for prefix, callback in self._subscribers.values() if message.startswith(prefix)]
+            matched = [future for expected, prefix, future in self._expectations
+                       if not future.done() and (message == expected if prefix is None else message.startswith(prefix))]
+            self._expectations = [expectation for expectation in self._expectations
+                                  if not expectation[2].done() and expectation[2] not in matched]
+            if not callbacks and not matched:
+                self._backlog.append(message)
+                self._condition.notify()
+
+        for callback in callbacks:
+            callback(message)
+        for future in matched:
+            if not future.done():
+                future.set_result(message)
+
+    def get(self, block: bool = True, timeout: float = None) -> str:
+        """Remove and return the oldest unclaimed line.
+
+        Args:
+            block (bool, optional): Wait for a line if the backlog is empty. Defaults to True.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Raises:
+            Empty: If no line arrived in time.
+
+        Returns:
+            str: The oldest unclaimed line.
+        """
+        with self._condition:
+            if block and not self._condition.wait_for(lambda: self._backlog, timeout):
+                raise Empty
+            if not self._backlog:
+                raise Empty
+            return self._backlog.popleft()
+
+    def get_nowait(self) -> str:
+        """Remove and return the oldest unclaimed line without waiting.
+
+        Raises:
+            Empty: If the backlog is empty.
+
+        Returns:
+            str: The oldest unclaimed line.
+        """
+        return self.get(block=False)
+
+    def empty(self) -> bool:
+        """Check if the backlog is empty.
+
+        Returns:
+            bool: True if there are no unclaimed lines.
+        """
+        with self._condition:
+            return not self._backlog
+
+    def clear(self):
+        """Drop every unclaimed line."""
+        with self._condition:
+            self._backlog.clear()
+
+    def subscribe(self, prefix, callback) -> int:
+        """Call callback with every line starting with prefix, until unsubscribed.
+
+        Args:
+            prefix (str | tuple): Prefix, or tuple of prefixes, the line must start with.
+            callback (callable): Called with the line.
+
+        Returns:
+            int: Handle to pass to unsubscribe.
+        """
+        with self._condition:
+            handle = self._next_handle
+            self._next_handle += 1
+            self._subscribers[handle] = (prefix, callback)
+        return handle
+
+    def unsubscribe(self, handle: int):
+        """Remove a subscription made with subscribe.
+
+        Args:
+            handle (int): Handle returned by subscribe.
+        """
+        with self._condition:
+            self._subscribers.pop(handle, None)
+
+    def expect(self, expected: str = None, prefix=None) -> Future:
+        """Register interest in the next line equal to expected, or starting with prefix.
+
+        Register before sending the command the line answers, so a fast reply cannot be missed.
+
+        Args:
+            expected (str, optional): Exact line to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, to wait for. Defaults to None.
+
+        Returns:
+            Future: Resolved with the matching line.
+
+        Raises:
+            ValueError: If neither or both of expected and prefix are given.
+        """
+        if (expected is None) == (prefix is None):
+            raise ValueError("must give an Expected response or Expected prefix")
+
+        future = Future()
+        with self._condition:
+            self._expectations.append((expected, prefix, future))
+        return future
+
+    def wait_for(self, expected: str = None, prefix=None, timeout: float = None) -> str:
+        """Block until a line equal to expected, or starting with prefix, arrives.
+
+        Only lines received after the call are seen, use expect before sending to avoid a race.
+
+        Args:
+            expected (str, optional): Exact line to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, to wait for. Defaults to None.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If no matching line arrived in time.
+
+        Returns:
+            str: The matching line.
+        """
+        return wait_for_reply(self.expect(expected, prefix), timeout)
+
+def wait_for_reply(future: Future, timeout: float = None) -> str:
+    """Wait for a Future returned by MessageBus.expect.
+
+    Args:
+        future (Future): The expectation.
+        timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+    Raises:
+        RobotConnectionTimeout: If the line did not arrive in time.
+
+    Returns:
+        str: The matching line.
+    """
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise RobotConnectionTimeout(f"No reply from the robot within {timeout} s")
+
+class UploadWindow:
+    """Go-back-N bookkeeping for one BIN2 upload, shared by the blocking and asyncio transports.
+
+    The transport writes pending(), feeds every "ack"/"nak"/"Error" reply to on_reply and
+    calls on_timeout when no reply came in time, until done.
+    """
+
+    def __init__(self, points: list, window: int, max_retries: int):
+        """Initialize the UploadWindow instance.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+            window (int): Frames in flight.
+            max_retries (int): Timeouts in a row before giving up.
+        """
+        self.frames = [pack_point_frame(point, sequence) for sequence, point in enumerate(points)]
+        self.window = window
+        self.max_retries = max_retries
+        self.base = 0  # First unacknowledged frame
+        self.next_frame = 0  # Next frame to send
+        self.timeouts = 0
+        self.retransmits = 0
+        self.bytes_sent = 0
+        self.start_time = time.perf_counter()
+
+    @property
+    def done(self) -> bool:
+        """bool: True once every frame is acknowledged."""
+        return self.base >= len(self.frames)
+
+    def pending(self) -> bytes:
+        """Frames that fit in the window and have not been sent, counted as sent.
+
+        Returns:
+            bytes: The frames to write, empty if the window is full.
+        """
+        end = min(len(self.frames), self.base + self.window)
+        if self.next_frame >= end:
+            return b""
+        data = b"".join(self.frames[self.next_frame:end])
+        self.bytes_sent += len(data)
+        self.next_frame = end
+        return data
+
+    def on_timeout(self):
+        """Rewind to the first unacknowledged frame after a silent ACK timeout.
+
+        Raises:
+            RobotConnectionTimeout: After max_retries timeouts in a row.
+        """
+        self.timeouts += 1
+        if self.timeouts > self.max_retries:
+            raise RobotConnectionTimeout(f"No acknowledgement for point {self.base} of the upload")
+        self.retransmits += self.next_frame - self.base
+        self.next_frame = self.base
+
+    def on_reply(self, response: str) -> bool:
+        """Apply an "ack <n>" or "nak <n>" reply.
+
+        Args:
+            response (str): The reply.
+
+        Returns:
+            bool: False if the reply is an error and the robot abandoned the upload.
+        """
+        kind, _, value = response.partition(" ")
+        if kind == "ack" and value.isdigit():
+            self.base = max(self.base, int(value) + 1)
+            self.timeouts = 0
+        elif kind == "nak" and value.isdigit():
+            resend = int(value)
+            self.base = max(self.base, resend)
+            if resend < self.next_frame:
+                self.retransmits += self.next_frame - resend
+                self.next_frame = resend
+        elif response.startswith("Error"):
+            return False
+        return True
+
+    def stats(self) -> dict:
+        """Throughput of the upload so far.
+
+        Returns:
+            dict: Points, bytes sent, seconds, points/s, bytes/s and frames retransmitted.
+        """
+        seconds = max(time.perf_counter() - self.start_time, 1e-9)
+        return {
+            "points": len(self.frames),
+            "bytes": self.bytes_sent,
+            "seconds": seconds,
+            "points_per_second": len(self.frames) / seconds,
+            "bytes_per_second": self.bytes_sent / seconds,
+            "retransmits": self.retransmits,
+        }
+
+    def __str__(self):
+        stats = self.stats()
+        return (f"Uploaded {stats['points']} points in {stats['seconds']:.3f} s "
+                f"({stats['points_per_second']:.0f} points/s, {stats['bytes_per_second']:.0f} B/s, "
+                f"{stats['retransmits']} retransmitted)")
+
 class Mesageer:
     """Class for managing communication with a robot over a serial port."""
 
     DEFAULT_BAUD_RATE = 115200
     DEFAULT_TIMEOUT = 10
+    PROTOCOL_TIMEOUT = 2
+    PROTOCOLS = ("BIN2", "BIN1")
+    WINDOW_SIZE = 32
+    ACK_TIMEOUT = 0.5
+    MAX_RETRIES = 10
 
     def __init__(self, serial_port: str):
         """Initialize the Mesageer instance.
 
         Args:
-            serial_port (str): Serial port name.
+            serial_port (str): Serial port name, or an open port object such as a VirtualTeensy.
         """
         self.port = serial_port
         self.baud_rate = self.DEFAULT_BAUD_RATE
@@ -25,14 +381,23 @@ class Mesageer:
         self.serial = None
         self.read_thread = None
         self._stop_reading = threading.Event()
-        self.message_stack = LifoQueue()
-
-    def connect(self, baud_rate: int = None, timeout: int = None):
+        self.message_stack = MessageBus()
+        self.protocol = "TEXT"
+        self.upload_stats = None
+        self._upload_replies = Queue()
+        self._upload_subscription = self.message_stack.subscribe(("ack ", "nak "), self._upload_replies.put)
+        self._read_buffer = bytearray()
+        self.bytes_received = 0
+        self.lines_received = 0
+        self._rate_sample = (time.perf_counter(), 0, 0)
+
+    def connect(self, baud_rate: int = None, timeout: int = None, binary: bool = True):
         """Establish a connection with the robot.
 
         Args:
             baud_rate (int, optional): Baud rate for serial communication. Defaults to None.
             timeout (int, optional): Timeout for the connection attempt. Defaults to None.
+            binary (bool, optional): Try to negotiate binary moshion points. Defaults to True.
 
         Raises:
             Exception: Raised if the connection attempt times out.
@@ -44,34 +409,44 @@ class Mesageer:
 
         try:
             # Open the serial port
-            self.serial = serial.Serial(self.port, baud_rate, timeout=1)
-            time.sleep(1)
+            if isinstance(self.port, str):
+                self.serial = serial.Serial(self.port, baud_rate, timeout=1)
+                time.sleep(1)
+            else:
+                self.serial = self.port
 
             start_time = time.time()
 
-            # Wait for confirmation from the robot
+            # Wait for confirmation from the robot, only asking again once a read times out so
+            # no spare leftHand reaches the firmware after it has left INIT
+            self.serial.write("leftHand\n".encode('utf-8'))
             while not self.is_connected:
-                self.serial.write("leftHand\n".encode('utf-8'))
-                data = self.serial.readline().decode('utf-8').strip()
+                line = self.serial.readline()
+                data = line.decode('utf-8', errors='replace').strip()
                 if data == "rightHand":
                     print("Teensy has confirmed the connection.")
                     self.is_connected = True
+                elif not line:
+                    self.serial.write("leftHand\n".encode('utf-8'))
 
                 if time.time() - start_time > timeout:
                     raise Exception("Timeout reached. No connection confirmation received.")
 
-            # Initialize the message stack
-            self.message_stack = LifoQueue()
+            # Start from an empty message backlog
+            self.message_stack.clear()
 
             # Start a separate thread to continuously read and put data into the message stack
             self.read_thread = threading.Thread(target=self._read_and_put_data)
             self.read_thread.daemon = True
             self.read_thread.start()
 
+            if binary:
+                self.negotiate_protocol()
+
         except Exception as e:
             print(f"Error connecting to the robot: {e}")
-            # Initialize the message stack even if the connection attempt fails
-            self.message_stack = LifoQueue()
+            # Clear the message backlog even if the connection attempt fails
+            self.message_stack.clear()
             raise
 
     def send_message(self, message: str):
@@ -93,30 +468,235 @@ class Mesageer:
         except Exception as e:
             print(f"An error occurred while sending message: {e}")
 
+    def expect(self, expected: str = None, prefix=None) -> Future:
+        """Register interest in a reply before sending the command, see MessageBus.expect.
+
+        Args:
+            expected (str, optional): Exact line to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, to wait for. Defaults to None.
+
+        Returns:
+            Future: Resolved with the matching line.
+        """
+        return self.message_stack.expect(expected, prefix)
+
+    def wait_for(self, expected: str = None, prefix=None, timeout: float = None) -> str:
+        """Block until a matching line arrives, see MessageBus.wait_for.
+
+        Args:
+            expected (str, optional): Exact line to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, to wait for. Defaults to None.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Returns:
+            str: The matching line.
+        """
+        return self.message_stack.wait_for(expected, prefix, timeout)
+
+    def request(self, message: str, expected: str = None, prefix=None, timeout: float = None) -> str:
+        """Send a message and wait for its reply.
+
+        Args:
+            message (str): Message to send.
+            expected (str, optional): Exact reply to wait for. Defaults to None.
+            prefix (str | tuple, optional): Prefix, or tuple of prefixes, of the reply. Defaults to None.
+            timeout (float, optional): Seconds to wait, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If the reply did not arrive in time.
+
+        Returns:
+            str: The reply.
+        """
+        reply = self.expect(expected, prefix)
+        self.send_message(message)
+        return wait_for_reply(reply, timeout)
+
+    @property
+    def binary_protocol(self) -> bool:
+        """bool: True if moshion points are sent as binary frames."""
+        return self.protocol != "TEXT"
+
+    def negotiate_protocol(self, timeout: float = None) -> str:
+        """Ask the firmware for the best binary moshion point protocol it supports.
+
+        Each protocol in PROTOCOLS is offered in turn. Firmware that does not know a
+        protocol, or R_PROTO at all, answers with an error or not at all, and once every
+        protocol is refused the text protocol is kept.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each reply. Defaults to PROTOCOL_TIMEOUT.
+
+        Returns:
+            str: The protocol in use, "BIN2", "BIN1" or "TEXT".
+        """
+        if timeout is None:
+            timeout = self.PROTOCOL_TIMEOUT
+
+        self.protocol = "TEXT"
+        for protocol in self.PROTOCOLS:
+            try:
+                response = self.request(f"R_PROTO {protocol}", prefix=("proto", "Error"), timeout=timeout)
+            except RobotConnectionTimeout:
+                continue
+
+            if response == f"proto {protocol}":
+                self.protocol = protocol
+                break
+
+        print(f"Using the {self.protocol} moshion point protocol")
+        return self.protocol
+
+    def send_moshion(self, points: list):
+        """Send the points of an R_MOSHION upload in the negotiated protocol.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+
+        Returns:
+            dict: Throughput of a BIN2 upload as returned by upload_moshion, otherwise None.
+        """
+        if self.protocol == "BIN2":
+            return self.upload_moshion(points)
+
+        if not self.binary_protocol:
+            for point in points:
+                self.send_message(point)
+            return None
+
+        try:
+            if self.serial and self.serial.is_open:
+                self.serial.write(b"".join(pack_point_frame(point) for point in points))
+            else:
+                print("Serial port is not open")
+        except Exception as e:
+            print(f"An error occurred while sending moshion: {e}")
+        return None
+
+    def upload_moshion(self, points: list, window: int = None) -> dict:
+        """Stream the points of an R_MOSHION upload as BIN2 frames with a sliding window.
+
+        Up to window frames are in flight at once. The firmware acknowledges stored points
+        with "ack <n>" and asks for a resend with "nak <n>". A NAK, or no reply for
+        ACK_TIMEOUT seconds, resends every frame from the first unacknowledged one. The
+        replies arrive through a message bus subscription, other messages are left alone.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+            window (int, optional): Frames in flight. Defaults to WINDOW_SIZE.
+
+        Raises:
+            RobotConnectionTimeout: If MAX_RETRIES timeouts pass without an acknowledgement.
+
+        Returns:
+            dict: Points, bytes sent, seconds, points/s, bytes/s and frames retransmitted,
+                or None if the firmware abandoned the upload.
+        """
+        upload = UploadWindow(points, window or self.WINDOW_SIZE, self.MAX_RETRIES)
+
+        # Drop late replies to the previous upload
+        while not self._upload_replies.empty():
+            self._upload_replies.get_nowait()
+
+        errors = self.message_stack.subscribe("Error", self._upload_replies.put)
+        try:
+            while not upload.done:
+                data = upload.pending()
+                if data:
+                    self.serial.write(data)
+
+                try:
+                    response = self._upload_replies.get(timeout=self.ACK_TIMEOUT)
+                except Empty:
+                    upload.on_timeout()
+                    continue
+
+                if not upload.on_reply(response):
+                    print(f"Moshion upload abandoned by the robot: {response}")
+                    return None
+        finally:
+            self.message_stack.unsubscribe(errors)
+
+        self.upload_stats = upload.stats()
+        print(upload)
+        return self.upload_stats
+
+    def run_moshion(self, points: list, timeout: float = None) -> dict:
+        """Allocate, upload and execute a moshion, returning once the robot has finished it.
+
+        Args:
+            points (list): Text points as built by MoshionController.move_motors.
+            timeout (float, optional): Seconds to wait for each reply, None waits forever. Defaults to None.
+
+        Raises:
+            RobotConnectionTimeout: If a reply did not arrive in time.
+
+        Returns:
+            dict: Throughput of a BIN2 upload as returned by upload_moshion, otherwise None.
+        """
+        self.request(f"R_MOVES {len(points)}", "MoshionState changed to: 1", timeout=timeout)
+        self.request(f"R_MOSHION {len(points)}", f"storing {len(points)}", timeout=timeout)
+
+        stored = self.expect("MoshionState changed to: 2")
+        stats = self.send_moshion(points)
+        wait_for_reply(stored, timeout)
+
+        self.request(f"R_EXECUTE {len(points)}", "MoshionState changed to: 0", timeout=timeout)
+        return stats
+
     def _read_and_put_data(self):
         """Read data from the serial port and put it into the message stack."""
         try:
-            response_buffer = ""
             while not self._stop_reading.is_set():
-                data = self.serial.read().decode('utf-8')
+                # Take everything already waiting, or block for up to the port timeout for one byte
+                data = self.serial.read(self.serial.in_waiting or 1)
                 if data:
-                    response_buffer += data
-                    if data.endswith("\n"):
-                        self.message_stack.put(response_buffer.strip())
-                            
-                        response_buffer = ""
+                    self._put_lines(data)
         except Exception as e:
             print(f"An error occurred while reading data: {e}")
 
+    def _put_lines(self, data: bytes):
+        """Add received bytes to the read buffer and put every completed line on the message stack.
+
+        Args:
+            data (bytes): Bytes read from the serial port.
+        """
+        self.bytes_received += len(data)
+        self._read_buffer += data
+
+        end = self._read_buffer.rfind(b"\n")
+        if end < 0:
+            return
+
+        lines = self._read_buffer[:end].split(b"\n")
+        del self._read_buffer[:end + 1]
+        for line in lines:
+            line = line.decode('utf-8', errors='replace').strip()
+            if line:
+                self.message_stack.put(line)
+                self.lines_received += 1
+
+    def link_rates(self) -> tuple:
+        """Bytes and lines received per second since the previous call, or since the Mesageer was made.
+
+        Returns:
+            tuple: (bytes/s, lines/s).
+        """
+        now = time.perf_counter()
+        last_time, last_bytes, last_lines = self._rate_sample
+        self._rate_sample = (now, self.bytes_received, self.lines_received)
+        seconds = max(now - last_time, 1e-9)
+        return (self.bytes_received - last_bytes) / seconds, (self.lines_received - last_lines) / seconds
+
     def get_latest_message(self) -> str:
-        """Get the latest message from the message stack.
+        """Get the oldest unclaimed message from the message bus.
 
         Returns:
-            str: Latest message from the stack.
+            str: Oldest unclaimed message, or None if there is none.
         """
-        if not self.message_stack.empty():
-            return self.message_stack.get()
-        else:
+        try:
+            return self.message_stack.get_nowait()
+        except Empty:
             return None
 
     def close_connection(self):
@@ -133,20 +713,20 @@ class Mesageer:
     def __repr__(self):
         return f"Robot('{self.port}')"
 
-def handle_response(expected_r: str = None, expected_prefix: str = None, dataWrite: list = [], message_stack: LifoQueue = None):
+def handle_response(expected_r: str = None, expected_prefix: str = None, dataWrite: list = [], message_stack: MessageBus = None):
     """Handle response based on expected response or prefix.
 
     Args:
         expected_r (str, optional): Expected response. Defaults to None.
         expected_prefix (str, optional): Expected prefix. Defaults to None.
         dataWrite (list, optional): List to write data when expected_prefix is found. Defaults to [].
-        message_stack (LifoQueue, optional): Stack of messages. Defaults to None.
+        message_stack (MessageBus, optional): Bus of received messages. Defaults to None.
     """
     if expected_r is None and expected_prefix is None:
         raise print("must give an Expected response or Expected prefix")
     
     while True:
-        response = message_stack.get()  # Get the latest response from the message stack
+        response = message_stack.get()  # Get the oldest unclaimed response
         if response is None:  # If response is None, continue to wait for the next response
             continue
 
@@ -173,45 +753,8 @@ def main():
 
     MSG.connect()
 
-    expected_response = "MoshionState changed to: 1"
-    MSG.send_message("R_MOVES 1")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "storing 1"
-    MSG.send_message("R_MOSHION 1")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "MoshionState changed to: 2"
-    MSG.send_message("-29859, 0, 0, 0, 0, 0, 277777")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "MoshionState changed to: 0"
-    MSG.send_message("R_EXECUTE 2")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    
-
-
-
-
-
-    expected_response = "MoshionState changed to: 1"
-    MSG.send_message("R_MOVES 1")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "storing 1"
-    MSG.send_message("R_MOSHION 1")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "MoshionState changed to: 2"
-    MSG.send_message("29859, 0, 0, 0, 0, 0, 277777")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
-    expected_response = "MoshionState changed to: 0"
-    MSG.send_message("R_EXECUTE 1")
-    handle_response(expected_response, None, None,MSG.message_stack) # weight until i get the my response
-
- 
+    for frequency in (-29859, 29859):
+        MSG.run_moshion([f"{frequency}, 0, 0, 0, 0, 0, 277777"])
 
     # MSG.close_connection()
 
@@ -2,6 +2,7 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
 import random
+from spatial_index import RectangleIndex
 
 class Box:
     def __init__(self, name: str, width, height):
@@ -70,6 +71,7 @@ class BoxPlacer:
         self.boxes = []
         self.current_position = [offset, offset]
         self.no_go_rectangles = []  # List to store "NO_GO" rectangles
+        self.no_go_index = RectangleIndex()  # Grid index over no_go_rectangles, same order
 
     def add_no_go_rectangle(self, x, y, width, height):
         """Add a "NO_GO" rectangle to the grid.
@@ -81,6 +83,7 @@ class BoxPlacer:
             height (int): Height of the rectangle.
         """
         self.no_go_rectangles.append(patches.Rectangle((x, y), width, height, facecolor="gray"))
+        self.no_go_index.insert(x, y, width, height)
 
     def add_box(self, new_box):
         """Add a new box to the list and attempt to place only the new box is in it locashion .
@@ -101,12 +104,7 @@ class BoxPlacer:
         elif ( # add it to the end of the plaed boxes
             self.current_position[0] + new_box.width + self.margin > self.grid_size[0]
             or self.current_position[1] + new_box.height + self.margin > self.grid_size[1]
-            or any(
-                self.is_overlap(
-                    self.current_position[0], self.current_position[1], new_box.width, new_box.height, rect
-                )
-                for rect in self.no_go_rectangles
-            )
+            or len(self.no_go_index.overlapping(self.current_position[0], self.current_position[1], new_box.width, new_box.height))
         ):
             # Move to the next row if the new_box doesn't fit in the current row or overlaps with "NO_GO" space
             self.current_position[0] = self.offset
@@ -119,9 +117,8 @@ class BoxPlacer:
 
             # Check if the current position is just before the "NO_GO" rectangle
             overlapping_rectangles = [
-                rect for rect in self.no_go_rectangles if self.is_overlap(
-                    self.current_position[0], self.current_position[1], 0, new_box.height, rect
-                )
+                self.no_go_rectangles[index]
+                for index in self.no_go_index.overlapping(self.current_position[0], self.current_position[1], 0, new_box.height)
             ]
 
             if overlapping_rectangles:
@@ -221,12 +218,7 @@ class BoxPlacer:
             while (
                 self.current_position[0] + box.width + self.margin > self.grid_size[0]
                 or self.current_position[1] + box.height + self.margin > self.grid_size[1]
-                or any(
-                    self.is_overlap(
-                        self.current_position[0], self.current_position[1], box.width, box.height, rect
-                    )
-                    for rect in self.no_go_rectangles
-                )
+                or len(self.no_go_index.overlapping(self.current_position[0], self.current_position[1], box.width, box.height))
             ):
                 # Move to the next row if the box doesn't fit in the current row or overlaps with "NO_GO" space
                 self.current_position[0] = self.offset
@@ -239,9 +231,8 @@ class BoxPlacer:
 
                 # Check if the current position is just before the "NO_GO" rectangle
                 overlapping_rectangles = [
-                    rect for rect in self.no_go_rectangles if self.is_overlap(
-                        self.current_position[0], self.current_position[1], 0, box.height, rect
-                    )
+                    self.no_go_rectangles[index]
+                    for index in self.no_go_index.overlapping(self.current_position[0], self.current_position[1], 0, box.height)
                 ]
 
                 if overlapping_rectangles:
@@ -98,18 +98,18 @@ class MotionProfileGenerator:
             self.move_time = self.calculate_move_time()
 
 
-    def Generator_profile(self, time_values: List[float] = [None]) -> None:
+    def Generator_profile(self, time_values: List[float] = [None], displacement_only: bool = False) -> None:
         """
         Generate motion profiles for given time values.
 
         Args:
             time_values (List[float]): List of time values.
+            displacement_only (bool, optional): Only compute the displacements, leaving the accelerations
+                and velocity empty. Defaults to False.
         """
 
         self.time_values = time_values
-        self.accelerations = self.generate_accelerations_profile()
-        self.velocity = self.generate_velocity_profile()
-        self.displacements = self.generate_displacement_profile()
+        self.accelerations, self.velocity, self.displacements = self.generate_profiles(displacement_only)
 
 
     def calculate_max_velocity(self) -> float:
@@ -142,62 +142,81 @@ class MotionProfileGenerator:
             raise
 
    
-    def generate_accelerations_profile(self) -> List[float]:
+    def generate_profiles(self, displacement_only: bool = False, time_values: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Generate acceleration profile over time.
+        Generate the acceleration, velocity and displacement profiles in one vectorized pass.
+
+        The three phases (jerk-limited ramp up, constant velocity, ramp down) are selected with
+        boolean masks that are built once and shared by the three profiles.
+
+        Args:
+            displacement_only (bool, optional): Skip the acceleration and velocity profiles. Defaults to False.
+            time_values (np.ndarray, optional): Times to evaluate the profile at, without storing them.
+                Defaults to the time values given to Generator_profile.
 
         Returns:
-            List[float]: List of accelerations.
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Accelerations, velocities and displacements. The
+                first two are empty arrays when displacement_only is set.
         """
+        time_values = np.asarray(self.time_values if time_values is None else time_values, dtype=np.float64)
+        accelerations = np.zeros(0 if displacement_only else len(time_values))
+        velocities = np.zeros(0 if displacement_only else len(time_values))
+        displacements = np.zeros(len(time_values))
+
         if not self.is_moving:
-            return np.zeros(len(self.time_values))
-        
-        coff1: float = (16 * self.max_acc ** 3) / (9 * self.max_vel ** 2)
-        coff2: float = (8 * self.max_acc ** 2) / (3 * self.max_vel)
+            return accelerations, velocities, displacements
 
         T_1: float = (3 * self.max_vel) / (2 * self.max_acc)
         T_2: float = self.move_time - T_1
+        cruise_offset: float = (3 * self.max_vel ** 2) / (4 * self.max_acc)
 
-        accelerations: List[float] = np.zeros(len(self.time_values))
-        
-        for t, x in enumerate(self.time_values):
-            if 0 <= x < T_1:
-                accelerations[t] = -coff1 * x ** 2 + coff2 * x
-            elif T_1 <= x < T_2:
-                accelerations[t] = 0
-            elif T_2 <= x <= self.move_time:
-                accelerations[t] = coff1 * (x - T_2) ** 2 - coff2 * (x - T_2)
+        # Create boolean masks for each phase
+        mask1 = (0 <= time_values) & (time_values < T_1)
+        mask2 = (T_1 <= time_values) & (time_values < T_2)
+        mask3 = (T_2 <= time_values) & (time_values <= self.move_time)
+
+        # Time since the start of the ramp up and since the start of the ramp down
+        ramp_up = time_values[mask1]
+        ramp_down = time_values[mask3] - T_2
 
-        return accelerations
+        coff1 = (4 * self.max_acc ** 3) / (27 * self.max_vel ** 2)
+        coff2 = (4 * self.max_acc ** 2) / (9 * self.max_vel)
+        displacements[mask1] = (-coff1 * ramp_up + coff2) * ramp_up ** 3
+        displacements[mask2] = self.max_vel * time_values[mask2] - cruise_offset
+        displacements[mask3] = (coff1 * ramp_down - coff2) * ramp_down ** 3 + self.max_vel * time_values[mask3] - cruise_offset
 
+        if displacement_only:
+            return accelerations, velocities, displacements
 
-    def generate_velocity_profile(self) -> List[float]:
+        # Velocity and acceleration are the derivatives of the same quartic
+        velocities[mask1] = (-4 * coff1 * ramp_up + 3 * coff2) * ramp_up ** 2
+        velocities[mask2] = self.max_vel
+        velocities[mask3] = (4 * coff1 * ramp_down - 3 * coff2) * ramp_down ** 2 + self.max_vel
+
+        accelerations[mask1] = (-12 * coff1 * ramp_up + 6 * coff2) * ramp_up
+        accelerations[mask3] = (12 * coff1 * ramp_down - 6 * coff2) * ramp_down
+
+        return accelerations, velocities, displacements
+
+
+    def generate_accelerations_profile(self) -> List[float]:
         """
-        Generate velocity profile over time.
+        Generate acceleration profile over time.
 
         Returns:
-            List[float]: List of velocities.
+            List[float]: List of accelerations.
         """
-        if not self.is_moving:
-            return np.zeros(len(self.time_values))
-        
-        coff1: float = (16 * self.max_acc ** 3) / (27 * self.max_vel ** 2)
-        coff2: float = (4 * self.max_acc ** 2) / (3 * self.max_vel)
-
-        T_1: float = (3 * self.max_vel) / (2 * self.max_acc)
-        T_2: float = self.move_time - T_1
+        return self.generate_profiles()[0]
 
-        velocities: List[float] = np.zeros(len(self.time_values))
 
-        for t, x in enumerate(self.time_values):
-            if 0 <= x < T_1:
-                velocities[t] = -coff1 * x ** 3 + coff2 * x ** 2
-            elif T_1 <= x < T_2:
-                velocities[t] = self.max_vel
-            elif T_2 <= x <= self.move_time:
-                velocities[t] = coff1 * (x - T_2) ** 3 - coff2 * (x - T_2) ** 2 + self.max_vel
+    def generate_velocity_profile(self) -> List[float]:
+        """
+        Generate velocity profile over time.
 
-        return velocities
+        Returns:
+            List[float]: List of velocities.
+        """
+        return self.generate_profiles()[1]
 
  
     def generate_displacement_profile(self) -> np.ndarray:
@@ -207,35 +226,111 @@ class MotionProfileGenerator:
         Returns:
             np.ndarray: Array of displacements.
         """
-        if not self.is_moving:
-            return np.zeros_like(self.time_values)
+        return self.generate_profiles(displacement_only=True)[2]
+    
 
-        coff1 = (4 * self.max_acc ** 3) / (27 * self.max_vel ** 2)
-        coff2 = (4 * self.max_acc ** 2) / (9 * self.max_vel)
+    def __repr__(self) -> str:
+        return f"{self.MotionProfilename}"
 
-        T_1 = (3 * self.max_vel) / (2 * self.max_acc)
-        T_2 = self.move_time - T_1
 
-        displacements = np.zeros_like(self.time_values)
+def synchronized_move_time(displacements, max_acc, sys_max_vel) -> float:
+    """
+    Closed-form move time shared by several axes: the longest of their independent move times.
 
-        # Create boolean masks for each condition
-        mask1 = (0 <= self.time_values) & (self.time_values < T_1)
-        mask2 = (T_1 <= self.time_values) & (self.time_values < T_2)
-        mask3 = (T_2 <= self.time_values) & (self.time_values <= self.move_time)
+    Args:
+        displacements (array_like): Displacement of every axis (the sign is ignored).
+        max_acc (array_like): Maximum acceleration of every axis, or one value for all axes.
+        sys_max_vel (array_like): Maximum velocity of every axis, or one value for all axes.
 
-        # Apply vectorized calculations using masks
-        displacements[mask1] = -coff1 * self.time_values[mask1] ** 4 + coff2 * self.time_values[mask1] ** 3
-        displacements[mask2] = self.max_vel * self.time_values[mask2] - (3 * self.max_vel ** 2) / (4 * self.max_acc)
-        displacements[mask3] = (
-            coff1 * (self.time_values[mask3] - T_2) ** 4 - coff2 * (self.time_values[mask3] - T_2) ** 3 +
-            self.max_vel * self.time_values[mask3] - (3 * self.max_vel ** 2) / (4 * self.max_acc)
-        )
+    Returns:
+        float: The synchronized move time, 0 if no axis moves.
+    """
+    displacements = np.abs(np.asarray(displacements, dtype=np.float64))
+    max_acc, sys_max_vel = np.broadcast_arrays(np.asarray(max_acc, dtype=np.float64), np.asarray(sys_max_vel, dtype=np.float64), displacements)[:2]
+
+    moving = displacements > 0.00001
+    if not np.any(moving):
+        return 0
+
+    # Same closed form as MotionProfileGenerator.calculate_max_velocity / calculate_move_time
+    max_vel = np.minimum(sys_max_vel[moving], np.sqrt(6 * max_acc[moving] * displacements[moving]) / 3)
+    move_times = (3 * max_vel) / (2 * max_acc[moving]) + displacements[moving] / max_vel
+    return float(np.max(move_times))
+
+
+def generate_synchronized_profiles(
+    displacements,
+    max_acc,
+    sys_max_vel,
+    time_values: np.ndarray = None,
+    move_time: float = None,
+    sample_time: float = 0.001
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generate the displacement profiles of many axes that start and stop together, in one call.
 
-        return displacements
-    
+    This is the batch counterpart of one MotionProfileGenerator per axis with Set_displacement,
+    Set_move_time(shared time) and Generator_profile: every axis gets the jerk-limited profile whose
+    cruise velocity makes it last exactly move_time.
 
-    def __repr__(self) -> str:
-        return f"{self.MotionProfilename}"
+    Args:
+        displacements (array_like): Signed displacement of every axis.
+        max_acc (array_like): Maximum acceleration of every axis, or one value for all axes.
+        sys_max_vel (array_like): Maximum velocity of every axis, or one value for all axes.
+        time_values (np.ndarray, optional): Sample times. Defaults to np.arange(0, move_time, sample_time).
+        move_time (float, optional): Shared move time. Defaults to synchronized_move_time.
+        sample_time (float, optional): Sample period used when time_values is not given. Defaults to 0.001.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The time values and an (axes, samples) matrix of signed displacements.
+
+    Raises:
+        ValueError: If move_time is too short for one of the axes.
+    """
+    signed = np.asarray(displacements, dtype=np.float64)
+    distance = np.abs(signed)
+    max_acc, sys_max_vel = np.broadcast_arrays(np.asarray(max_acc, dtype=np.float64), np.asarray(sys_max_vel, dtype=np.float64), distance)[:2]
+
+    if move_time is None:
+        move_time = synchronized_move_time(distance, max_acc, sys_max_vel)
+    if time_values is None:
+        time_values = np.arange(0, move_time, sample_time)
+    time_values = np.asarray(time_values, dtype=np.float64)
+
+    profiles = np.zeros((len(distance), len(time_values)))
+    moving = (distance > 0.00001) & (move_time > 0)
+    if not np.any(moving):
+        return time_values, profiles
+
+    d = distance[moving][:, None]
+    a = max_acc[moving][:, None]
+
+    # Cruise velocity that makes every axis last move_time (MotionProfileGenerator.Set_move_time)
+    under_sqrt = (a ** 2) * (move_time ** 2) - (6 * a * d)
+    under_sqrt[np.abs(under_sqrt) < 1e-5] = 0
+    if np.any(under_sqrt < 0):
+        raise ValueError(f"Move time {move_time} is too short for the requested displacements")
+    max_vel = np.minimum((a * move_time - np.sqrt(under_sqrt)) / 3, sys_max_vel[moving][:, None])
+
+    T_1 = (3 * max_vel) / (2 * a)
+    T_2 = move_time - T_1
+    coff1 = (4 * a ** 3) / (27 * max_vel ** 2)
+    coff2 = (4 * a ** 2) / (9 * max_vel)
+    cruise_offset = (3 * max_vel ** 2) / (4 * a)
+
+    t = time_values[None, :]
+    ramp_down = t - T_2
+    profiles[moving] = np.select(
+        [(0 <= t) & (t < T_1), (T_1 <= t) & (t < T_2), (T_2 <= t) & (t <= move_time)],
+        [
+            (-coff1 * t + coff2) * t ** 3,
+            max_vel * t - cruise_offset,
+            (coff1 * ramp_down - coff2) * ramp_down ** 3 + max_vel * t - cruise_offset,
+        ],
+        0,
+    )
+
+    return time_values, profiles * np.sign(signed)[:, None]
 
 
 def calculate_polar_coordinates(angle, magnitude):
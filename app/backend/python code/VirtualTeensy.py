@@ -0,0 +1,598 @@
+import re
+import threading
+import time
+import numpy as np
+from collections import deque
+from Messager import *
+
+class PortClosed(Exception):
+    pass
+
+class VirtualTeensy:
+    """In-process stand-in for the Teensy running fermwar_4, usable wherever Mesageer expects a serial port.
+
+    A device thread runs the firmware loop: the leftHand/rightHand handshake, then R_MOVES,
+    R_MOSHION, R_EXECUTE, R_GET_WIGHT and R_PROTO with the firmware's replies, state checks and
+    error messages. Moshion points are accepted as text lines or BIN1/BIN2 frames.
+
+    Timing is modelled on a virtual clock rather than with sleeps. Bytes take 10 bits per byte
+    at baud_rate to cross the link in either direction and arrive one at a time, so the firmware
+    can parse the first frame of a window while the rest is still in flight. Each command line or text point costs
+    line_latency seconds of parsing and each binary frame costs frame_latency. An executed
+    moshion reports completion after the sum of its point times, scaled by execute_time_scale.
+
+    Like readPointLine, every text point starts by dropping the input that arrived while the
+    previous point was parsed. Pipelined text points only survive when each one is parsed before
+    the next starts to arrive.
+    """
+
+    SEPS = "[\t,\n ;:]+"
+    SETTINGUP, SETUP, READY, INMOSHION = range(4)
+    COMMANDS = ("R_MOVES", "R_MOSHION", "R_EXECUTE", "R_GET_WIGHT", "R_PROTO")
+    MAX_BAD_FRAMES = 32
+    DRAIN_QUIET = 0.05  # DRAIN_QUIET_MS in seconds
+    STATE_MESSAGES = {
+        SETTINGUP: "Motion needs to be prepared\n",
+        SETUP: "Motion needs to be set up\n",
+        READY: "Motion needs to be executed\n",
+        INMOSHION: "Motion is running\n",
+    }
+    ERRORS = {
+        1: "Error in %s, Command is not found in RECEIVABLE_COMMAND list\n",
+        4: "Error in %s, No command arguments provided\n",
+        7: "Error in %s, The %d command argument was not provided\n",
+        10: "Error in %s, Point frame %d failed its length or CRC check\n",
+    }
+
+    def __init__(self, baud_rate: float = None, line_latency: float = 0.0, frame_latency: float = 0.0,
+                 execute_time_scale: float = 1.0, protocols: tuple = ("BIN2", "BIN1"), timeout: float = 1):
+        """Initialize the VirtualTeensy instance and boot the firmware.
+
+        Args:
+            baud_rate (float, optional): Link speed in bits/s, None for an instant link. Defaults to None.
+            line_latency (float, optional): Seconds to parse a command line or text point. Defaults to 0.0.
+            frame_latency (float, optional): Seconds to check and store a binary frame. Defaults to 0.0.
+            execute_time_scale (float, optional): Scale of the simulated execution time, 0 finishes at once. Defaults to 1.0.
+            protocols (tuple, optional): Binary protocols R_PROTO accepts, empty for firmware without R_PROTO. Defaults to ("BIN2", "BIN1").
+            timeout (float, optional): Read timeout of the port in seconds, like serial.Serial. Defaults to 1.
+        """
+        self.baud_rate = baud_rate
+        self.line_latency = line_latency
+        self.frame_latency = frame_latency
+        self.execute_time_scale = execute_time_scale
+        self.protocols = tuple(protocols)
+        self.timeout = timeout
+        self.is_open = True
+
+        self._condition = threading.Condition()
+        self._incoming = deque()  # [send time, bytearray] written by the host
+        self._outgoing = deque()  # [send time, bytearray] printed by the firmware
+        self._rx_free = 0.0  # When the host to device link is next idle
+        self._tx_free = 0.0  # When the device to host link is next idle
+        self._device_time = time.perf_counter()  # Virtual clock of the firmware
+
+        self.connected = False
+        self.moshion_state = self.SETTINGUP
+        self.protocol = "TEXT"
+        self.points = []
+        self.executed = []
+        self.bytes_received = 0
+        self._execution = None
+
+        self._emit("setting up\n\r\n")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _transfer_time(self, size: int) -> float:
+        """Seconds size bytes take to cross the link.
+
+        Args:
+            size (int): Number of bytes.
+
+        Returns:
+            float: Transfer time, 0 for an instant link.
+        """
+        return 0.0 if not self.baud_rate else size * 10 / self.baud_rate
+
+    def _arrived(self, link: deque, now: float) -> int:
+        """Bytes at the head of a link that have crossed it by now, at most the first chunk.
+
+        Args:
+            link (deque): _incoming or _outgoing.
+            now (float): The time to check at.
+
+        Returns:
+            int: Number of bytes that can be taken from the first chunk.
+        """
+        if not link:
+            return 0
+        sent, chunk = link[0]
+        if not self.baud_rate:
+            return len(chunk) if sent <= now else 0
+        return min(len(chunk), max(int((now - sent) * self.baud_rate / 10 + 1e-9), 0))
+
+    def _take(self, link: deque, count: int) -> float:
+        """Remove bytes from the first chunk of a link, they are sent from when they arrive.
+
+        Args:
+            link (deque): _incoming or _outgoing.
+            count (int): Bytes to remove.
+
+        Returns:
+            float: When the last byte removed arrived.
+        """
+        entry = link[0]
+        del entry[1][:count]
+        entry[0] += self._transfer_time(count)
+        if not entry[1]:
+            link.popleft()
+        return entry[0]
+
+    def _next_arrival(self, link: deque, now: float) -> float:
+        """Seconds until the next byte on a link arrives.
+
+        Args:
+            link (deque): _incoming or _outgoing.
+            now (float): The current time.
+
+        Returns:
+            float: Seconds to wait, None if nothing is on the way.
+        """
+        return link[0][0] + self._transfer_time(1) - now if link else None
+
+    # ----------------------------------------------------------------- host side, the serial.Serial interface
+
+    @property
+    def in_waiting(self) -> int:
+        """int: Bytes that have arrived at the host and not been read."""
+        with self._condition:
+            return self._arrived(self._outgoing, time.perf_counter())
+
+    def read(self, size: int = 1) -> bytes:
+        """Read up to size bytes, waiting up to timeout for them like serial.Serial.read.
+
+        Args:
+            size (int, optional): Bytes to read. Defaults to 1.
+
+        Returns:
+            bytes: The bytes read, fewer than size on timeout.
+        """
+        data = bytearray()
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+
+        with self._condition:
+            while self.is_open:
+                now = time.perf_counter()
+                while len(data) < size and self._arrived(self._outgoing, now):
+                    count = min(self._arrived(self._outgoing, now), size - len(data))
+                    data += self._outgoing[0][1][:count]
+                    self._take(self._outgoing, count)
+
+                if len(data) >= size:
+                    break
+                wait = None if deadline is None else deadline - now
+                if wait is not None and wait <= 0:
+                    break
+                arrival = self._next_arrival(self._outgoing, now)
+                if arrival is not None:
+                    wait = arrival if wait is None else min(wait, arrival)
+                self._condition.wait(wait)
+        return bytes(data)
+
+    def readline(self) -> bytes:
+        """Read up to and including a newline, or what arrived before the timeout.
+
+        Returns:
+            bytes: The line read.
+        """
+        line = bytearray()
+        while not line.endswith(b"\n"):
+            data = self.read(1)
+            if not data:
+                break
+            line += data
+        return bytes(line)
+
+    def write(self, data: bytes) -> int:
+        """Send bytes to the firmware.
+
+        Args:
+            data (bytes): Bytes to send.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        with self._condition:
+            start = max(time.perf_counter(), self._rx_free)
+            self._rx_free = start + self._transfer_time(len(data))
+            self._incoming.append([start, bytearray(data)])
+            self._condition.notify_all()
+        return len(data)
+
+    def close(self):
+        """Close the port and stop the firmware."""
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
+        if self._execution is not None:
+            self._execution.cancel()
+
+    # ----------------------------------------------------------------- device side, the firmware's Serial
+
+    def _read_bytes(self, size: int) -> bytes:
+        """Block until size bytes have arrived from the host, like repeated readSerialByte calls.
+
+        Args:
+            size (int): Bytes to read.
+
+        Raises:
+            PortClosed: If the port is closed while waiting.
+
+        Returns:
+            bytes: The bytes read.
+        """
+        data = bytearray()
+        with self._condition:
+            while len(data) < size:
+                if not self.is_open:
+                    raise PortClosed()
+                now = time.perf_counter()
+                count = min(self._arrived(self._incoming, now), size - len(data))
+                if count:
+                    data += self._incoming[0][1][:count]
+                    self._device_time = max(self._device_time, self._take(self._incoming, count))
+                else:
+                    self._condition.wait(self._next_arrival(self._incoming, now))
+        self.bytes_received += size
+        return bytes(data)
+
+    def _read_line(self) -> str:
+        """Block until a newline-terminated line has arrived from the host.
+
+        Returns:
+            str: The line without its newline.
+        """
+        line = bytearray()
+        with self._condition:
+            while True:
+                if not self.is_open:
+                    raise PortClosed()
+                now = time.perf_counter()
+                count = self._arrived(self._incoming, now)
+                if count:
+                    end = self._incoming[0][1].find(b"\n", 0, count)
+                    count = count if end < 0 else end + 1
+                    line += self._incoming[0][1][:count]
+                    self._device_time = max(self._device_time, self._take(self._incoming, count))
+                    if end >= 0:
+                        break
+                else:
+                    self._condition.wait(self._next_arrival(self._incoming, now))
+        self.bytes_received += len(line)
+        return line[:-1].decode('utf-8', errors='replace')
+
+    def _flush_input(self):
+        """Drop everything that has arrived from the host by the firmware's time, like while (Serial.available()) Serial.read()."""
+        with self._condition:
+            # Wait for the host to catch up, so bytes written while the firmware was busy are dropped too
+            while self.is_open and time.perf_counter() < self._device_time:
+                self._condition.wait(self._device_time - time.perf_counter())
+            while self._arrived(self._incoming, self._device_time):
+                self._take(self._incoming, self._arrived(self._incoming, self._device_time))
+
+    def _drain_resent_frames(self):
+        """Drop bytes from the host until none arrive for DRAIN_QUIET seconds, like drainResentFrames."""
+        with self._condition:
+            last = self._device_time  # When the last byte was dropped
+            while self.is_open:
+                now = time.perf_counter()
+                if self._incoming:
+                    if self._incoming[0][0] + self._transfer_time(1) - last >= self.DRAIN_QUIET:
+                        break
+                    last = max(last, self._take(self._incoming, len(self._incoming[0][1])))
+                elif now - last >= self.DRAIN_QUIET:
+                    break
+                else:
+                    self._condition.wait(last + self.DRAIN_QUIET - now)
+            self._device_time = max(self._device_time, last + self.DRAIN_QUIET)
+
+    def _emit(self, text: str):
+        """Print text to the host at the firmware's virtual time.
+
+        Args:
+            text (str): Text to print.
+        """
+        data = text.encode('utf-8')
+        with self._condition:
+            start = max(self._device_time, self._tx_free)
+            self._tx_free = start + self._transfer_time(len(data))
+            self._outgoing.append([start, bytearray(data)])
+            self._condition.notify_all()
+
+    def _print_error(self, code: int, *args):
+        """Print an error the way print_error does.
+
+        Args:
+            code (int): Error index.
+            *args: Arguments of the error message.
+        """
+        self._emit(f"Error {code}:`{self.ERRORS[code] % args} Putting systems back into IDLE state\n")
+
+    # ----------------------------------------------------------------- firmware
+
+    def _run(self):
+        """Firmware loop: the INIT handshake, then one command per line."""
+        try:
+            while True:
+                line = self._read_line()
+                if not self.connected:
+                    if line == "leftHand":
+                        self._emit("rightHand\n")
+                        self.connected = True
+                        self._flush_input()
+                    continue
+                self._process_command(line)
+        except PortClosed:
+            return
+
+    def _process_command(self, line: str):
+        """Tokenize a command line and run its command, as the PROCESSING_COMMAND state does.
+
+        Args:
+            line (str): The command line.
+        """
+        self._device_time += self.line_latency
+        tokens = [token for token in re.split(self.SEPS, line.upper()) if token]
+        commands = self.COMMANDS if self.protocols else self.COMMANDS[:-1]
+
+        if not tokens or tokens[0] not in commands:
+            self._print_error(1, "PROCESSING_COMMAND STATE")
+            return
+        if len(tokens) < 2:
+            self._print_error(4, "PROCESSING_COMMAND STATE")
+            return
+
+        index = commands.index(tokens[0])
+        handlers = (self._allocate_move_data, self._store_moshion, self._execute_planned_move,
+                    self._get_wight, self._set_protocol)
+        if not handlers[index](tokens[1:]):
+            self._emit(f"cmd command with index {index} was unsuccessful in its execution\n")
+
+    def _is_state(self, state: int) -> bool:
+        """Check the moshion state like isState, printing why it does not match.
+
+        Args:
+            state (int): The required state.
+
+        Returns:
+            bool: True if the moshion is in that state.
+        """
+        if self.moshion_state == state:
+            return True
+        self._emit(self.STATE_MESSAGES[self.moshion_state])
+        return False
+
+    def _allocate_move_data(self, arguments: list) -> bool:
+        """R_MOVES <count>."""
+        if not self._is_state(self.SETTINGUP):
+            return False
+        self.points = [None] * atoi(arguments[0])
+        self.moshion_state = self.SETUP
+        self._emit(f"\nMoshionState changed to: {self.moshion_state}\n")
+        return True
+
+    def _store_moshion(self, arguments: list) -> bool:
+        """R_MOSHION, followed by the points in the negotiated protocol."""
+        if not self._is_state(self.SETUP):
+            return False
+        self._emit(f"storing {len(self.points)}\n")
+
+        if self.protocol == "BIN2":
+            received = self._store_sequenced_points()
+        else:
+            received = True
+            for index in range(len(self.points)):
+                if self.protocol == "BIN1":
+                    point = self._read_point_frame(POINT_STRUCT)
+                    if point is None:
+                        self._print_error(10, "storeMoshioin", index)
+                else:
+                    point = self._read_point_line()
+                if point is None:
+                    received = False
+                    break
+                self.points[index] = point
+
+        if not received:
+            self._flush_input()
+            return False
+        self.moshion_state = self.READY
+        self._emit(f"\nMoshionState changed to: {self.moshion_state}\n")
+        return True
+
+    def _read_point_line(self) -> tuple:
+        """Read one text point "f1, f2, f3, f4, f5, f6, time", dropping earlier input first like readPointLine.
+
+        Returns:
+            tuple: The six frequencies and the time, or None if a value is missing.
+        """
+        self._flush_input()
+        tokens = [token for token in re.split(self.SEPS, self._read_line()) if token]
+        self._device_time += self.line_latency
+        if len(tokens) < 7:
+            self._print_error(7, "storeMoshioin", len(tokens))
+            return None
+        return tuple(atoi(token) for token in tokens[:7])
+
+    def _read_point_frame(self, layout) -> tuple:
+        """Read one binary frame, hunting for the sync word first.
+
+        Args:
+            layout (struct.Struct): POINT_STRUCT for BIN1 frames, SEQUENCED_POINT_STRUCT for BIN2.
+
+        Returns:
+            tuple: The unpacked payload, or None if the length or CRC is wrong.
+        """
+        previous, current = self._read_bytes(2)
+        while not (previous == FRAME_SYNC[0] and current == FRAME_SYNC[1]):
+            previous, current = current, self._read_bytes(1)[0]
+
+        length_bytes = self._read_bytes(FRAME_LENGTH.size)
+        (length,) = FRAME_LENGTH.unpack(length_bytes)
+        self._device_time += self.frame_latency
+        if length != layout.size:
+            return None
+
+        payload = self._read_bytes(length)
+        (crc,) = FRAME_CRC.unpack(self._read_bytes(FRAME_CRC.size))
+        if crc16_ccitt(length_bytes + payload) != crc:
+            return None
+        return layout.unpack(payload)
+
+    def _store_sequenced_points(self) -> bool:
+        """Store a BIN2 upload, answering every frame and draining late resends like storeSequencedPoints.
+
+        Returns:
+            bool: True if every point was stored.
+        """
+        stored = 0
+        naked = -1
+        bad_frames = 0
+
+        while stored < len(self.points):
+            frame = self._read_point_frame(SEQUENCED_POINT_STRUCT)
+            if frame is None:
+                bad_frames += 1
+                if bad_frames >= self.MAX_BAD_FRAMES:
+                    self._print_error(10, "storeMoshioin", stored)
+                    return False
+                sequence = len(self.points)
+            else:
+                sequence = frame[0]
+
+            if sequence == stored:
+                self.points[stored] = frame[1:]
+                self._emit(f"ack {stored}\n")
+                stored += 1
+                bad_frames = 0
+            elif sequence < stored:
+                self._emit(f"ack {stored - 1}\n")
+            elif naked != stored:
+                self._emit(f"nak {stored}\n")
+                naked = stored
+        self._drain_resent_frames()
+        return True
+
+    def _execute_planned_move(self, arguments: list) -> bool:
+        """R_EXECUTE, runs the stored points and reports when they are done."""
+        if not self._is_state(self.READY):
+            return False
+        if not self.points or self.points[0][6] == 0:
+            self.moshion_state = self.SETTINGUP
+            self._emit(f"MoshionState changed to: {self.moshion_state}\n")
+            return True
+
+        self.moshion_state = self.INMOSHION
+        self._emit(f"MoshionState changed to: {self.moshion_state}\n")
+
+        # The point timer starts after 1 us and then waits each point's TIME
+        duration = (1 + sum(point[6] for point in self.points)) * 1e-6 * self.execute_time_scale
+        self._execution = threading.Timer(max(self._device_time - time.perf_counter(), 0) + duration,
+                                          self._finish_moshion)
+        self._execution.daemon = True
+        self._execution.start()
+        return True
+
+    def _finish_moshion(self):
+        """End of the last point, what newPointISR does once CurrentPoint reaches MOVECNT."""
+        with self._condition:
+            self._device_time = max(self._device_time, time.perf_counter())
+            self.executed.append(self.points)
+            self.moshion_state = self.SETTINGUP
+        self._emit(f"MoshionState changed to: {self.moshion_state}\n")
+
+    def _get_wight(self, arguments: list) -> bool:
+        """R_GET_WIGHT, not implemented by the firmware either."""
+        self._emit("PorOutWight")
+        return False
+
+    def _set_protocol(self, arguments: list) -> bool:
+        """R_PROTO BIN2|BIN1|TEXT."""
+        if arguments[0] != "TEXT" and arguments[0] not in self.protocols:
+            self._print_error(4, "setProtocol")
+            return False
+        self.protocol = arguments[0]
+        self._emit(f"proto {self.protocol}\n")
+        return True
+
+    def __repr__(self):
+        return f"VirtualTeensy(baud_rate={self.baud_rate})"
+
+def atoi(text: str) -> int:
+    """Parse a leading integer like C atoi, 0 if there is none.
+
+    Args:
+        text (str): Text to parse.
+
+    Returns:
+        int: The parsed integer.
+    """
+    match = re.match(r"\s*[+-]?\d+", text)
+    return int(match.group()) if match else 0
+
+def run_benchmark(points: list, baud_rate: float = None, line_latency: float = 0.0, frame_latency: float = 0.0,
+                  execute_time_scale: float = 0.0, protocols: tuple = ("TEXT", "BIN1", "BIN2")) -> dict:
+    """Time run_moshion end to end against a VirtualTeensy for each protocol.
+
+    Args:
+        points (list): Text points as built by MoshionController.move_motors.
+        baud_rate (float, optional): Link speed in bits/s, None for an instant link. Defaults to None.
+        line_latency (float, optional): Seconds to parse a command line or text point. Defaults to 0.0.
+        frame_latency (float, optional): Seconds to check and store a binary frame. Defaults to 0.0.
+        execute_time_scale (float, optional): Scale of the simulated execution time. Defaults to 0.0.
+        protocols (tuple, optional): Protocols to time. Defaults to ("TEXT", "BIN1", "BIN2").
+
+    Returns:
+        dict: Seconds from R_MOVES to the end of execution for each protocol, None where the firmware
+            lost or misread points, e.g. text points pipelined faster than line_latency allows.
+    """
+    expected = [tuple(int(value) for value in point.split(',')) for point in points]
+    results = {}
+    for protocol in protocols:
+        device = VirtualTeensy(baud_rate, line_latency, frame_latency, execute_time_scale)
+        MSG = Mesageer(device)
+        MSG.PROTOCOLS = () if protocol == "TEXT" else (protocol,)
+        MSG.connect(binary=protocol != "TEXT")
+
+        start_time = time.perf_counter()
+        try:
+            MSG.run_moshion(points, timeout=60)
+            results[protocol] = time.perf_counter() - start_time if device.executed[-1:] == [expected] else None
+        except RobotConnectionTimeout:
+            results[protocol] = None
+        MSG.close_connection()
+
+        if results[protocol] is None:
+            print(f"{protocol}: points were lost or misread by the firmware")
+        else:
+            print(f"{protocol}: {len(points)} points uploaded and executed in {results[protocol]:.3f} s")
+    return results
+
+def main():
+    from moshionPlanning import MoshionController
+    from VelocityPFP import synchronized_move_time, generate_synchronized_profiles
+
+    # Points of a jog like the state machine sends, repeated into a long plan
+    displacements = np.array([40, 30, 20, 10, 5, 60])
+    sys_time = synchronized_move_time(displacements, 13, 12)
+    time_values = np.linspace(0, sys_time, int(sys_time/0.05))
+    _, profiles = generate_synchronized_profiles(displacements, 13, 12, time_values, sys_time)
+    points = MoshionController().move_motors(list(zip(*profiles))) * 40
+
+    print("Instant link, no parse latency")
+    run_benchmark(points)
+    print("\n115200 baud, 50 us per parsed line, 5 us per frame")
+    run_benchmark(points, baud_rate=115200, line_latency=50e-6, frame_latency=5e-6)
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,37 @@ import matplotlib.animation as animation
 from scipy.spatial.transform import Rotation as R
 import random
 import time
+import multiprocessing
+import hashlib
+import json
+import os
+import atexit
+import weakref
+from collections import OrderedDict
+from quaternions import *
+
+IK_CACHE_SIZE = 1024  # Cache size of the jog and waypoint flows, which re-solve the same poses
 
 class RobotArm:
-    def __init__(self, urdf_file_path: str = None, initial_position: list = None) -> None:
+    def __init__(
+        self,
+        urdf_file_path: str = None,
+        initial_position: list = None,
+        ik_cache_size: int = 0,
+        ik_cache_file: str = None,
+        ik_cache_resolution: float = 1e-6
+    ) -> None:
         """Initialize the RobotArm object.
 
         Args:
             urdf_file_path (str): Path to the URDF file.
+            initial_position (list, optional): Initial joint angles. Defaults to None.
+            ik_cache_size (int, optional): Maximum number of cached IK solutions, 0 disables the cache. The jog and
+                waypoint flows pass IK_CACHE_SIZE. Defaults to 0.
+            ik_cache_file (str, optional): JSON file the IK cache is loaded from here and saved to when the
+                interpreter exits, if the cache is enabled. Without it the cache only lives in memory for this run. Defaults to None.
+            ik_cache_resolution (float, optional): Quantization step of the cache keys (m for positions,
+                quaternion units for orientations). Defaults to 1e-6.
 
         Raises:
             ValueError: If an error occurs during initialization.
@@ -21,18 +45,478 @@ class RobotArm:
         try:
             # Create a robot chain from the URDF file
             self.my_chain = ikpy.chain.Chain.from_urdf_file(urdf_file_path, active_links_mask=[False, True, True, False, True, True, False, True, True])
+            self.urdf_file_path = urdf_file_path
             self.last_angles = initial_position
             self.initial_position = initial_position
             self.is_animating = False
+
+            # LRU cache of IK solutions, tied to the URDF contents
+            with open(urdf_file_path, "rb") as urdf_file:
+                self.urdf_hash = hashlib.sha256(urdf_file.read()).hexdigest()
+            self.ik_cache = OrderedDict()
+            self.ik_cache_size = ik_cache_size
+            self.ik_cache_file = ik_cache_file
+            self.ik_cache_resolution = ik_cache_resolution
+            self.ik_cache_hits = 0
+            self.ik_cache_misses = 0
+            if ik_cache_file is not None and ik_cache_size > 0:
+                if os.path.exists(ik_cache_file):
+                    self.load_ik_cache(ik_cache_file)
+                atexit.register(_save_ik_cache_at_exit, weakref.ref(self))
+
+            # Pre-fold the fixed link origins so batched FK only has to apply the joint rotations
+            self.fk_constants, self.fk_axes, self.fk_tool = self._build_fk_constants()
+            self.fk_axis_matrices = [axis_cross_matrices(axis) for _, axis in self.fk_axes]
+
+            # Geometry for the analytic IK backend (None if the chain does not have the expected layout)
+            self.analytic_geometry = self._build_analytic_geometry()
         except Exception as e:
             raise ValueError(f"Error initializing the robot arm: {e}")
 
+    def _build_fk_constants(self) -> tuple:
+        """Collapse the chain links into constant transforms and joint axes for batched FK.
+
+        Every link of the chain is ``origin translation @ origin rpy @ axis rotation``. Fixed links
+        have no axis rotation, so they are folded into the constant transform of the next revolute joint.
+
+        Returns:
+            tuple: (constants, axes, tool) where constants[k] is the 4x4 transform applied before the
+                k-th revolute joint, axes[k] is (link index, unit rotation axis) and tool is the 4x4
+                transform after the last revolute joint.
+        """
+        constants = []
+        axes = []
+        pending = np.eye(4)
+
+        for index, link in enumerate(self.my_chain.links):
+            origin_translation = getattr(link, "origin_translation", None)
+            origin_orientation = getattr(link, "origin_orientation", None)
+
+            if origin_translation is not None:
+                roll, pitch, yaw = origin_orientation
+                origin = np.eye(4)
+                origin[:3, :3] = rotate_z(rotate_y(rotate_x(np.eye(3), roll), pitch), yaw)
+                origin[:3, 3] = origin_translation
+                pending = pending @ origin
+
+            if getattr(link, "joint_type", "fixed") == "revolute":
+                axis = np.array(link.rotation, dtype=np.float64)
+                constants.append(pending)
+                axes.append((index, axis / np.linalg.norm(axis)))
+                pending = np.eye(4)
+
+        return constants, axes, pending
+
+    def calculate_fk_batch(self, joint_angles: np.ndarray) -> np.ndarray:
+        """Calculate forward kinematics for a whole trajectory of joint vectors in one NumPy pass.
+
+        This is the vectorized counterpart of calculate_fk: instead of calling
+        Chain.forward_kinematics once per sample, every joint rotation is built for all samples
+        at once (Rodrigues formula) and chained with batched matrix products.
+
+        Args:
+            joint_angles (np.ndarray): Array of shape (N, 9) with one chain joint vector per row.
+
+        Returns:
+            np.ndarray: Array of shape (N, 4, 4) with the end effector transform of each row.
+
+        Raises:
+            ValueError: If the joint array does not have one column per chain link.
+        """
+        joints = np.atleast_2d(np.asarray(joint_angles, dtype=np.float64))
+        if joints.shape[1] != len(self.my_chain.links):
+            raise ValueError(f"Joint array has {joints.shape[1]} columns but the chain has {len(self.my_chain.links)} links")
+
+        frames = self._chain_frames_batch(joints)
+
+        if len(joints):
+            self.last_angles = joints[-1]
+
+        return frames
+
+    def _chain_frames_batch(self, joints: np.ndarray) -> np.ndarray:
+        """Chain the folded link constants and joint rotations for an (N, 9) joint array.
+
+        Args:
+            joints (np.ndarray): Array of shape (N, 9) with one chain joint vector per row.
+
+        Returns:
+            np.ndarray: Array of shape (N, 4, 4) with the end effector transform of each row.
+        """
+        frames = np.broadcast_to(np.eye(4), (joints.shape[0], 4, 4))
+
+        for constant, (index, axis) in zip(self.fk_constants, self.fk_axes):
+            frames = frames @ constant
+            frames = frames @ axis_rotation_batch(axis, joints[:, index])
+
+        return frames @ self.fk_tool
+
+    def _build_analytic_geometry(self) -> dict:
+        """Extract the link lengths and offsets used by the analytic IK backend.
+
+        The solver expects a yaw joint, a shoulder and an elbow with parallel axes (a planar arm with
+        a lateral offset), a forearm roll joint, a wrist pitch joint whose axis meets the forearm roll
+        axis, and a tool roll joint. In urdf_tes2.urdf the tool roll axis is offset from that point
+        along the wrist pitch axis, so the wrist is not exactly spherical; the solver handles that
+        offset with a 1-D search around the tool axis instead of a pure decoupling.
+
+        Returns:
+            dict: The solver geometry, or None if the chain does not match the expected layout.
+        """
+        if len(self.fk_axes) != 6:
+            return None
+
+        tol = 1e-9
+        constants = self.fk_constants
+        a0, a1, a2, a3, a4, a5 = [axis for _, axis in self.fk_axes]
+
+        def is_pure_translation(transform):
+            return np.allclose(transform[:3, :3], np.eye(3), atol=tol)
+
+        def is_parallel(u, v):
+            return np.linalg.norm(np.cross(u, v)) < tol
+
+        # Wrist pitch axis expressed in the forearm roll frame
+        pitch_axis = constants[4][:3, :3] @ a4
+        wrist_offset = constants[4][:3, 3] @ pitch_axis
+        forearm_axial = constants[4][:3, 3] - wrist_offset * pitch_axis
+
+        layout_ok = (
+            is_pure_translation(constants[1]) and is_pure_translation(constants[2])
+            and is_pure_translation(constants[3]) and is_pure_translation(constants[5])
+            and is_parallel(constants[1][:3, 3], a0) and abs(a0 @ a1) < tol and is_parallel(a1, a2)
+            and abs(a3 @ pitch_axis) < tol and is_parallel(forearm_axial, a3)
+            and abs(a5 @ a4) < tol and is_parallel(constants[5][:3, 3], a5)
+        )
+        if not layout_ok:
+            return None
+
+        # Planar basis of the shoulder/elbow plane: e_a along the yaw axis, e_n along the shoulder axis
+        e_a, e_n = a0, a1
+        e_m = np.cross(e_n, e_a)
+        forearm = constants[3][:3, 3] + forearm_axial
+
+        # A reference vector perpendicular to the tool roll axis, used to read the tool roll angle
+        reference = np.eye(3)[np.argmin(np.abs(a5))]
+        tool_reference = reference - (reference @ a5) * a5
+
+        return {
+            "basis": (e_a, e_n, e_m),
+            "base": constants[0],
+            "shoulder": constants[1][:3, 3],
+            "upper_arm": complex(constants[2][:3, 3] @ e_a, constants[2][:3, 3] @ e_m),
+            "forearm": complex(forearm @ e_a, forearm @ e_m),
+            "lateral": constants[2][:3, 3] @ e_n + forearm @ e_n,
+            "elbow_sign": float(np.sign(a2 @ a1)),
+            "pitch_axis": pitch_axis,
+            "pitch_rotation": constants[4][:3, :3],
+            "wrist_offset": wrist_offset,
+            "tool_length": constants[5][:3, 3] @ a5,
+            "tool_reference": tool_reference / np.linalg.norm(tool_reference),
+            "tool_inverse": np.linalg.inv(self.fk_tool),
+        }
+
+    def _analytic_arm(self, wrist_points: np.ndarray, shoulder: np.ndarray, elbow: np.ndarray) -> tuple:
+        """Solve the yaw, shoulder and elbow joints that place the wrist pitch point at wrist_points.
+
+        Args:
+            wrist_points (np.ndarray): Array of shape (M, 3) with wrist pitch points in the base frame.
+            shoulder (np.ndarray): Shoulder branch of each row (0 or 1).
+            elbow (np.ndarray): Elbow branch of each row (0 or 1).
+
+        Returns:
+            tuple: (q1, q2, q3, excess), each of shape (M,). excess is how far a point is out of reach,
+                0 where it is reachable.
+        """
+        geometry = self.analytic_geometry
+        e_a, e_n, e_m = geometry["basis"]
+        base = geometry["base"]
+        upper_arm = geometry["upper_arm"]
+        forearm = geometry["forearm"]
+        lateral = geometry["lateral"]
+
+        # Wrist point in the yaw joint frame, relative to the shoulder
+        points = (wrist_points - base[:3, 3]) @ base[:3, :3] - geometry["shoulder"]
+
+        # Yaw: the point seen from above is the planar reach rotated by q1, shifted by the lateral offset
+        horizontal = points @ e_m + 1j * (points @ e_n)
+        reach_squared = np.abs(horizontal) ** 2 - lateral ** 2
+        reach = (1 - 2 * shoulder) * np.sqrt(np.maximum(reach_squared, 0))
+        q1 = np.angle(horizontal) - np.angle(reach + 1j * lateral)
+
+        # Shoulder and elbow: two-link planar arm in the (e_a, e_m) plane
+        planar = points @ e_a + 1j * reach
+        cos_elbow = (np.abs(planar) ** 2 - abs(upper_arm) ** 2 - abs(forearm) ** 2) / (2 * abs(upper_arm) * abs(forearm))
+        excess = np.maximum(-reach_squared, 0) + np.maximum(np.abs(cos_elbow) - 1, 0)
+
+        elbow_angle = (1 - 2 * elbow) * np.arccos(np.clip(cos_elbow, -1, 1)) - (np.angle(forearm) - np.angle(upper_arm))
+        q3 = geometry["elbow_sign"] * elbow_angle
+        q2 = np.angle(planar) - np.angle(upper_arm + np.exp(1j * elbow_angle) * forearm)
+
+        return q1, q2, q3, excess
+
+    def _analytic_forearm_axis(self, q1: np.ndarray, q2: np.ndarray, q3: np.ndarray) -> np.ndarray:
+        """Return the forearm roll axis in the base frame for arrays of q1, q2 and q3."""
+        (_, a0), (_, a1), (_, a2), (_, a3) = self.fk_axes[:4]
+        axis = np.broadcast_to(a3, (len(q1), 3))
+        axis = rotate_vectors(a2, q3, axis)
+        axis = rotate_vectors(a1, q2, axis)
+        axis = rotate_vectors(a0, q1, axis)
+        return axis @ self.analytic_geometry["base"][:3, :3].T
+
+    def _analytic_wrist_residual(self, centers: np.ndarray, frames: np.ndarray, phi: np.ndarray, shoulder: np.ndarray, elbow: np.ndarray) -> tuple:
+        """Evaluate the wrist closure condition for candidate wrist pitch axis directions.
+
+        The wrist pitch axis must be perpendicular to the tool roll axis, so it is parametrized by an
+        angle phi around it. For each phi the wrist pitch point follows from the wrist offset, the arm
+        is solved in closed form and the residual is the component of the forearm roll axis along the
+        pitch axis, which has to be zero.
+
+        Args:
+            centers (np.ndarray): Array of shape (M, 3) with the tool roll joint origins.
+            frames (np.ndarray): Array of shape (M, 2, 3) with two unit vectors perpendicular to the tool axis.
+            phi (np.ndarray): Array of shape (M,) with candidate angles.
+            shoulder (np.ndarray): Shoulder branch of each row (0 or 1).
+            elbow (np.ndarray): Elbow branch of each row (0 or 1).
+
+        Returns:
+            tuple: (residual, pitch_axis, q1, q2, q3, excess) with residual set to NaN where the arm cannot
+                reach and excess how far out of reach it is there, see _analytic_arm.
+        """
+        pitch_axis = np.cos(phi)[:, None] * frames[:, 0] + np.sin(phi)[:, None] * frames[:, 1]
+        wrist_points = centers - self.analytic_geometry["wrist_offset"] * pitch_axis
+
+        q1, q2, q3, excess = self._analytic_arm(wrist_points, shoulder, elbow)
+        residual = np.einsum("ij,ij->i", self._analytic_forearm_axis(q1, q2, q3), pitch_axis)
+        residual[excess > 0] = np.nan
+
+        return residual, pitch_axis, q1, q2, q3, excess
+
+    def calculate_ik_analytic(
+        self,
+        target_positions: list,
+        target_orientations: list,
+        grid_size: int = 120,
+        tolerance: float = 1e-6
+    ) -> np.ndarray:
+        """Solve the full-pose IK of every target and return every branch.
+
+        The arm has 4 closed-form branches (shoulder left/right, elbow up/down). Because the tool roll
+        axis is offset from the wrist, each arm branch has up to 4 wrist solutions instead of the
+        2 of a spherical wrist, so up to 16 branches are returned, indexed
+        (shoulder * 2 + elbow) * 4 + wrist. Branches that do not exist for a target (out of reach,
+        wrist singularity) are filled with NaN. Every returned branch is checked with the batched FK
+        against the target.
+
+        Args:
+            target_positions (list): List of N target positions.
+            target_orientations (list): List of N 3x3 target orientation matrices.
+            grid_size (int, optional): Number of samples of the grid the wrist roots are bracketed on, which
+                is refined around close roots (see _analytic_wrist_brackets). Defaults to 120.
+            tolerance (float, optional): Maximum position (m) and orientation error of a valid branch. Defaults to 1e-6.
+
+        Returns:
+            np.ndarray: Array of shape (N, 16, 9) with the chain joint vectors of every branch.
+
+        Raises:
+            ValueError: If the chain does not have the layout the analytic solver needs.
+        """
+        geometry = self.analytic_geometry
+        if geometry is None:
+            raise ValueError("The robot chain does not have the layout required by the analytic IK solver")
+
+        positions = np.atleast_2d(np.asarray(target_positions, dtype=np.float64))
+        orientations = np.asarray(target_orientations, dtype=np.float64).reshape(-1, 3, 3)
+        num_targets = len(positions)
+        a5 = self.fk_axes[5][1]
+
+        # Remove the tool transform, then locate the tool roll joint origin on the tool axis
+        tool_inverse = geometry["tool_inverse"]
+        flange_orientations = orientations @ tool_inverse[:3, :3]
+        flange_positions = positions + orientations @ tool_inverse[:3, 3]
+        tool_axes = flange_orientations @ a5
+        centers = flange_positions - geometry["tool_length"] * tool_axes
+
+        # Two unit vectors spanning the plane perpendicular to the tool axis
+        reference = np.where((np.abs(tool_axes[:, 0]) < 0.9)[:, None], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        first = reference - np.einsum("ij,ij->i", reference, tool_axes)[:, None] * tool_axes
+        first /= np.linalg.norm(first, axis=1)[:, None]
+        frames = np.stack([first, np.cross(tool_axes, first)], axis=1)
+
+        # Refine every wrist root bracket at once with the Illinois variant of regula falsi
+        rows, low, high, residual_low, residual_high = self._analytic_wrist_brackets(centers, frames, grid_size)
+        args = (centers[rows // 4], frames[rows // 4])
+        branch_args = ((rows % 4) // 2, rows % 2)
+        for _ in range(12):
+            denominator = residual_high - residual_low
+            denominator[denominator == 0] = 1
+            middle = high - residual_high * (high - low) / denominator
+            residual_middle = self._analytic_wrist_residual(*args, middle, *branch_args)[0]
+            crossed = np.sign(residual_middle) != np.sign(residual_high)
+            low = np.where(crossed, high, low)
+            residual_low = np.where(crossed, residual_high, residual_low / 2)
+            high, residual_high = middle, residual_middle
+
+        # Up to 4 wrist roots per arm branch, in the order of phi
+        order = np.lexsort((np.mod(high, 2 * np.pi), rows))
+        rows, high = rows[order], high[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        rows, high, slots = rows[rank < 4], high[rank < 4], (rows * 4 + rank)[rank < 4]
+
+        _, pitch_axis, q1, q2, q3, _ = self._analytic_wrist_residual(centers[rows // 4], frames[rows // 4], high, (rows % 4) // 2, rows % 2)
+        solutions = np.full((num_targets * 16, len(self.my_chain.links)), np.nan)
+        solutions[slots] = self._analytic_wrist(q1, q2, q3, pitch_axis, flange_orientations[rows // 4])
+        targets = np.repeat(np.arange(num_targets), 16)
+
+        # Keep only the branches that reproduce the target pose
+        finite = np.all(np.isfinite(solutions), axis=1)
+        frames_fk = self._chain_frames_batch(np.where(finite[:, None], solutions, 0))
+        position_error = np.linalg.norm(frames_fk[:, :3, 3] - positions[targets], axis=1)
+        orientation_error = np.max(np.abs(frames_fk[:, :3, :3] - orientations[targets]), axis=(1, 2))
+        solutions[~(finite & (position_error < tolerance) & (orientation_error < tolerance))] = np.nan
+
+        return solutions.reshape(num_targets, 16, -1)
+
+    def _analytic_wrist_brackets(self, centers: np.ndarray, frames: np.ndarray, grid_size: int, zoom_levels: int = 6) -> tuple:
+        """Bracket the wrist roots of every target and arm branch.
+
+        The residual is sampled on a grid of phi and every sign change brackets a root. Two roots in
+        one grid cell, a root where the residual only touches zero and a root between the last
+        reachable sample and the edge of the reachable range show no sign change on the grid. So every
+        cell next to a local minimum of |residual| (or of the reach excess where the arm cannot reach)
+        that is low enough to reach zero, judging by the rise to its neighbours, and every cell at the
+        edge of the reachable range is resampled 8x finer, and so on for zoom_levels. The minima still
+        left after that are returned as zero-width brackets, for the FK check to accept as tangent
+        roots or not.
+
+        Args:
+            centers (np.ndarray): Array of shape (N, 3) with the tool roll joint origins.
+            frames (np.ndarray): Array of shape (N, 2, 3) with two unit vectors perpendicular to the tool axis.
+            grid_size (int): Number of samples of the first grid.
+            zoom_levels (int, optional): Number of times a cell is resampled. Defaults to 6.
+
+        Returns:
+            tuple: (rows, low, high, residual_low, residual_high) with one entry per bracket, the row
+                being target * 4 + arm branch.
+        """
+        # First grid over the full turn, padded with one sample on each side as phi wraps around
+        step = 2 * np.pi / grid_size
+        rows = np.arange(len(centers) * 4)
+        phi = np.broadcast_to(np.arange(-1, grid_size + 1) * step, (len(rows), grid_size + 2))
+        cells = slice(1, grid_size + 1)
+
+        brackets = []
+        for level in range(zoom_levels + 1):
+            samples = phi.shape[1]
+            residual, _, _, _, _, excess = self._analytic_wrist_residual(
+                np.repeat(centers[rows // 4], samples, axis=0), np.repeat(frames[rows // 4], samples, axis=0), phi.reshape(-1),
+                np.repeat((rows % 4) // 2, samples), np.repeat(rows % 2, samples)
+            )
+            residual, excess = residual.reshape(-1, samples), excess.reshape(-1, samples)
+
+            # Sign changes and reach edges in the cells between consecutive samples
+            reachable = np.isfinite(residual)
+            inside = np.zeros(samples - 1, dtype=bool)
+            inside[cells] = True
+            crossing = inside & reachable[:, :-1] & reachable[:, 1:] & (np.sign(residual[:, :-1]) != np.sign(residual[:, 1:]))
+            found, cell = np.nonzero(crossing)
+            brackets.append((rows[found], phi[found, cell], phi[found, cell + 1], residual[found, cell], residual[found, cell + 1]))
+
+            # Minima that can reach zero, unreachable samples ranking above every reachable one (|residual| <= 1)
+            value = np.where(reachable, np.abs(residual), excess)
+            rank = np.where(reachable, value, 1 + excess)
+            middle, before, after = rank[:, 1:-1], rank[:, :-2], rank[:, 2:]
+            minimum = np.zeros_like(reachable)
+            minimum[:, 1:-1] = (middle <= before) & (middle < after) & (value[:, 1:-1] <= before + after - 2 * middle)
+
+            if level == zoom_levels:
+                found, sample = np.nonzero(minimum)
+                brackets.append((rows[found], phi[found, sample], phi[found, sample], residual[found, sample], residual[found, sample]))
+                break
+
+            # Resample the cells on either side of the minima and at the reach edges
+            zoom = inside & ~crossing & (minimum[:, :-1] | minimum[:, 1:] | (reachable[:, :-1] != reachable[:, 1:]))
+            found, cell = np.nonzero(zoom)
+            rows = rows[found]
+            phi = np.linspace(phi[found, cell], phi[found, cell + 1], 9, axis=1)
+            cells = slice(0, 8)
+
+        return tuple(np.concatenate(parts) for parts in zip(*brackets))
+
+    def _analytic_wrist(self, q1: np.ndarray, q2: np.ndarray, q3: np.ndarray, pitch_axis: np.ndarray, orientations: np.ndarray) -> np.ndarray:
+        """Solve the forearm roll, wrist pitch and tool roll joints once the arm joints are known.
+
+        Args:
+            q1, q2, q3 (np.ndarray): Arrays of shape (M,) with the arm joints.
+            pitch_axis (np.ndarray): Array of shape (M, 3) with the wrist pitch axis in the base frame.
+            orientations (np.ndarray): Array of shape (M, 3, 3) with the flange orientations.
+
+        Returns:
+            np.ndarray: Array of shape (M, 9) with the chain joint vectors.
+        """
+        geometry = self.analytic_geometry
+        (i1, a0), (i2, a1), (i3, a2), (i4, a3), (i5, a4), (i6, a5) = self.fk_axes
+
+        # Orientation of the forearm roll frame, before the roll
+        forearm = geometry["base"][:3, :3] @ axis_rotation_batch(a0, q1)[:, :3, :3] @ axis_rotation_batch(a1, q2)[:, :3, :3] @ axis_rotation_batch(a2, q3)[:, :3, :3]
+
+        # Forearm roll turns the wrist pitch axis onto the requested direction
+        local_pitch = np.einsum("nji,nj->ni", forearm, pitch_axis)
+        q4 = signed_angle(a3, geometry["pitch_axis"], local_pitch)
+        wrist = forearm @ axis_rotation_batch(a3, q4)[:, :3, :3] @ geometry["pitch_rotation"]
+
+        # Wrist pitch turns the tool roll axis onto the tool axis of the target
+        local_tool = np.einsum("nji,nj->ni", wrist, orientations @ a5)
+        q5 = signed_angle(a4, a5, local_tool)
+        tool = wrist @ axis_rotation_batch(a4, q5)[:, :3, :3]
+
+        # Tool roll is the remaining rotation about the tool axis
+        remaining = np.einsum("nji,njk->nik", tool, orientations)
+        q6 = signed_angle(a5, geometry["tool_reference"], remaining @ geometry["tool_reference"])
+
+        joints = np.zeros((len(q1), len(self.my_chain.links)))
+        for index, angle in zip((i1, i2, i3, i4, i5, i6), (q1, q2, q3, q4, q5, q6)):
+            joints[:, index] = wrap_angle(angle)
+        return joints
+
+    def select_ik_branch(self, branches: np.ndarray, reference: np.ndarray = None) -> np.ndarray:
+        """Pick the IK branch closest to a reference joint vector.
+
+        Branches outside the chain joint bounds are skipped. The chosen branch is unwrapped by whole
+        turns towards the reference when that stays inside the bounds, so consecutive samples of a
+        trajectory do not jump by 2*pi.
+
+        Args:
+            branches (np.ndarray): Array of shape (16, 9) as returned by calculate_ik_analytic for one target.
+            reference (np.ndarray, optional): Reference joint vector. Defaults to the last angles.
+
+        Returns:
+            np.ndarray: The selected joint vector, or None if no branch is valid.
+        """
+        if reference is None:
+            reference = self.last_angles if self.last_angles is not None else np.zeros(len(self.my_chain.links))
+        reference = np.asarray(reference, dtype=np.float64)
+
+        lower = np.array([-np.inf if link.bounds[0] is None else link.bounds[0] for link in self.my_chain.links])
+        upper = np.array([np.inf if link.bounds[1] is None else link.bounds[1] for link in self.my_chain.links])
+        valid = np.all(np.isfinite(branches), axis=1) & np.all((branches >= lower) & (branches <= upper), axis=1)
+        if not np.any(valid):
+            return None
+
+        difference = wrap_angle(branches[valid] - reference)
+        best = np.argmin(np.linalg.norm(difference, axis=1))
+        unwrapped = reference + difference[best]
+        if np.all((unwrapped >= lower) & (unwrapped <= upper)):
+            return unwrapped
+        return branches[valid][best]
+
     def calculate_ik(
         self,
         target_positions: list,
         target_orientations: list = [np.eye(3)],
         orientation_modes: list = ["all"],
-        batch_size: int = 1
+        batch_size: int = 1,
+        solver: str = "numeric"
     ) -> iter:
         """Perform inverse kinematics calculations.
 
@@ -41,24 +525,50 @@ class RobotArm:
             target_orientations (list): List of target orientations.
             orientation_modes (list): List of orientation modes.
             batch_size (int, optional): Batch size for calculations. Defaults to 1.
+            solver (str, optional): "numeric" for the ikpy optimizer or "analytic" for calculate_ik_analytic.
+                The analytic backend solves each batch at once and only handles the "all" orientation
+                mode; any target it cannot solve falls back to the numeric solver. Defaults to "numeric".
 
         Yields:
             list: List of inverse kinematics angles or an empty list if an error occurs.
         """
+        if solver not in ("numeric", "analytic"):
+            raise ValueError(f"Unknown IK solver: {solver}")
+
         for i in range(0, len(target_positions), batch_size):
             positions_batch = target_positions[i:i + batch_size]
             orientations_batch = target_orientations[i:i + batch_size]
             orientation_batch = orientation_modes[i:i + batch_size]
-            for target_position, target_orientation, orientation_mode in zip(positions_batch, orientations_batch, orientation_batch):
+
+            analytic_batch = None
+            if solver == "analytic" and self.analytic_geometry is not None:
                 try:
-                    # Use last angles if available
-                    if self.last_angles is not None:
-                        ik = self.my_chain.inverse_kinematics(target_position, target_orientation, orientation_mode=orientation_mode, initial_position=self.last_angles)
+                    analytic_batch = self.calculate_ik_analytic(positions_batch, orientations_batch)
+                except Exception as e:
+                    print(f"Analytic inverse kinematics failed, using the numeric solver: {e}")
+
+            for j, (target_position, target_orientation, orientation_mode) in enumerate(zip(positions_batch, orientations_batch, orientation_batch)):
+                try:
+                    cache_key = self._ik_cache_key(target_position, target_orientation, orientation_mode, solver)
+                    cached = self._ik_cache_lookup(cache_key)
+
+                    if cached is not None:
+                        ik, achieved_position, achieved_orientation = (np.array(value) for value in cached)
                     else:
-                        ik = self.my_chain.inverse_kinematics(target_position, target_orientation, orientation_mode=orientation_mode)
-                    fk = self.my_chain.forward_kinematics(ik)
-                    achieved_position = fk[:3, 3]
-                    achieved_orientation = fk[:3, :3]
+                        ik = None
+                        if analytic_batch is not None and orientation_mode == "all":
+                            ik = self.select_ik_branch(analytic_batch[j])
+
+                        if ik is None:
+                            # Use last angles if available
+                            if self.last_angles is not None:
+                                ik = self.my_chain.inverse_kinematics(target_position, target_orientation, orientation_mode=orientation_mode, initial_position=self.last_angles)
+                            else:
+                                ik = self.my_chain.inverse_kinematics(target_position, target_orientation, orientation_mode=orientation_mode)
+                        fk = self.my_chain.forward_kinematics(ik)
+                        achieved_position = fk[:3, 3]
+                        achieved_orientation = fk[:3, :3]
+                        self._ik_cache_store(cache_key, (ik, achieved_position, achieved_orientation))
 
                     # Calculate error between target and achieved position/orientation
                     position_error = target_position - achieved_position
@@ -71,6 +581,291 @@ class RobotArm:
                     print(f"An unexpected error occurred during inverse kinematics calculation: {e}")
                     yield []  # Return an empty list if an error occurs
 
+    def _ik_cache_key(self, target_position, target_orientation, orientation_mode: str, solver: str) -> tuple:
+        """Build the IK cache key of a target.
+
+        The key is the quantized position, the quantized orientation (a quaternion with w >= 0 for
+        the "all" mode), the orientation mode, the solver and the warm-start branch. The branch is the
+        quadrant of every joint of the last angles, so a pose reached from another arm configuration
+        (elbow up/down, wrist flip) is solved again instead of returning a solution the arm would
+        have to jump to.
+
+        Returns:
+            tuple: The cache key, or None if the cache is disabled.
+        """
+        if self.ik_cache_size <= 0:
+            return None
+
+        if orientation_mode == "all":
+            orientation = rotation_matrix_to_quaternion(target_orientation)
+            if orientation[0] < 0:
+                orientation = -orientation
+        else:
+            orientation = np.ravel(np.asarray(target_orientation, dtype=np.float64))
+
+        def quantize(values):
+            return tuple(int(value) for value in np.round(np.asarray(values, dtype=np.float64) / self.ik_cache_resolution))
+
+        branch = None
+        if self.last_angles is not None:
+            branch = tuple(int(value) for value in np.floor(np.asarray(self.last_angles, dtype=np.float64) / (np.pi / 2)))
+
+        return (quantize(target_position), quantize(orientation), orientation_mode, solver, branch)
+
+    def _ik_cache_lookup(self, key: tuple) -> tuple:
+        """Return the cached (ik, achieved position, achieved orientation) of a key, or None on a miss."""
+        if key is None:
+            return None
+
+        cached = self.ik_cache.get(key)
+        if cached is None:
+            self.ik_cache_misses += 1
+            return None
+
+        self.ik_cache.move_to_end(key)
+        self.ik_cache_hits += 1
+        return cached
+
+    def _ik_cache_store(self, key: tuple, value: tuple) -> None:
+        """Store an IK result and evict the least recently used entries above the cache size."""
+        if key is None:
+            return
+
+        self.ik_cache[key] = value
+        self.ik_cache.move_to_end(key)
+        while len(self.ik_cache) > self.ik_cache_size:
+            self.ik_cache.popitem(last=False)
+
+    def ik_cache_info(self) -> dict:
+        """Return the IK cache statistics.
+
+        Returns:
+            dict: hits, misses, hit rate, current size and maximum size of the cache.
+        """
+        lookups = self.ik_cache_hits + self.ik_cache_misses
+        return {
+            "hits": self.ik_cache_hits,
+            "misses": self.ik_cache_misses,
+            "hit_rate": self.ik_cache_hits / lookups if lookups else 0.0,
+            "size": len(self.ik_cache),
+            "max_size": self.ik_cache_size,
+        }
+
+    def clear_ik_cache(self) -> None:
+        """Remove every cached IK solution and reset the counters."""
+        self.ik_cache.clear()
+        self.ik_cache_hits = 0
+        self.ik_cache_misses = 0
+
+    def save_ik_cache(self, file_path: str = None) -> bool:
+        """Write the IK cache to a JSON file, tagged with the URDF hash.
+
+        Args:
+            file_path (str, optional): Path to the JSON file. Defaults to ik_cache_file.
+
+        Returns:
+            bool: True if writing is successful, False otherwise.
+        """
+        file_path = file_path or self.ik_cache_file
+        try:
+            entries = [
+                [[list(key[0]), list(key[1]), key[2], key[3], None if key[4] is None else list(key[4])],
+                 np.asarray(ik).tolist(), np.asarray(position).tolist(), np.asarray(orientation).tolist()]
+                for key, (ik, position, orientation) in self.ik_cache.items()
+            ]
+            with open(file_path, 'w') as json_file:
+                json.dump({"urdf_hash": self.urdf_hash, "resolution": self.ik_cache_resolution, "entries": entries}, json_file)
+            return True
+        except Exception as e:
+            print(f"An unexpected error occurred while saving the IK cache: {e}")
+            return False
+
+    def load_ik_cache(self, file_path: str = None) -> bool:
+        """Load an IK cache written by save_ik_cache.
+
+        The file is ignored if it was written for a different URDF (hash mismatch) or with a different
+        key resolution, since its solutions would no longer match the chain.
+
+        Args:
+            file_path (str, optional): Path to the JSON file. Defaults to ik_cache_file.
+
+        Returns:
+            bool: True if the cache was loaded, False otherwise.
+        """
+        file_path = file_path or self.ik_cache_file
+        try:
+            with open(file_path, 'r') as json_file:
+                data = json.load(json_file)
+
+            if data.get("urdf_hash") != self.urdf_hash or data.get("resolution") != self.ik_cache_resolution:
+                print("IK cache file does not match the current URDF, ignoring it")
+                return False
+
+            for key, ik, position, orientation in data["entries"]:
+                key = (tuple(key[0]), tuple(key[1]), key[2], key[3], None if key[4] is None else tuple(key[4]))
+                self._ik_cache_store(key, (np.array(ik), np.array(position), np.array(orientation)))
+            return True
+        except FileNotFoundError as e:
+            print(f"File not found error: {e}")
+            return False
+        except Exception as e:
+            print(f"An unexpected error occurred while loading the IK cache: {e}")
+            return False
+
+    def calculate_jacobian(self, joints: np.ndarray) -> tuple:
+        """Calculate the geometric Jacobian of the end effector for one joint vector.
+
+        Args:
+            joints (np.ndarray): Chain joint vector (9 values).
+
+        Returns:
+            tuple: (jacobian, end_effector) with the (6, 6) Jacobian of the revolute joints (linear
+                velocity rows first) and the 4x4 end effector transform.
+        """
+        frame = np.eye(4)
+        origins = []
+        axes = []
+        for constant, (index, axis), (cross, cross_squared) in zip(self.fk_constants, self.fk_axes, self.fk_axis_matrices):
+            frame = frame @ constant
+            origins.append(frame[:3, 3])
+            axes.append(frame[:3, :3] @ axis)
+            angle = joints[index]
+            frame = frame @ (np.eye(4) + np.sin(angle) * cross + (1 - np.cos(angle)) * cross_squared)
+        end_effector = frame @ self.fk_tool
+
+        # Columns are [axis x (end - origin); axis] for every revolute joint
+        axes = np.array(axes).T
+        lever = end_effector[:3, 3, None] - np.array(origins).T
+        jacobian = np.empty((6, axes.shape[1]))
+        jacobian[0] = axes[1] * lever[2] - axes[2] * lever[1]
+        jacobian[1] = axes[2] * lever[0] - axes[0] * lever[2]
+        jacobian[2] = axes[0] * lever[1] - axes[1] * lever[0]
+        jacobian[3:] = axes
+
+        return jacobian, end_effector
+
+    def calculate_ik_stream(
+        self,
+        targets: iter,
+        max_iterations: int = 3,
+        damping: float = 0.01,
+        tolerance: float = 1e-6,
+        fallback_threshold: float = 1e-3,
+        solver: str = "numeric"
+    ) -> iter:
+        """Track a densely sampled stream of full-pose targets with damped least squares.
+
+        Each sample starts from the previous solution and takes at most max_iterations DLS steps
+        dq = J^T (J J^T + damping^2 I)^-1 e, where e is the 6-D pose error. If the residual is still
+        above fallback_threshold the sample is re-solved with calculate_ik (solver backend), which is
+        also used for the first sample when there are no last angles.
+
+        Args:
+            targets (iter): Iterable of (position, 3x3 orientation) targets, e.g. a generator.
+            max_iterations (int, optional): Maximum DLS steps per sample. Defaults to 3.
+            damping (float, optional): DLS damping factor. Defaults to 0.01.
+            tolerance (float, optional): Residual below which a sample stops iterating. Defaults to 1e-6.
+            fallback_threshold (float, optional): Residual above which the full solver is used. Defaults to 1e-3.
+            solver (str, optional): Backend of the full solver fallback. Defaults to "numeric".
+
+        Yields:
+            tuple: (ik, iterations, residual, fallback) for every target, where residual is the norm of the
+                pose error (position in m, orientation in rad) and fallback tells if the full solver was used.
+        """
+        lower = np.array([-np.inf if link.bounds[0] is None else link.bounds[0] for link in self.my_chain.links])
+        upper = np.array([np.inf if link.bounds[1] is None else link.bounds[1] for link in self.my_chain.links])
+        indices = [index for index, _ in self.fk_axes]
+
+        for target_position, target_orientation in targets:
+            target_position = np.asarray(target_position, dtype=np.float64)
+            target_orientation = np.asarray(target_orientation, dtype=np.float64)
+
+            iterations = 0
+            residual = np.inf
+            if self.last_angles is not None:
+                joints = np.array(self.last_angles, dtype=np.float64)
+                while True:
+                    jacobian, end_effector = self.calculate_jacobian(joints)
+                    error = pose_error(target_position, target_orientation, end_effector)
+                    residual = np.linalg.norm(error)
+                    if residual < tolerance or iterations == max_iterations:
+                        break
+
+                    step = jacobian.T @ np.linalg.solve(jacobian @ jacobian.T + damping ** 2 * np.eye(6), error)
+                    joints[indices] += step
+                    joints = np.clip(joints, lower, upper)
+                    iterations += 1
+
+            fallback = residual > fallback_threshold
+            if fallback:
+                result = next(self.calculate_ik([target_position], [target_orientation], ["all"], solver=solver))
+                if not len(result):
+                    yield [], iterations, residual, fallback
+                    continue
+                joints = np.asarray(result[0], dtype=np.float64)
+                end_effector = self._chain_frames_batch(joints[None])[0]
+                residual = np.linalg.norm(pose_error(target_position, target_orientation, end_effector))
+
+            self.last_angles = joints
+            yield joints, iterations, residual, fallback
+
+    def calculate_ik_segments(
+        self,
+        segment_positions: list,
+        segment_orientations: list,
+        processes: int = None,
+        solver: str = "numeric"
+    ) -> list:
+        """Solve the IK of a multi-segment plan (e.g. T0...T12) on all cores.
+
+        Each segment is warm-started from the final joints of the previous segment. Those seeds are
+        found first by solving only the last target of every segment in order, a segment end that
+        fails passing on the last seed found, then every segment is solved in a worker process with
+        its own RobotArm and the results are returned in segment order.
+
+        Args:
+            segment_positions (list): One list of target positions per segment.
+            segment_orientations (list): One list of 3x3 target orientations per segment.
+            processes (int, optional): Number of worker processes. Defaults to the number of cores.
+            solver (str, optional): IK backend passed to calculate_ik. Defaults to "numeric".
+
+        Returns:
+            list: One (n, 9) array of joint vectors per segment, NaN for the targets that failed.
+        """
+        start = self.last_angles if self.last_angles is not None else self.initial_position
+
+        # Final joints of every segment, solved serially from the segment ends only
+        non_empty = [index for index, positions in enumerate(segment_positions) if len(positions)]
+        end_positions = [segment_positions[index][-1] for index in non_empty]
+        end_orientations = [segment_orientations[index][-1] for index in non_empty]
+        self.last_angles = start
+        end_joints = [result[0] if len(result) else None for result in self.calculate_ik(end_positions, end_orientations, ["all"] * len(non_empty), max(len(non_empty), 1), solver)]
+
+        seeds = {}
+        seed = start
+        for index, joints in zip(non_empty, end_joints):
+            seeds[index] = seed
+            if joints is not None:
+                seed = joints
+
+        tasks = [(segment_positions[index], segment_orientations[index], seeds[index], solver) for index in non_empty]
+        if processes == 1 or len(tasks) <= 1:
+            _init_ik_worker(self.urdf_file_path)
+            results = [_solve_ik_segment(task) for task in tasks]
+        else:
+            with multiprocessing.Pool(processes, initializer=_init_ik_worker, initargs=(self.urdf_file_path,)) as pool:
+                results = pool.map(_solve_ik_segment, tasks)
+
+        solutions = [np.empty((0, len(self.my_chain.links))) for _ in segment_positions]
+        for index, joints in zip(non_empty, results):
+            solutions[index] = joints
+
+        solved = [joints[np.all(np.isfinite(joints), axis=1)] for joints in results]
+        solved = [joints for joints in solved if len(joints)]
+        self.last_angles = solved[-1][-1] if solved else start
+
+        return solutions
+
     def calculate_fk(
         self,
         joint_angles: list[list[0, float, float, 0, float, float, 0, float, float]],
@@ -230,6 +1025,49 @@ class RobotArm:
             anim.save(file_name, writer='pillow')
         plt.show()
 
+_worker_robot = None
+
+def _init_ik_worker(urdf_file_path: str) -> None:
+    """Build the RobotArm used by an IK worker process.
+
+    Args:
+        urdf_file_path (str): Path to the URDF file.
+    """
+    global _worker_robot
+    _worker_robot = RobotArm(urdf_file_path)
+
+def _save_ik_cache_at_exit(robot_ref: weakref.ref) -> None:
+    """Save the IK cache of a RobotArm that is still alive when the interpreter exits.
+
+    Args:
+        robot_ref (weakref.ref): Weak reference to the RobotArm, so registering it does not keep it alive.
+    """
+    robot = robot_ref()
+    if robot is not None:
+        robot.save_ik_cache()
+
+def _solve_ik_segment(task: tuple) -> np.ndarray:
+    """Solve the IK of one trajectory segment in a worker process.
+
+    Args:
+        task (tuple): (positions, orientations, seed joints, solver).
+
+    Returns:
+        np.ndarray: Array of shape (n, 9) with one joint vector per target. A failed sample is NaN and
+            the next one is seeded from the last joints solved.
+    """
+    positions, orientations, seed, solver = task
+    _worker_robot.last_angles = seed
+
+    joints = np.full((len(positions), len(_worker_robot.my_chain.links)), np.nan)
+    for index, result in enumerate(_worker_robot.calculate_ik(positions, orientations, ["all"] * len(positions), max(len(positions), 1), solver)):
+        if len(result):
+            joints[index] = seed = result[0]
+        else:
+            _worker_robot.last_angles = seed
+
+    return joints
+
 def rotate_x(matrix, angle_x):
     """_summary_
 
@@ -284,115 +1122,111 @@ def rotate_z(matrix, angle_z):
     rotated_matrix = np.dot(rotation_matrix_z, matrix)
     return rotated_matrix
 
-def quaternion_multiply_2q(q1: np.ndarray, q2: np.ndarray) -> np.ndarray :
+def axis_rotation_batch(axis: np.ndarray, angles: np.ndarray) -> np.ndarray:
     """
-    Multiply two quaternions.
+    Build homogeneous rotation matrices about one axis for a vector of angles.
 
     Args:
-        q1 (np.array): The first quaternion [w, x, y, z].
-        q2 (np.array): The second quaternion [w, x, y, z].
+        axis (np.array): Unit rotation axis [x, y, z].
+        angles (np.array): Array of N angles (in radians).
 
     Returns:
-        np.array: The resulting quaternion.
+        np.array: Array of shape (N, 4, 4) with one homogeneous rotation per angle.
     """
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
-    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
-    return np.array([w, x, y, z])
-
-def rotate_quaternion(quat: np.ndarray, angle_x:float, angle_y:float, angle_z:float) -> np.ndarray :
+    x, y, z = axis
+    c = np.cos(angles)
+    s = np.sin(angles)
+    t = 1 - c
+
+    rotations = np.zeros((len(angles), 4, 4))
+    rotations[:, 0, 0] = t * x * x + c
+    rotations[:, 0, 1] = t * x * y - s * z
+    rotations[:, 0, 2] = t * x * z + s * y
+    rotations[:, 1, 0] = t * x * y + s * z
+    rotations[:, 1, 1] = t * y * y + c
+    rotations[:, 1, 2] = t * y * z - s * x
+    rotations[:, 2, 0] = t * x * z - s * y
+    rotations[:, 2, 1] = t * y * z + s * x
+    rotations[:, 2, 2] = t * z * z + c
+    rotations[:, 3, 3] = 1
+
+    return rotations
+
+def axis_cross_matrices(axis: np.ndarray) -> tuple:
     """
-    Rotate a quaternion around the unit vectors.
+    Homogeneous cross-product matrix K of an axis and its square, so that a rotation about the axis
+    is I + sin(angle) * K + (1 - cos(angle)) * K @ K.
 
     Args:
-        quat (np.array): The original quaternion [w, x, y, z].
-        angle_x (float): Angle to rotate around the x-axis (in radians).
-        angle_y (float): Angle to rotate around the y-axis (in radians).
-        angle_z (float): Angle to rotate around the z-axis (in radians).
+        axis (np.array): Unit rotation axis [x, y, z].
 
     Returns:
-        np.array: The rotated quaternion [w, x, y, z].
+        tuple: (K, K @ K) as 4x4 arrays.
     """
-    # Quaternion representing the rotation around x-axis
-    qx = np.array([np.cos(angle_x / 2), np.sin(angle_x / 2), 0, 0])
-    
-    # Quaternion representing the rotation around y-axis
-    qy = np.array([np.cos(angle_y / 2), 0, np.sin(angle_y / 2), 0])
-    
-    # Quaternion representing the rotation around z-axis
-    qz = np.array([np.cos(angle_z / 2), 0, 0, np.sin(angle_z / 2)])
-    
-    # Combine the rotations by quaternion multiplication
-    rotated_quat = quaternion_multiply_2q(quaternion_multiply_2q(quaternion_multiply_2q(quat, qx), qy), qz)
-
-    return rotated_quat
+    x, y, z = axis
+    cross = np.zeros((4, 4))
+    cross[:3, :3] = [[0, -z, y], [z, 0, -x], [-y, x, 0]]
+    return cross, cross @ cross
 
-def quaternion_to_rotation_matrix(quaternion: np.ndarray) -> np.ndarray:
+def pose_error(target_position: np.ndarray, target_orientation: np.ndarray, end_effector: np.ndarray) -> np.ndarray:
     """
-    Convert a quaternion into a 3x3 rotation matrix.
+    6-D error between a target pose and an end effector transform.
 
     Args:
-        quaternion (list or np.array): A 4-element list or array representing the quaternion.
+        target_position (np.array): Target position [x, y, z].
+        target_orientation (np.array): Target 3x3 orientation.
+        end_effector (np.array): Achieved 4x4 transform.
 
     Returns:
-        np.array: A 3x3 rotation matrix.
+        np.array: [position error, orientation error], the orientation part being the rotation vector
+            (log map) that takes the achieved orientation to the target, whose norm is the full angle up to pi.
     """
-    q = np.array(quaternion, dtype=np.float64)
-    q = q / np.linalg.norm(q)
+    rotation = R.from_matrix(target_orientation @ end_effector[:3, :3].T).as_rotvec()
+    return np.concatenate([target_position - end_effector[:3, 3], rotation])
 
-    w, x, y, z = q
-    rotation_matrix = np.array([[1 - 2*y*y - 2*z*z, 2*x*y - 2*w*z, 2*x*z + 2*w*y],
-                                 [2*x*y + 2*w*z, 1 - 2*x*x - 2*z*z, 2*y*z - 2*w*x],
-                                 [2*x*z - 2*w*y, 2*y*z + 2*w*x, 1 - 2*x*x - 2*y*y]])
+def rotate_vectors(axis: np.ndarray, angles: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Rotate vectors about one axis by a vector of angles (Rodrigues formula).
+
+    Args:
+        axis (np.array): Unit rotation axis [x, y, z].
+        angles (np.array): Array of N angles (in radians).
+        vectors (np.array): Array of shape (N, 3) with the vectors to rotate.
 
-    return rotation_matrix
+    Returns:
+        np.array: Array of shape (N, 3) with the rotated vectors.
+    """
+    x, y, z = axis
+    c = np.cos(angles)[:, None]
+    s = np.sin(angles)[:, None]
+    cross = np.stack([y * vectors[:, 2] - z * vectors[:, 1], z * vectors[:, 0] - x * vectors[:, 2], x * vectors[:, 1] - y * vectors[:, 0]], axis=1)
+    return vectors * c + cross * s + (vectors @ axis)[:, None] * axis * (1 - c)
 
-def rotation_matrix_to_quaternion(rotation_matrix: np.ndarray) -> np.ndarray:
+def signed_angle(axis: np.ndarray, from_vector: np.ndarray, to_vectors: np.ndarray) -> np.ndarray:
     """
-    Convert a 3x3 rotation matrix into a quaternion.
+    Signed angle of the rotation about an axis that takes from_vector onto to_vectors.
 
     Args:
-        rotation_matrix (np.array): A 3x3 rotation matrix.
+        axis (np.array): Unit rotation axis [x, y, z].
+        from_vector (np.array): Start vector(s), perpendicular to the axis.
+        to_vectors (np.array): Array of shape (N, 3) with the end vectors.
 
     Returns:
-        np.array: A 4-element array representing the quaternion.
+        np.array: Array of N angles (in radians) in [-pi, pi].
     """
-    R = np.array(rotation_matrix, dtype=np.float64)
-    
-    trace = np.trace(R)
-    
-    if trace > 0:
-        S = 2.0 * np.sqrt(trace + 1.0)
-        qw = 0.25 * S
-        qx = (R[2, 1] - R[1, 2]) / S
-        qy = (R[0, 2] - R[2, 0]) / S
-        qz = (R[1, 0] - R[0, 1]) / S
-    elif (R[0, 0] > R[1, 1]) and (R[0, 0] > R[2, 2]):
-        S = 2.0 * np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
-        qw = (R[2, 1] - R[1, 2]) / S
-        qx = 0.25 * S
-        qy = (R[0, 1] + R[1, 0]) / S
-        qz = (R[0, 2] + R[2, 0]) / S
-    elif R[1, 1] > R[2, 2]:
-        S = 2.0 * np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
-        qw = (R[0, 2] - R[2, 0]) / S
-        qx = (R[0, 1] + R[1, 0]) / S
-        qy = 0.25 * S
-        qz = (R[1, 2] + R[2, 1]) / S
-    else:
-        S = 2.0 * np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
-        qw = (R[1, 0] - R[0, 1]) / S
-        qx = (R[0, 2] + R[2, 0]) / S
-        qy = (R[1, 2] + R[2, 1]) / S
-        qz = 0.25 * S
-    
-    quaternion = np.array([qw, qx, qy, qz])
+    return np.arctan2(np.cross(from_vector, to_vectors) @ axis, to_vectors @ from_vector)
 
-    return quaternion
+def wrap_angle(angles: np.ndarray) -> np.ndarray:
+    """
+    Wrap angles to [-pi, pi).
 
+    Args:
+        angles (np.array): Angles (in radians).
+
+    Returns:
+        np.array: The wrapped angles.
+    """
+    return (np.asarray(angles) + np.pi) % (2 * np.pi) - np.pi
 
 def main():
     urdf_file_path = "app\\backend\\python code\\urdf_tes2.urdf"
@@ -457,16 +1291,19 @@ def stress_test():
     # Free the memory used by the generator
     ik_generator = None
 
-def run_stress_test_with_batch_range(batch_size_range):
+def run_stress_test_with_batch_range(batch_size_range, solver="numeric", num_samples=1000):
     urdf_file_path = "urdf_tes1.urdf"
     robot = RobotArm(urdf_file_path)
 
-    # Adjust the number of samples as needed
-    num_samples = 1000
-
-    # Generate random target positions and orientations for stress testing
-    target_positions = [[random.uniform(-1, 1), random.uniform(-1, 1), random.uniform(-1, 1)] for _ in range(num_samples)]
-    target_orientations = [[random.uniform(-2*np.pi, 2*np.pi), random.uniform(-2*np.pi, 2*np.pi), random.uniform(-2*np.pi, 2*np.pi)] for _ in range(num_samples)]
+    # Generate reachable target poses for stress testing from random joint vectors
+    joint_angles = np.zeros((num_samples, len(robot.my_chain.links)))
+    for index, _ in robot.fk_axes:
+        joint_angles[:, index] = np.random.uniform(-np.pi / 2, np.pi / 2, num_samples)
+    target_frames = robot.calculate_fk_batch(joint_angles)
+    robot.last_angles = None
+    target_positions = list(target_frames[:, :3, 3])
+    target_orientations = list(target_frames[:, :3, :3])
+    orientation_modes = ["all"] * num_samples
 
     # Store the times for each batch size
     elapsed_times = []
@@ -475,9 +1312,9 @@ def run_stress_test_with_batch_range(batch_size_range):
     # Iterate through the range of batch sizes and perform stress testing for each batch size
     for batch_size in batch_size_range:
         start_time = time.time()
-        ik_generator = robot.calculate_ik(target_positions, target_orientations, precision=5, batch_size=batch_size)
+        ik_generator = robot.calculate_ik(target_positions, target_orientations, orientation_modes, batch_size=batch_size, solver=solver)
         progress_percent = 0
-        print(f"Stress test with batch size {batch_size}:", end=" ")
+        print(f"Stress test ({solver}) with batch size {batch_size}:", end=" ")
 
         for i, ik in enumerate(ik_generator, 1):
             if i * 10 / num_samples > progress_percent:
@@ -515,7 +1352,7 @@ def run_stress_test_with_batch_range(batch_size_range):
     ax2.set_ylabel('Average Time per Sample (seconds)', color='tab:red')
     ax2.tick_params(axis='y', labelcolor='tab:red')
 
-    plt.title('Stress Test Batch Size vs. Elapsed Time and Average Time per Sample')
+    plt.title(f'Stress Test ({solver}) Batch Size vs. Elapsed Time and Average Time per Sample')
     fig.legend(loc="upper right")
     plt.grid(True)
     plt.show()
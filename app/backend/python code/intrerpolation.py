@@ -1,33 +1,203 @@
 import numpy as np
 from VelocityPFP import *
 import timeit
+import struct
+from collections import deque
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from pyquaternion import Quaternion
 
+class LinearTrajectory:
+    def __init__(self, start_point: tuple, end_point: tuple, max_acc: float, sys_max_vel: float) -> None:
+        """Straight-line move with a jerk-limited profile, evaluated lazily.
+
+        Only the endpoints and the profile constants are stored. Positions and velocities are computed
+        on demand for any time, and arrays are only built by sample() at the rate the caller asks for.
+
+        Args:
+            start_point (tuple): Starting point in 3D space.
+            end_point (tuple): Ending point in 3D space.
+            max_acc (float): Maximum acceleration for the motion profile.
+            sys_max_vel (float): System's maximum velocity.
+
+        Attributes:
+            length (float): Distance between the endpoints.
+            direction (np.array): Unit vector from start to end (zeros for a zero-length move).
+            profile (MotionProfileGenerator): Profile of the distance travelled along the line.
+            move_time (float): Duration of the move.
+        """
+        self.start_point = np.array(start_point, dtype=np.float64)
+        self.end_point = np.array(end_point, dtype=np.float64)
+        self.length = np.linalg.norm(self.end_point - self.start_point)
+        self.direction = (self.end_point - self.start_point) / self.length if self.length > 0 else np.zeros(3)
+
+        self.profile = MotionProfileGenerator(max_acc, sys_max_vel, "linearTrajectory")
+        self.profile.Set_displacement(self.length)
+        self.move_time = self.profile.move_time
+
+    def position(self, time_values) -> np.ndarray:
+        """Positions along the line at the given times (clamped to [0, move_time]).
+
+        Args:
+            time_values (float or array_like): Time(s) since the start of the move.
+
+        Returns:
+            np.ndarray: Array of shape (N, 3), or (3,) for a scalar time.
+        """
+        times = np.clip(np.asarray(time_values, dtype=np.float64), 0, self.move_time)
+        distance = self.profile.generate_profiles(True, np.atleast_1d(times))[2]
+        positions = self.start_point + np.outer(distance, self.direction)
+        return positions[0] if times.ndim == 0 else positions
+
+    def velocity(self, time_values) -> np.ndarray:
+        """Velocity vectors at the given times (zero outside the move).
+
+        Args:
+            time_values (float or array_like): Time(s) since the start of the move.
+
+        Returns:
+            np.ndarray: Array of shape (N, 3), or (3,) for a scalar time.
+        """
+        times = np.asarray(time_values, dtype=np.float64)
+        speed = self.profile.generate_profiles(False, np.atleast_1d(times))[1]
+        velocities = np.outer(speed, self.direction)
+        return velocities[0] if times.ndim == 0 else velocities
+
+    def sample(self, sample_time: float = 0.001) -> np.ndarray:
+        """Materialize the path at a fixed sample period, always ending exactly on the end point.
+
+        Args:
+            sample_time (float, optional): Sample period in seconds. Defaults to 0.001.
+
+        Returns:
+            np.ndarray: Array of shape (N, 3) of points along the path.
+        """
+        time_values = np.arange(0, self.move_time, sample_time)
+        if len(time_values) == 0 or self.move_time - time_values[-1] > 1e-12:
+            time_values = np.append(time_values, self.move_time)
+        return self.position(time_values)
+
+
+class PathWriter:
+    MAGIC = b"PATH3D\x00\x01"
+    HEADER = struct.Struct("<I")
+
+    def __init__(self, file_path: str, dtype: type = np.float32) -> None:
+        """Streaming writer that appends paths to a compact binary file.
+
+        The file starts with MAGIC, then holds one record per path: a little-endian uint32 point
+        count followed by the (count, 3) points as float32. Records are written as they arrive, so
+        nothing is kept in memory. Use read_paths() to load them back for plotting.
+
+        Args:
+            file_path (str): File to append the paths to.
+            dtype (type, optional): Stored point type. Only float32 is supported. Defaults to np.float32.
+
+        Attributes:
+            paths_written (int): Number of paths written since the writer was opened.
+            points_written (int): Number of points written since the writer was opened.
+        """
+        if np.dtype(dtype) != np.float32:
+            raise ValueError("PathWriter only stores float32 points")
+
+        self.file_path = file_path
+        self.paths_written = 0
+        self.points_written = 0
+        self.file = open(file_path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(self.MAGIC)
+
+    def write(self, path: np.ndarray) -> None:
+        """Append one path to the file.
+
+        Args:
+            path (np.ndarray): Array of shape (N, 3) of points.
+        """
+        points = np.ascontiguousarray(path, dtype="<f4").reshape(-1, 3)
+        self.file.write(self.HEADER.pack(len(points)))
+        self.file.write(points.tobytes())
+        self.paths_written += 1
+        self.points_written += len(points)
+
+    def flush(self) -> None:
+        """Flush the buffered records to disk."""
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @classmethod
+    def read_paths(cls, file_path: str):
+        """Read back the paths written by PathWriter one at a time.
+
+        Args:
+            file_path (str): File written by PathWriter.
+
+        Yields:
+            np.ndarray: Array of shape (N, 3) for each stored path, in write order.
+        """
+        with open(file_path, "rb") as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{file_path} is not a path file")
+
+            while True:
+                header = file.read(cls.HEADER.size)
+                if len(header) < cls.HEADER.size:
+                    return
+                count = cls.HEADER.unpack(header)[0]
+                points = np.frombuffer(file.read(count * 12), dtype="<f4")
+                if len(points) < count * 3:
+                    return  # truncated last record, e.g. the writer was not closed
+                yield points.reshape(count, 3).astype(np.float64)
+
+
 class PathPlanner:
-    def __init__(self, max_acc: float, sys_max_vel: float) -> None:
+    RETENTION_MODES = ("all", "ring", "decimated", "off")
+
+    def __init__(self, max_acc: float, sys_max_vel: float, sample_time: float = 0.001, retention: str = "all",
+                 max_saved_paths: int = 64, decimation: int = 10, path_writer: PathWriter = None) -> None:
         """Initialize the PathPlanner.
 
         Args:
             max_acc (float): Maximum acceleration for the motion profile.
             sys_max_vel (float): System's maximum velocity.
+            sample_time (float, optional): Sample period of the generated linear paths. Defaults to 0.001.
+            retention (str, optional): How generated paths are kept in saved_paths: "all" keeps every
+                path, "ring" keeps the last max_saved_paths, "decimated" keeps the last max_saved_paths
+                with only every decimation-th point, "off" keeps none. Linear moves are kept as their
+                LinearTrajectory and only sampled by materialize. Defaults to "all".
+            max_saved_paths (int, optional): Size of the ring for "ring" and "decimated". Defaults to 64.
+            decimation (int, optional): Point stride for "decimated". Defaults to 10.
+            path_writer (PathWriter, optional): Writer that every generated path is streamed to. Defaults to None.
 
         Attributes:
             linear (bool): Indicates whether the motion is linear.
-            saved_paths (list): A list to store saved paths.
+            saved_paths (list or deque): The retained paths, arrays or LinearTrajectory objects.
             max_acc (float): Maximum acceleration for the motion profile.
             sys_max_vel (float): System's maximum velocity.
-            linearVelocityProfile (MotionProfileGenerator): Instance of MotionProfileGenerator
-                responsible for generating linear velocity profiles.
+            sample_time (float): Sample period of the generated linear paths.
         """
+        if retention not in self.RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode '{retention}', expected one of {self.RETENTION_MODES}")
 
         self.linear = True
-        self.saved_paths = []
         self.max_acc = max_acc
         self.sys_max_vel = sys_max_vel
-        self.linearVelocityProfile = MotionProfileGenerator(max_acc, sys_max_vel, "linearVelocityProfile")
+        self.sample_time = sample_time
+        self.retention = retention
+        self.max_saved_paths = max_saved_paths
+        self.decimation = max(1, int(decimation))
+        self.path_writer = path_writer
+        self.clear_saved_paths()
 
     def XY_angle(self, vector1: np.array, vector2: np.array) -> float:
         """Calculate the XY angle between two vectors.
@@ -61,33 +231,29 @@ class PathPlanner:
             return -angle_radians
 
 
-    def points_on_linear_path_3d(self, start_point: tuple, end_point: tuple) -> list:
-        """Generate points on a linear 3D path between two given points.
+    def linear_trajectory(self, start_point: tuple, end_point: tuple) -> LinearTrajectory:
+        """Build the lazily evaluated linear move between two points.
 
         Args:
             start_point (tuple): Starting point in 3D space.
             end_point (tuple): Ending point in 3D space.
 
         Returns:
-            list: List of 3D points representing the linear path.
+            LinearTrajectory: The trajectory, with no points sampled yet.
         """
-        
-        start_point = np.array(start_point)
-        end_point = np.array(end_point)
-
-        self.linearVelocityProfile.Set_displacement(np.linalg.norm(end_point - start_point))
-        sys_time = self.linearVelocityProfile.move_time
+        return LinearTrajectory(start_point, end_point, self.max_acc, self.sys_max_vel)
 
-        # Generate time values for motion profile
-        time_values = np.arange(0, sys_time, 0.001)
-        self.linearVelocityProfile.Generator_profile(time_values)
-        t_values = self.linearVelocityProfile.displacements
-
-        t_values = np.interp(t_values, (t_values.min(), t_values.max()), (0, 1))
+    def points_on_linear_path_3d(self, start_point: tuple, end_point: tuple) -> list:
+        """Generate points on a linear 3D path between two given points.
 
-        interpolated_points = start_point + np.outer(t_values, end_point - start_point)
+        Args:
+            start_point (tuple): Starting point in 3D space.
+            end_point (tuple): Ending point in 3D space.
 
-        return interpolated_points   
+        Returns:
+            list: List of 3D points representing the linear path, sampled every sample_time seconds.
+        """
+        return self.linear_trajectory(start_point, end_point).sample(self.sample_time)
         
 
     def calculate_initial_final_angle_magnitude(self, start: np.array, end: np.array) -> tuple:
@@ -130,35 +296,20 @@ class PathPlanner:
         try:
             angle_init, angle_final, magnitude_init, magnitude_final = self.calculate_initial_final_angle_magnitude(start, end)
 
-            angle_profile = MotionProfileGenerator(max_acc, max_vel, "angle_profile")
-            magnitude_profile = MotionProfileGenerator(2*max_acc, 2*max_vel, "magnitude_profile")
-            height_profile = MotionProfileGenerator(max_acc, max_vel, "height_profile")
-
-            # Set displacements for each profile
-            height_profile.Set_displacement(abs(end[-1] - start[-1]))
-            magnitude_profile.Set_displacement(abs(magnitude_final - magnitude_init))
-            angle_profile.Set_displacement(abs(angle_final - angle_init))
-
-            # Calculate system time based on the maximum time among profiles
-            sys_time = max(angle_profile.move_time, magnitude_profile.move_time, height_profile.move_time)
-
-            # Set move time for each profile
-            height_profile.Set_move_time(sys_time)
-            magnitude_profile.Set_move_time(sys_time)
-            angle_profile.Set_move_time(sys_time)
-
-            # Generate time values for motion profiles
-            time_values = np.arange(0, sys_time, 0.01)
-
-            # Generate motion profiles for each dimension
-            height_profile.Generator_profile(time_values)
-            magnitude_profile.Generator_profile(time_values)
-            angle_profile.Generator_profile(time_values)
+            # Angle, magnitude and height profiles synchronized to the slowest of the three, sampled up to
+            # and including the end of the move so the path stops exactly on the end point
+            displacements = [angle_final - angle_init, magnitude_final - magnitude_init, end[-1] - start[-1]]
+            max_accs, max_vels = [max_acc, 2*max_acc, max_acc], [max_vel, 2*max_vel, max_vel]
+            move_time = synchronized_move_time(displacements, max_accs, max_vels)
+            time_values = np.arange(0, move_time, 0.01)
+            if len(time_values) == 0 or move_time - time_values[-1] > 1e-12:
+                time_values = np.append(time_values, move_time)
+            _, profiles = generate_synchronized_profiles(displacements, max_accs, max_vels, time_values=time_values, move_time=move_time)
 
             # Calculate final values for each dimension
-            angle_values = angle_init + angle_profile.displacements if angle_final - angle_init > 0 else angle_init - angle_profile.displacements
-            magnitudes_values = magnitude_init + magnitude_profile.displacements if magnitude_final - magnitude_init > 0 else magnitude_init - magnitude_profile.displacements
-            height_values = start[2] + height_profile.displacements if end[-1] - start[-1] > 0 else start[2] - height_profile.displacements
+            angle_values = angle_init + profiles[0]
+            magnitudes_values = magnitude_init + profiles[1]
+            height_values = start[2] + profiles[2]
 
             return angle_values, magnitudes_values, height_values
 
@@ -207,22 +358,62 @@ class PathPlanner:
         self.start_point = start_point
         self.end_point = end_point
 
+        trajectory = None
         distance = np.linalg.norm(np.array(start_point) - np.array(end_point))
         if distance <= tolerance:
             self.points = np.array([start_point])
         elif linear:
-            self.points = self.points_on_linear_path_3d(start_point, end_point)
+            trajectory = self.linear_trajectory(start_point, end_point)
+            self.points = trajectory.sample(self.sample_time)
         else:
             self.points = self.points_on_circular_path_3d(start_point, end_point)
 
-        self.saved_paths.append(self.points.copy())
+        self.save_path(self.points, trajectory)
 
         return self.points
 
+    def save_path(self, path: np.ndarray, trajectory: LinearTrajectory = None) -> None:
+        """Keep a path according to the retention policy and stream it to the path writer.
+
+        Args:
+            path (np.ndarray): Array of shape (N, 3) of points.
+            trajectory (LinearTrajectory, optional): The move path was sampled from, kept instead of
+                the points. Defaults to None.
+        """
+        if self.path_writer is not None:
+            self.path_writer.write(path)
+
+        if self.retention == "off":
+            return
+        if trajectory is not None:
+            self.saved_paths.append(trajectory)
+            return
+        if self.retention == "decimated" and len(path) > 2:
+            path = np.vstack((path[:-1:self.decimation], path[-1:]))
+        self.saved_paths.append(np.array(path, copy=True))
+
+    def materialize(self, path) -> np.ndarray:
+        """Points of a saved path, sampling a LinearTrajectory at the rate it is retained at.
+
+        Args:
+            path (np.ndarray or LinearTrajectory): An entry of saved_paths.
+
+        Returns:
+            np.ndarray: Array of shape (N, 3) of points, every decimation-th sample for "decimated".
+        """
+        if isinstance(path, LinearTrajectory):
+            stride = self.decimation if self.retention == "decimated" else 1
+            return path.sample(self.sample_time * stride)
+        return path
+
     
-    def plot_3d_path(self) -> None:
+    def plot_3d_path(self, paths=None) -> None:
         """
         Plot and visualize the 3D paths.
+
+        Args:
+            paths (iterable, optional): Paths to plot instead of saved_paths, e.g.
+                PathWriter.read_paths(file_path). Defaults to None.
         """
         fig = plt.figure()
         ax = fig.add_subplot(111, projection='3d')
@@ -233,7 +424,7 @@ class PathPlanner:
         z_min, z_max = float('inf'), float('-inf')
 
         pathNum = 0
-        for path in self.saved_paths:
+        for path in (map(self.materialize, self.saved_paths) if paths is None else paths):
             x_coords, y_coords, z_coords = zip(*path)
             pathNum += 1
 
@@ -266,7 +457,10 @@ class PathPlanner:
 
     def clear_saved_paths(self)->None:
         """Clear the list of saved paths."""
-        self.saved_paths = []
+        if self.retention in ("ring", "decimated"):
+            self.saved_paths = deque(maxlen=self.max_saved_paths)
+        else:
+            self.saved_paths = []
 
 def main():
     # Initialize PathPlanner with maximum acceleration
@@ -0,0 +1,14 @@
+"""One-shot migration of parts database files to the typed, indexed 'Parts' schema.
+
+Usage:
+    python migrate_parts_db.py [database file ...]
+
+With no arguments the parts_db file in the working directory is migrated.
+"""
+import sys
+from DP_parts import migrate_parts_db
+
+if __name__ == "__main__":
+    for db_name in sys.argv[1:] or ["parts_db"]:
+        if not migrate_parts_db(db_name):
+            sys.exit(1)
@@ -16,6 +16,8 @@ class MoshionController:
         self.manager.read_motor_config("motors_config.json")
         self.in_degrees = True
         self.SLOWEREST_FREQUENSY = 100
+        self.DECIMATION_TOLERANCE = 0.01  # Largest joint error in degrees decimate may introduce
+        self.decimation_stats = None
     
     def Input_DEGREES(self):
         """_summary_
@@ -27,129 +29,220 @@ class MoshionController:
         """
         self.in_degrees = False
 
-    def move_motors(self, angles):
+    def motor_parameters(self) -> tuple:
+        """
+        Collect the speed limits of the motors in angle column order.
+
+        Returns:
+            tuple: Max speeds in rpm and steps per revolution, as two arrays of one value per motor.
+        """
+        motors = list(self.manager.motors.values())
+        max_speeds = np.array([motor.max_speed for motor in motors], dtype=float)
+        steps_per_revolution = np.array([motor.steps_per_revolution for motor in motors], dtype=float)
+        return max_speeds, steps_per_revolution
+
+    def compile_moves(self, angles, step_accurate: bool = False) -> np.ndarray:
+        """
+        Compile joint angles into motor moves in one pass over all segments and motors.
+
+        Every segment is timed by its slowest motor and the other motors are slowed to arrive with it.
+        Motors that would have to step at SLOWEREST_FREQUENSY or less are held for that segment and
+        their deferred motion is made up by one move per motor at full speed after the last segment.
+        With step_accurate the moves are compiled by compile_step_accurate_moves instead.
+
+        Args:
+            angles (array_like): (N, 6) joint angles, one row per point.
+            step_accurate (bool, optional): Carry fractional steps between segments. Defaults to False.
+
+        Returns:
+            np.ndarray: (M, 7) int64 moves in the order the firmware reads them, the step frequencies
+                of motors 5 to 0 followed by the move time in microseconds.
+        """
+        angles = np.asarray(angles, dtype=float)
+        max_speeds, steps_per_revolution = self.motor_parameters()
+        if len(angles) < 2:
+            return np.zeros((0, len(max_speeds) + 1), dtype=np.int64)
+
+        full_circle = 360.0 if self.in_degrees else 2*np.pi
+        if step_accurate:
+            return self.compile_step_accurate_moves(angles*(steps_per_revolution/full_circle),
+                                                    max_speeds*steps_per_revolution/60)
+
+        deltas = np.diff(angles, axis=0)
+        moving = np.abs(deltas) > (360/steps_per_revolution)  # Changes under one step are dropped
+        deltas = np.where(moving, deltas, 0.0)
+
+        # Time of each motor at full speed, a segment takes as long as its slowest motor
+        max_frequencies = np.trunc(max_speeds*steps_per_revolution)/60
+        too_slow = (0 < np.abs(max_frequencies)) & (np.abs(max_frequencies) <= self.SLOWEREST_FREQUENSY)
+        times = np.where(too_slow, 0.0, deltas*(60.0/(full_circle*max_speeds)))
+        segment_times = np.abs(times).max(axis=1)
+
+        # Slow every motor down to finish with the slowest one
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speeds = np.where(segment_times[:, None] > 0, (deltas*60)/(full_circle*segment_times[:, None]), 0.0)
+        frequencies = np.trunc(speeds*steps_per_revolution)/60
+        slow = (0 < np.abs(frequencies)) & (np.abs(frequencies) <= self.SLOWEREST_FREQUENSY)
+
+        moves = np.zeros((len(deltas), len(max_speeds) + 1), dtype=np.int64)
+        moves[:, :-1] = np.where(slow, 0, np.trunc(frequencies))[:, ::-1]
+        moves[:, -1] = np.where(segment_times*1e6 <= 1, 1, np.trunc(segment_times*1e6))
+
+        # Make up the motion of held motors, unless it is shorter than one step at full speed
+        tail_frequencies = np.trunc(max_speeds*steps_per_revolution/60)
+        slow_segments, slow_motors = np.nonzero(slow)
+        slow_deltas = deltas[slow_segments, slow_motors]
+        slow_times = np.abs(slow_deltas*(60.0/(full_circle*max_speeds[slow_motors])))
+        kept = 1/slow_times < tail_frequencies[slow_motors]
+
+        tail_times = np.zeros(len(max_speeds), dtype=np.int64)
+        tail_deltas = np.zeros(len(max_speeds))
+        np.add.at(tail_times, slow_motors[kept], np.floor(slow_times[kept]*1e6).astype(np.int64))
+        np.add.at(tail_deltas, slow_motors[kept], slow_deltas[kept])
+
+        tail_motors = np.flatnonzero(tail_times)
+        tails = np.zeros((len(tail_motors), len(max_speeds) + 1), dtype=np.int64)
+        tails[np.arange(len(tail_motors)), len(max_speeds) - 1 - tail_motors] = \
+            np.where(tail_deltas[tail_motors] < 0, -1, 1)*tail_frequencies[tail_motors]
+        tails[:, -1] = tail_times[tail_motors]
+
+        return np.vstack((moves, tails))
+
+    def compile_step_accurate_moves(self, positions: np.ndarray, max_frequencies: np.ndarray) -> np.ndarray:
+        """
+        Compile moves that keep every motor within a fraction of a step of each point.
+
+        A move runs a motor for its time at an integer frequency, so it makes frequency*time steps.
+        The steps each move actually makes are carried into the next segment, so truncated frequencies
+        and sub-step changes never add up to drift. Rates at or below SLOWEREST_FREQUENSY round to a
+        hold or to the slowest rate above it and are paid back the same way, so no moves are appended.
+        A motor can end up to SLOWEREST_FREQUENSY/2 times the last move time short of the last point,
+        which is well under a step for dense points.
+
+        Args:
+            positions (np.ndarray): (N, 6) motor positions in steps, one row per point.
+            max_frequencies (np.ndarray): Full speed of each motor in steps per second.
+
+        Returns:
+            np.ndarray: (N - 1, 7) int64 moves, see compile_moves.
+        """
+        # Time every segment by its slowest motor at full speed
+        times = np.abs(np.diff(positions, axis=0)/max_frequencies).max(axis=1)
+        times = np.maximum(np.ceil(times*1e6), 1)
+
+        limits = np.trunc(max_frequencies)
+        slowest = self.SLOWEREST_FREQUENSY + 1
+        moves = np.zeros((len(times), len(max_frequencies) + 1), dtype=np.int64)
+        position = positions[0].copy()  # Where the motors really are, in steps
+        for segment, time in enumerate(times):
+            wanted = (positions[segment + 1] - position)*1e6/time
+            frequencies = np.clip(np.rint(wanted), -limits, limits)
+            frequencies = np.where(np.abs(frequencies) >= slowest, frequencies,
+                                   np.where(np.abs(wanted) >= slowest/2, np.copysign(slowest, wanted), 0))
+            position += frequencies*time/1e6
+            moves[segment, :-1] = frequencies[::-1]
+
+        moves[:, -1] = times
+        return moves
+
+    def decimate(self, angles, tolerance=None) -> np.ndarray:
+        """
+        Drop points that the straight joint-space moves between their neighbours already pass close to.
+
+        The robot runs every move on a straight line in joint space, so only the path matters and not
+        the sample timing. The points kept and the compression are stored in decimation_stats.
+
+        Args:
+            angles (array_like): (N, 6) joint angles, one row per point.
+            tolerance (float | array_like, optional): Largest error of each joint in the current angle
+                unit. Defaults to DECIMATION_TOLERANCE degrees.
+
+        Returns:
+            np.ndarray: The kept rows of angles, always including the first and last point.
+        """
+        angles = np.asarray(angles, dtype=float)
+        if tolerance is None:
+            tolerance = self.DECIMATION_TOLERANCE if self.in_degrees else np.deg2rad(self.DECIMATION_TOLERANCE)
+
+        kept = decimate_angles(angles, tolerance)
+        self.decimation_stats = {
+            "points": len(angles),
+            "kept": len(kept),
+            "ratio": len(angles)/max(len(kept), 1),
+        }
+        print(f"Decimated {len(angles)} points to {len(kept)} ({self.decimation_stats['ratio']:.1f}x)")
+        return angles[kept]
+
+    def move_motors(self, angles, step_accurate: bool = False):
         """
         Move motors based on the provided angles.
 
         Args:
             angles (list of tuples): A list of tuples where each tuple represents
                                     the angles for each motor.
+            step_accurate (bool, optional): Carry fractional steps between segments. Defaults to False.
 
         Returns:
-            str: A string containing all six frequencies and the maximum time.
+            list: One "frequency, ..., time" string per move, see compile_moves.
         """
-        # Initialize lists and variables
-        frequencies_list = []  # List to store frequencies of all motors
-        slow_motor_max_time_list = np.array([0,0,0,0,0,0])  # Array to store max time for slow motors
-        slow_motor_delta_theta_list = [0,0,0,0,0,0]  # List to store delta theta for slow motors
-        max_time_list = []  # List to store max time for all movements
-        slow_motor_angles = []  # List to store angles for slow motors
-
-        # Loop through each movement point
-        for point in range(1, len(angles), 1):
-            times  = []  # List to store times for each motor movement
-            motor_frequencys = np.array([0,0,0,0,0,0])  # Array to store frequencies for each motor
-
-            # Calculate motor times for the current movement
-            for index, (motor_name, motor) in enumerate(list(self.manager.motors.items())):
-                delta_theta = (angles[point][index] - angles[point-1][index])  # Calculate angle change
-                max_motor_frequency = int(motor.max_speed * motor.steps_per_revolution)/60  # Calculate max frequency
-
-                # Check if angle change is within threshold or motor is at slowest frequency
-                if abs(delta_theta) <= (360/motor.steps_per_revolution):
-                    delta_theta = 0
-                    motor_time = 0
-                elif ( 0 < abs(max_motor_frequency) <= self.SLOWEREST_FREQUENSY):
-                    delta_theta = 0
-                    motor_time = 0
-                else:
-                    if self.in_degrees:
-                        motor_time = delta_theta*(60.0/(360.0*motor.max_speed))  # Calculate motor time in degrees
-                    else:
-                        motor_time = delta_theta*(60.0/(2*np.pi*motor.max_speed))  # Calculate motor time in radians
-                times.append(motor_time)
-
-            # Calculate motor frequencies and new times for the current movement
-            for index, (motor_name, motor) in enumerate(list(self.manager.motors.items())):
-                delta_theta = (angles[point][index] - angles[point-1][index])  # Calculate angle change
-
-                # Check if angle change is within threshold
-                if abs(delta_theta) <= (360/motor.steps_per_revolution):
-                    delta_theta = 0
-                    Motor_time = 0
-
-                if delta_theta == 0:
-                    new_motor_speed = 0
-                    motor_time = 0
-                    Motor_time = 0
-                else:
-                    Motor_time = abs(max(times, key=abs))  # Get maximum time
-                    if self.in_degrees:
-                        new_motor_speed = (delta_theta*60)/(360*Motor_time)  # Calculate new motor speed in degrees
-                    else:
-                        new_motor_speed = (delta_theta*60)/(2*np.pi*Motor_time)  # Calculate new motor speed in radians
-
-                new_motor_frequency = int(new_motor_speed * motor.steps_per_revolution)/60  # Calculate new frequency
-
-                # Check if new frequency is within threshold
-                if ( 0 < abs(new_motor_frequency) <= self.SLOWEREST_FREQUENSY):
-                    slow_motor_angles.append((index, delta_theta))  # Add to slow motor angles
-                    new_motor_frequency = 0  # Set frequency to zero
-
-                motor_frequencys[index] = new_motor_frequency  # Store new frequency
-
-            frequencies_list.append([str(frequency) for frequency in motor_frequencys])  # Store frequencies list
-
-            if (abs(max(times, key=abs)) * 1e6) <= 1:
-                max_time_list.append(1)  # Append max time as 1 microsecond if very small
-            else:
-                max_time_list.append(int(abs(max(times, key=abs)) * 1e6))  # Append max time in microseconds
-
-            # Calculate slow motor max time and delta theta
-            for SM in slow_motor_angles:
-                slow_move = np.array([0,0,0,0,0,0])  # Array to store slow motor movement
-                slow_motor = self.manager.get_motor_by_index(SM[0])  # Get slow motor
-
-                if self.in_degrees:
-                    slow_motor_time = SM[1]*(60.0/(360.0*slow_motor.max_speed))  # Calculate slow motor time in degrees
-                else:
-                    slow_motor_time = SM[1]*(60.0/(2*np.pi*slow_motor.max_speed))  # Calculate slow motor time in radians
-                
-                slow_motor_frequency = int((slow_motor.max_speed*slow_motor.steps_per_revolution)/60)  # Calculate slow motor frequency
-                
-                if 1/abs(slow_motor_time) >= slow_motor_frequency:
-                    continue  # Skip if slow motor time is greater than or equal to frequency
-
-                slow_move[SM[0]] = slow_motor_frequency  # Store slow motor frequency
-                slow_motor_max_time_list[SM[0]] += abs(slow_motor_time) * 1e6  # Add slow motor time to max time list
-                slow_motor_delta_theta_list[SM[0]] += SM[1]  # Add delta theta to delta theta list
-
-        # Calculate final frequencies and max times for slow motors
-        for index, time in enumerate(slow_motor_max_time_list):
-            if time == 0:
-                continue
-
-            motor_frequencys = np.array([0,0,0,0,0,0])  # Array to store final frequencies
-
-            motor = self.manager.get_motor_by_index(index)  # Get motor
-            if slow_motor_delta_theta_list[index] < 0:
-                motor_frequency = -int((motor.max_speed*motor.steps_per_revolution)/60)  # Calculate negative frequency
-            else:
-                motor_frequency = int((motor.max_speed*motor.steps_per_revolution)/60)  # Calculate positive frequency
-
-            motor_frequencys[index] = motor_frequency  # Store frequency
-
-            frequencies_list.append([str(frequency) for frequency in motor_frequencys])  # Store frequencies list
-            max_time_list.append(time)  # Append max time
-
-        # Create return string
-        return_str = []
-        for move in range(0, len(frequencies_list), 1):
-            move_cmd =  ", ".join(reversed(frequencies_list[move])) + ", " + str(max_time_list[move]) +"\n"  # Create move command
-            return_str.append(move_cmd)  # Append move command to return string
-
-        return return_str  # Return move commands
-                
+        return format_moves(self.compile_moves(angles, step_accurate))
+
+def decimate_angles(angles: np.ndarray, tolerance) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker decimation of a joint-space path.
+
+    A range of points is replaced by the straight line between its ends when every point in it lies
+    within tolerance of that line on every joint, otherwise it is split at the worst point.
+
+    Args:
+        angles (np.ndarray): (N, J) joint angles, one row per point.
+        tolerance (float | array_like): Largest error of each joint, one value or one per joint.
+
+    Returns:
+        np.ndarray: Sorted indices of the points kept, always including the first and last point.
+    """
+    angles = np.asarray(angles, dtype=float)
+    if len(angles) < 3:
+        return np.arange(len(angles))
+
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype=float), angles.shape[1:])
+    keep = np.zeros(len(angles), dtype=bool)
+    keep[[0, -1]] = True
+
+    ranges = [(0, len(angles) - 1)]
+    while ranges:
+        start, end = ranges.pop()
+        if end - start < 2:
+            continue
+
+        # Error of each interior point against the closest point of the chord, worst joint first
+        chord = angles[end] - angles[start]
+        offsets = angles[start + 1:end] - angles[start]
+        length = chord @ chord
+        along = np.clip(offsets @ chord/length, 0, 1) if length > 0 else np.zeros(len(offsets))
+        errors = np.max(np.abs(offsets - along[:, None]*chord)/tolerance, axis=1)
+
+        worst = int(np.argmax(errors))
+        if errors[worst] > 1:
+            split = start + 1 + worst
+            keep[split] = True
+            ranges.append((start, split))
+            ranges.append((split, end))
+
+    return np.flatnonzero(keep)
+
+def format_moves(moves: np.ndarray) -> list:
+    """
+    Format compiled moves as the text points of an R_MOSHION upload.
+
+    Args:
+        moves (np.ndarray): (M, 7) moves as returned by MoshionController.compile_moves.
+
+    Returns:
+        list: One "frequency, ..., time\\n" string per move.
+    """
+    return [", ".join(map(str, move)) + "\n" for move in moves.tolist()]
+
 if __name__ == "__main__":
     # Create an instance of MoshionController
     controller = MoshionController()
@@ -0,0 +1,373 @@
+import numpy as np
+import timeit
+from intrerpolation import *
+from quaternions import *
+
+UNIT_AXES = {"x": np.array([1.0, 0.0, 0.0]), "y": np.array([0.0, 1.0, 0.0]), "z": np.array([0.0, 0.0, 1.0])}
+
+# Wrist sweep (radians) and over-wrap flag for the XY angle quadrants [-pi, -pi/2), [-pi/2, 0), (0, pi/2], (pi/2, pi]
+PICK_SWEEPS = ((np.pi/2, True), (np.pi/2, False), (-np.pi/2, False), (-np.pi, False))
+RETURN_SWEEPS = ((np.pi, False), (np.pi/2, False), (-np.pi/2, False), (-np.pi, True))
+
+
+class TrajectoryPlan:
+    def __init__(self, positions: np.ndarray, quaternions: np.ndarray, boundaries: np.ndarray, stops: list = None) -> None:
+        """Array-backed motion plan.
+
+        Every sample of every segment lives in one contiguous array; segment i covers the rows
+        boundaries[i]:boundaries[i + 1].
+
+        Args:
+            positions (np.ndarray): Positions of shape (N, 3).
+            quaternions (np.ndarray): Orientations [w, x, y, z] of shape (N, 4).
+            boundaries (np.ndarray): Segment offsets of shape (S + 1,), starting at 0 and ending at N.
+            stops (list, optional): Indices of the segments after which the robot pauses. Defaults to None.
+        """
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        self.quaternions = np.ascontiguousarray(quaternions, dtype=np.float64)
+        self.boundaries = np.asarray(boundaries, dtype=np.int64)
+        self.stops = [] if stops is None else list(stops)
+
+    def __len__(self) -> int:
+        return len(self.boundaries) - 1
+
+    def segment(self, index: int) -> tuple:
+        """Return the positions and quaternions of one segment as views into the plan.
+
+        Args:
+            index (int): Segment index.
+
+        Returns:
+            tuple: (positions (n, 3), quaternions (n, 4)).
+        """
+        start, end = self.boundaries[index], self.boundaries[index + 1]
+        return self.positions[start:end], self.quaternions[start:end]
+
+    def paths(self) -> list:
+        """Positions split into one (n, 3) view per segment."""
+        return np.split(self.positions, self.boundaries[1:-1])
+
+    def orientations(self) -> list:
+        """Quaternions split into one (n, 4) view per segment."""
+        return np.split(self.quaternions, self.boundaries[1:-1])
+
+    def rotation_matrices(self) -> np.ndarray:
+        """Rotation matrices of every sample, of shape (N, 3, 3)."""
+        return quaternions_to_rotation_matrices(self.quaternions)
+
+    def segment_rotation_matrices(self) -> list:
+        """Rotation matrices split into one (n, 3, 3) array per segment."""
+        return np.split(self.rotation_matrices(), self.boundaries[1:-1])
+
+    def as_lists(self) -> tuple:
+        """Return the plan in the (travle_paths, travle_orientation, travle_alinements, travle_stop) form.
+
+        Returns:
+            tuple: Lists of per-segment positions, per-segment quaternions, alignment flags and stops.
+        """
+        return self.paths(), self.orientations(), ["all"] * len(self), list(self.stops)
+
+
+class PlanCompiler:
+    def __init__(self, planner: PathPlanner, idle_position: tuple, idle_orientation: list, working_position: tuple,
+                 jogging_start: tuple, jogging_orientation: list, drop_off_orientation: np.ndarray,
+                 weighting_position: tuple, weighting_orientation: np.ndarray, insertion_distance: float,
+                 lifting_distance: float, drop_off_height: float, gripper_offset: np.ndarray, pick_axis: str = "x",
+                 pick_lift_direction: tuple = (-1, 0, 0), pick_drop_direction: tuple = (-1, 0, 0),
+                 home_each_part: bool = False) -> None:
+        """Compile pick and return jobs into array-backed trajectory plans.
+
+        A job is first written out declaratively as a list of steps (see pick_steps and return_steps), then
+        compile_steps generates the paths and interpolates the orientations of the whole plan in one
+        vectorized pass.
+
+        Each step is a tuple (name, target, linear, orientation), or ("stop",) to pause after the previous step:
+            - target is a point, or ("offset", vector, frame, base) for R(frame) @ vector + base, where frame is a
+              quaternion or the name of an earlier step ("start" is the step's own start) and base is a point
+              or the name of an earlier step.
+            - orientation is ("hold",), ("set", quaternion), ("slerp", quaternion) or ("sweep", axis, angle).
+
+        Args:
+            planner (PathPlanner): Planner used to generate the segment paths.
+            idle_position (tuple): Rest position of the tool.
+            idle_orientation (list): Rest orientation of the tool.
+            working_position (tuple): Position above the rest position.
+            jogging_start (tuple): Hub position every job passes through.
+            jogging_orientation (list): Orientation at the hub.
+            drop_off_orientation (np.ndarray): Orientation at the drop-off zone.
+            weighting_position (tuple): Position of the scale.
+            weighting_orientation (np.ndarray): Orientation at the scale.
+            insertion_distance (float): Depth the tool travels into a shelf.
+            lifting_distance (float): Height a part is lifted off its shelf.
+            drop_off_height (float): Height above the drop-off zone the part is released from.
+            gripper_offset (np.ndarray): Offset from a stored part location to the tool target.
+            pick_axis (str, optional): Tool axis the wrist sweeps about when picking. Defaults to "x".
+            pick_lift_direction (tuple, optional): Tool-frame direction of the pick lift. Defaults to (-1, 0, 0).
+            pick_drop_direction (tuple, optional): Tool-frame direction of the drop-off height. Defaults to (-1, 0, 0).
+            home_each_part (bool, optional): Return to the idle position after every part instead of
+                after the last one, and leave it through the jogging hub again before the next part.
+                Defaults to False.
+        """
+        self.planner = planner
+        self.idle_position = np.array(idle_position, dtype=np.float64)
+        self.idle_orientation = np.array(idle_orientation, dtype=np.float64)
+        self.working_position = np.array(working_position, dtype=np.float64)
+        self.jogging_start = np.array(jogging_start, dtype=np.float64)
+        self.jogging_orientation = np.array(jogging_orientation, dtype=np.float64)
+        self.drop_off_orientation = np.array(drop_off_orientation, dtype=np.float64)
+        self.weighting_position = np.array(weighting_position, dtype=np.float64)
+        self.weighting_orientation = np.array(weighting_orientation, dtype=np.float64)
+        self.insertion_distance = insertion_distance
+        self.lifting_distance = lifting_distance
+        self.drop_off_height = drop_off_height
+        self.gripper_offset = np.array(gripper_offset, dtype=np.float64)
+        self.pick_axis = pick_axis
+        self.pick_lift_direction = np.array(pick_lift_direction, dtype=np.float64)
+        self.pick_drop_direction = np.array(pick_drop_direction, dtype=np.float64)
+        self.home_each_part = home_each_part
+
+    def sweep(self, start_point: np.ndarray, location: np.ndarray, table: tuple) -> tuple:
+        """Look up the wrist sweep for a move from the XY angle between its endpoints.
+
+        Args:
+            start_point (np.ndarray): Start of the move.
+            location (np.ndarray): End of the move.
+            table (tuple): PICK_SWEEPS or RETURN_SWEEPS.
+
+        Returns:
+            tuple: (sweep angle in radians, over-wrap flag). A zero angle gives no sweep.
+        """
+        angle = self.planner.XY_angle(start_point, location)
+        if -np.pi <= angle < -np.pi/2:
+            return table[0]
+        elif -np.pi/2 <= angle < 0:
+            return table[1]
+        elif 0 < angle <= np.pi/2:
+            return table[2]
+        elif np.pi/2 < angle <= np.pi:
+            return table[3]
+        return 0.0, False
+
+    def start_steps(self) -> list:
+        """Steps from the idle position to the jogging hub."""
+        return [("leave_idle", self.working_position, True, ("set", self.idle_orientation)),
+                ("to_jogging", self.jogging_start, False, ("hold",))]
+
+    def home_steps(self) -> list:
+        """Steps from the jogging hub back to the idle position."""
+        return [("to_working", self.working_position, False, ("hold",)),
+                ("to_idle", self.idle_position, True, ("hold",))]
+
+    def pick_steps(self, location: np.ndarray, drop_off_zone: np.ndarray, home: bool = False) -> list:
+        """Steps that take one part from the jogging hub to the drop-off zone and back to the hub.
+
+        Args:
+            location (np.ndarray): Tool target in front of the part.
+            drop_off_zone (np.ndarray): The drop-off zone coordinates (x, y, z).
+            home (bool, optional): Go from the drop-off zone straight back to the idle position, turning
+                to the idle orientation on the way, instead of back to the hub. Defaults to False.
+
+        Returns:
+            list: The steps of the job.
+        """
+        sweep, over_wrap = self.sweep(self.jogging_start, location, PICK_SWEEPS)
+        steps = [
+            ("to_part", location, False, ("sweep", self.pick_axis, sweep)),
+            ("insert", ("offset", (0, 0, self.insertion_distance), "start", location), True, ("hold",)),
+            ("lift", ("offset", self.pick_lift_direction * self.lifting_distance, "start", "start"), True, ("hold",)),
+            ("retract", ("offset", (0, 0, -self.insertion_distance), "start", "start"), True, ("hold",)),
+        ]
+        drop_off_point = ("offset", self.pick_drop_direction * self.drop_off_height, "retract", drop_off_zone)
+        if over_wrap:
+            steps += [("over_wrap", self.jogging_start, False, ("sweep", "y", -sweep)),
+                      ("to_drop_off", drop_off_point, False, ("sweep", "y", -np.pi/2))]
+        else:
+            steps += [("to_drop_off", drop_off_point, False, ("sweep", self.pick_axis, -np.pi))]
+
+        steps += [
+            ("place", drop_off_zone, True, ("hold",)),
+            ("release", ("offset", (0, 0, -self.insertion_distance), "start", "start"), True, ("hold",)),
+        ]
+        if home:
+            return steps + [("to_working", self.working_position, False, ("slerp", self.idle_orientation)),
+                            ("to_idle", self.idle_position, True, ("hold",))]
+        return steps + [("to_jogging", self.jogging_start, False, ("slerp", self.jogging_orientation))]
+
+    def return_steps(self, location: np.ndarray, drop_off_zone: np.ndarray, home: bool = False) -> list:
+        """Steps that take one part from the drop-off zone over the scale back to its shelf location.
+
+        Args:
+            location (np.ndarray): Tool target in front of the part's shelf.
+            drop_off_zone (np.ndarray): The drop-off zone coordinates (x, y, z).
+            home (bool, optional): Turn to the idle orientation on the way back to the hub and go on to the
+                idle position. Defaults to False.
+
+        Returns:
+            list: The steps of the job.
+        """
+        box_height = (0, -self.drop_off_height, 0)
+        above_scale = np.dot(quaternions_to_rotation_matrices([self.drop_off_orientation])[0], box_height) + self.weighting_position
+        sweep, over_wrap = self.sweep(above_scale, location, RETURN_SWEEPS)
+
+        steps = [
+            ("to_drop_off", ("offset", (0, 0, -self.insertion_distance), self.drop_off_orientation, drop_off_zone), False,
+             ("slerp", self.drop_off_orientation)),
+            ("grab", drop_off_zone, True, ("hold",)),
+            ("lift_box", ("offset", box_height, self.drop_off_orientation, drop_off_zone), True, ("hold",)),
+            ("to_scale", self.weighting_position, True, ("set", self.weighting_orientation)),
+            ("stop",),
+            ("leave_scale", above_scale, True, ("set", self.weighting_orientation)),
+            ("to_shelf", location, False, ("sweep", "y", sweep)),
+            ("insert", ("offset", (0, 0, self.insertion_distance), "start", location), True, ("hold",)),
+            ("lift", ("offset", (0, self.lifting_distance, 0), "start", "start"), True, ("hold",)),
+            ("retract", ("offset", (0, 0, -self.insertion_distance), "start", "start"), True, ("hold",)),
+        ]
+        if over_wrap:
+            steps += [("over_wrap", above_scale, False, ("sweep", "y", -sweep))]
+        if home:
+            return steps + [("to_jogging", self.jogging_start, False, ("slerp", self.idle_orientation))] + self.home_steps()
+        return steps + [("to_jogging", self.jogging_start, False, ("slerp", self.jogging_orientation))]
+
+    def compile(self, locations: dict, drop_off_zone: tuple, pickip_dropoff: bool) -> TrajectoryPlan:
+        """Compile a pick or return job for every part into one plan.
+
+        Args:
+            locations (dict): Part names as keys and their stored locations as values.
+            drop_off_zone (tuple): The drop-off zone coordinates (x, y, z).
+            pickip_dropoff (bool): True to pick the parts, False to return them.
+
+        Returns:
+            TrajectoryPlan: The compiled plan.
+        """
+        drop_off_zone = np.array(drop_off_zone, dtype=np.float64)
+        job_steps = self.pick_steps if pickip_dropoff else self.return_steps
+
+        # Every job starts at the jogging hub, which is where its wrist sweep is measured from
+        steps = self.start_steps()
+        for index, location in enumerate(locations.values()):
+            if self.home_each_part and index:
+                steps += self.start_steps()
+            steps += job_steps(np.array(location) + self.gripper_offset, drop_off_zone, self.home_each_part)
+        if not (self.home_each_part and locations):
+            steps += self.home_steps()
+
+        return self.compile_steps(steps, self.idle_position)
+
+    def compile_steps(self, steps: list, start_point: np.ndarray) -> TrajectoryPlan:
+        """Generate the paths of a list of steps and interpolate their orientations.
+
+        Args:
+            steps (list): Steps in the form described in __init__. The first step must set the orientation.
+            start_point (np.ndarray): Position the plan starts from.
+
+        Returns:
+            TrajectoryPlan: The compiled plan.
+        """
+        paths, stops = [], []
+        start_quaternions, end_quaternions, axes, angles, slerps = [], [], [], [], []
+        named = {}
+        point, quaternion = np.array(start_point, dtype=np.float64), None
+
+        for step in steps:
+            if len(step) == 1:
+                stops.append(len(paths) - 1)
+                continue
+
+            name, target, linear, orientation = step
+            rule = orientation[0]
+            if rule == "set":
+                quaternion = np.array(orientation[1], dtype=np.float64)
+
+            if isinstance(target, tuple) and target[0] == "offset":
+                _, vector, frame, base = target
+                named["start"] = (point, quaternion)
+                frame = named[frame][1] if isinstance(frame, str) else frame
+                base = named[base][0] if isinstance(base, str) else base
+                target = np.dot(quaternions_to_rotation_matrices([frame])[0], vector) + base
+
+            path = self.planner.generate_path(point, target, linear=linear)
+            paths.append(path)
+
+            axis, angle, end = np.zeros(3), 0.0, quaternion
+            if rule == "sweep" and len(path) > 1:
+                axis, angle = UNIT_AXES[orientation[1]], orientation[2]
+                end = quaternion_multiply_batch(quaternion, axis_angle_quaternions(axis, angle))
+            elif rule == "slerp" and len(path) > 1:
+                end = np.array(orientation[1], dtype=np.float64)
+                end = end / np.linalg.norm(end)
+
+            start_quaternions.append(quaternion)
+            end_quaternions.append(end if rule == "slerp" else quaternion)
+            axes.append(axis)
+            angles.append(angle)
+            slerps.append(rule == "slerp")
+
+            point, quaternion = path[-1], end
+            named[name] = (point, quaternion)
+
+        counts = np.array([len(path) for path in paths])
+        boundaries = np.concatenate(([0], np.cumsum(counts)))
+        segment = np.repeat(np.arange(len(paths)), counts)
+        t = (np.arange(boundaries[-1]) - boundaries[:-1][segment]) / np.maximum(counts - 1, 1)[segment]
+
+        # Holds and sweeps in one product (a hold is a zero-angle sweep), then the slerped segments
+        start_quaternions = np.array(start_quaternions)[segment]
+        quaternions = quaternion_multiply_batch(start_quaternions, axis_angle_quaternions(np.array(axes)[segment], t * np.array(angles)[segment]))
+        slerp = np.array(slerps)[segment]
+        if slerp.any():
+            quaternions[slerp] = quaternion_slerp_batch(start_quaternions[slerp], np.array(end_quaternions)[segment][slerp], t[slerp])
+
+        return TrajectoryPlan(np.concatenate(paths), quaternions, boundaries, stops)
+
+
+def run_quaternion_benchmark(compiler: PlanCompiler, locations: dict, drop_off_zone: tuple, repeats: int = 5) -> dict:
+    """Time the scalar quaternion helpers against the batched ones on a full return-path plan.
+
+    Every sample of the plan goes through each helper once, the way the planners used to call them
+    in list comprehensions, and once through the batched version.
+
+    Args:
+        compiler (PlanCompiler): Compiler used to build the return plan.
+        locations (dict): Part names as keys and their stored locations as values.
+        drop_off_zone (tuple): The drop-off zone coordinates (x, y, z).
+        repeats (int, optional): Number of timing runs; the fastest one is kept. Defaults to 5.
+
+    Returns:
+        dict: Helper name -> (scalar seconds, batched seconds).
+    """
+    plan = compiler.compile(locations, drop_off_zone, False)
+    quaternions = plan.quaternions
+    matrices = plan.rotation_matrices()
+    t = np.linspace(0, 1, len(quaternions))
+    start, end = quaternions[0], compiler.drop_off_orientation
+
+    cases = {
+        "slerp": (lambda: [quaternion_slerp(start, end, value) for value in t],
+                  lambda: quaternion_slerp_batch(start, end, t)),
+        "rotate": (lambda: [rotate_quaternion(start, 0, angle, 0) for angle in t * np.pi],
+                   lambda: rotate_quaternion_batch(start, 0, t * np.pi, 0)),
+        "quat->matrix": (lambda: [quaternion_to_rotation_matrix(quaternion) for quaternion in quaternions],
+                         lambda: quaternions_to_rotation_matrices(quaternions)),
+        "matrix->quat": (lambda: [rotation_matrix_to_quaternion(matrix) for matrix in matrices],
+                         lambda: rotation_matrices_to_quaternions(matrices)),
+    }
+
+    print(f"Quaternion benchmark on a return plan of {len(plan)} segments and {len(quaternions)} samples:")
+    results = {}
+    for name, (scalar, batched) in cases.items():
+        scalar_time = min(timeit.repeat(scalar, number=1, repeat=repeats))
+        batched_time = min(timeit.repeat(batched, number=1, repeat=repeats))
+        print(f"{name:>13}: scalar {scalar_time * 1e3:9.3f} ms, batched {batched_time * 1e3:7.3f} ms ({scalar_time / batched_time:.0f}x)")
+        results[name] = (scalar_time, batched_time)
+
+    return results
+
+def main():
+    from Main_stae_machine import PLAN_SETTINGS, DROP_OFF_ZONE
+
+    planner = PathPlanner(1, 0.5, retention="off")
+    locations = {"part 1": (0.4, 0.5, 0.1), "part 2": (-0.5, -0.4, 0.2), "part 3": (0.6, 0.2, 0.2)}
+    run_quaternion_benchmark(PlanCompiler(planner, **PLAN_SETTINGS), locations, DROP_OFF_ZONE)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import numpy as np
+
+def rotation_matrix_to_quaternion(rotation_matrix: np.ndarray) -> np.ndarray:
+    """
+    Convert a 3x3 rotation matrix into a quaternion.
+
+    Args:
+        rotation_matrix (np.array): A 3x3 rotation matrix.
+
+    Returns:
+        np.array: A 4-element array representing the quaternion.
+    """
+    R = np.array(rotation_matrix, dtype=np.float64)
+    
+    trace = np.trace(R)
+    
+    if trace > 0:
+        S = 2.0 * np.sqrt(trace + 1.0)
+        qw = 0.25 * S
+        qx = (R[2, 1] - R[1, 2]) / S
+        qy = (R[0, 2] - R[2, 0]) / S
+        qz = (R[1, 0] - R[0, 1]) / S
+    elif (R[0, 0] > R[1, 1]) and (R[0, 0] > R[2, 2]):
+        S = 2.0 * np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
+        qw = (R[2, 1] - R[1, 2]) / S
+        qx = 0.25 * S
+        qy = (R[0, 1] + R[1, 0]) / S
+        qz = (R[0, 2] + R[2, 0]) / S
+    elif R[1, 1] > R[2, 2]:
+        S = 2.0 * np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
+        qw = (R[0, 2] - R[2, 0]) / S
+        qx = (R[0, 1] + R[1, 0]) / S
+        qy = 0.25 * S
+        qz = (R[1, 2] + R[2, 1]) / S
+    else:
+        S = 2.0 * np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
+        qw = (R[1, 0] - R[0, 1]) / S
+        qx = (R[0, 2] + R[2, 0]) / S
+        qy = (R[1, 2] + R[2, 1]) / S
+        qz = 0.25 * S
+    
+    quaternion = np.array([qw, qx, qy, qz])
+
+    return quaternion
+
+def quaternion_to_rotation_matrix(quaternion: np.ndarray) -> np.ndarray:
+    """
+    Convert a quaternion into a 3x3 rotation matrix.
+
+    Args:
+        quaternion (list or np.array): A 4-element list or array representing the quaternion.
+
+    Returns:
+        np.array: A 3x3 rotation matrix.
+    """
+    q = np.array(quaternion, dtype=np.float64)
+    q = q / np.linalg.norm(q)
+
+    w, x, y, z = q
+    rotation_matrix = np.array([[1 - 2*y*y - 2*z*z, 2*x*y - 2*w*z, 2*x*z + 2*w*y],
+                                 [2*x*y + 2*w*z, 1 - 2*x*x - 2*z*z, 2*y*z - 2*w*x],
+                                 [2*x*z - 2*w*y, 2*y*z + 2*w*x, 1 - 2*x*x - 2*y*y]])
+
+    return rotation_matrix
+
+def quaternion_multiply_2q(q1: np.ndarray, q2: np.ndarray) -> np.ndarray :
+    """
+    Multiply two quaternions.
+
+    Args:
+        q1 (np.array): The first quaternion [w, x, y, z].
+        q2 (np.array): The second quaternion [w, x, y, z].
+
+    Returns:
+        np.array: The resulting quaternion.
+    """
+    w1, x1, y1, z1 = q1
+    w2, x2, y2, z2 = q2
+    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return np.array([w, x, y, z])
+
+def rotate_quaternion(quat: np.ndarray, angle_x:float, angle_y:float, angle_z:float) -> np.ndarray :
+    """
+    Rotate a quaternion around the unit vectors.
+
+    Args:
+        quat (np.array): The original quaternion [w, x, y, z].
+        angle_x (float): Angle to rotate around the x-axis (in radians).
+        angle_y (float): Angle to rotate around the y-axis (in radians).
+        angle_z (float): Angle to rotate around the z-axis (in radians).
+
+    Returns:
+        np.array: The rotated quaternion [w, x, y, z].
+    """
+    # Quaternion representing the rotation around x-axis
+    qx = np.array([np.cos(angle_x / 2), np.sin(angle_x / 2), 0, 0])
+    
+    # Quaternion representing the rotation around y-axis
+    qy = np.array([np.cos(angle_y / 2), 0, np.sin(angle_y / 2), 0])
+    
+    # Quaternion representing the rotation around z-axis
+    qz = np.array([np.cos(angle_z / 2), 0, 0, np.sin(angle_z / 2)])
+    
+    # Combine the rotations by quaternion multiplication
+    rotated_quat = quaternion_multiply_2q(quaternion_multiply_2q(quaternion_multiply_2q(quat, qx), qy), qz)
+
+    return rotated_quat
+
+def quaternion_slerp(q1: np.ndarray, q2: np.ndarray, t: float) -> np.ndarray:
+    """
+    Perform spherical linear interpolation (slerp) between two quaternions.
+
+    Args:
+        q1 (numpy.ndarray): The first quaternion as a 4-element numpy array [w, x, y, z].
+        q2 (numpy.ndarray): The second quaternion as a 4-element numpy array [w, x, y, z].
+        t (float): Interpolation parameter. It ranges from 0 to 1. 
+                   For t=0, the resulting quaternion is equal to q1.
+                   For t=1, the resulting quaternion is equal to q2.
+
+    Returns:
+        numpy.ndarray: The interpolated quaternion as a 4-element numpy array [w, x, y, z].
+    """
+    # Ensure quaternions are normalized
+    q1 = q1 / np.linalg.norm(q1)
+    q2 = q2 / np.linalg.norm(q2)
+
+    dot_product = np.dot(q1, q2)
+    
+    # Determine the sign
+    if dot_product < 0.0:
+        q1 = -q1
+        dot_product = -dot_product
+
+    # Clamp dot product to ensure stability
+    dot_product = min(1.0, max(-1.0, dot_product))
+    
+    # Calculate the angle between the quaternions
+    theta_0 = np.arccos(dot_product)
+    sin_theta_0 = np.sin(theta_0)
+    
+    # Perform interpolation
+    s0 = np.sin((1 - t) * theta_0) / sin_theta_0
+    s1 = np.sin(t * theta_0) / sin_theta_0
+    
+    return (s0 * q1) + (s1 * q2)
+
+def quaternion_to_euler(quaternion):
+    """Convert quaternion to Euler angles.
+
+    Args:
+        quaternion (np.array): Quaternion in the form [w, x, y, z].
+
+    Returns:
+        np.array: Euler angles in the form [roll, pitch, yaw].
+    """
+    w, x, y, z = quaternion
+    # Roll (x-axis rotation)
+    sinr_cosp = 2.0 * (w * x + y * z)
+    cosr_cosp = 1.0 - 2.0 * (x * x + y * y)
+    roll = np.arctan2(sinr_cosp, cosr_cosp)
+
+    # Pitch (y-axis rotation)
+    sinp = 2.0 * (w * y - z * x)
+    if np.abs(sinp) >= 1:
+        pitch = np.sign(sinp) * np.pi / 2  # Use +/-90 degrees if out of range
+    else:
+        pitch = np.arcsin(sinp)
+
+    # Yaw (z-axis rotation)
+    siny_cosp = 2.0 * (w * z + x * y)
+    cosy_cosp = 1.0 - 2.0 * (y * y + z * z)
+    yaw = np.arctan2(siny_cosp, cosy_cosp)
+
+    return np.array([roll, pitch, yaw])
+
+def rotation_matrix_to_euler_angles(R: np.ndarray):
+    """
+    Convert a 3x3 rotation matrix to Euler angles.
+
+    Parameters:
+    R : numpy.ndarray
+        3x3 rotation matrix.
+
+    Returns:
+    numpy.ndarray
+        Euler angles in radians as [roll, pitch, yaw].
+        
+    Notes:
+        - This function assumes the rotation matrix represents a proper rotation (orthogonal matrix).
+        - Gimbal lock may occur when the pitch angle approaches ±90 degrees.
+          In such cases, the resulting roll and yaw angles may become ambiguous.
+          Consider handling gimbal lock cases accordingly in your application.
+    """
+    # Input validation
+    if R.shape != (3, 3):
+        raise ValueError("Input matrix must be a 3x3 array.")
+
+    # Calculate sin of pitch angle
+    sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
+    
+    # Check for gimbal lock
+    singular = sy < 1e-6
+
+    if not singular:
+        roll = np.arctan2(R[2, 1], R[2, 2])
+        pitch = np.arctan2(-R[2, 0], sy)
+        yaw = np.arctan2(R[1, 0], R[0, 0])
+    else:
+        roll = np.arctan2(-R[1, 2], R[1, 1])
+        pitch = np.arctan2(-R[2, 0], sy)
+        yaw = 0
+
+    return np.array([roll, pitch, yaw])
+
+
+def quaternion_multiply_batch(q1: np.ndarray, q2: np.ndarray) -> np.ndarray:
+    """
+    Multiply arrays of quaternions element-wise.
+
+    Args:
+        q1 (np.ndarray): Quaternions [w, x, y, z] of shape (..., 4).
+        q2 (np.ndarray): Quaternions [w, x, y, z] broadcastable against q1.
+
+    Returns:
+        np.ndarray: The products q1 * q2.
+    """
+    w1, x1, y1, z1 = np.moveaxis(np.asarray(q1, dtype=np.float64), -1, 0)
+    w2, x2, y2, z2 = np.moveaxis(np.asarray(q2, dtype=np.float64), -1, 0)
+    return np.stack((w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                     w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                     w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                     w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2), axis=-1)
+
+def axis_angle_quaternions(axes: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Build the quaternions of rotations about unit axes.
+
+    Args:
+        axes (np.ndarray): Unit axes of shape (..., 3).
+        angles (np.ndarray): Rotation angles in radians, broadcastable against the axes.
+
+    Returns:
+        np.ndarray: Quaternions [w, x, y, z] of shape (..., 4).
+    """
+    half = np.asarray(angles, dtype=np.float64) / 2
+    return np.concatenate((np.cos(half)[..., None], np.sin(half)[..., None] * axes), axis=-1)
+
+def rotate_quaternion_batch(quats: np.ndarray, angles_x=0.0, angles_y=0.0, angles_z=0.0) -> np.ndarray:
+    """
+    Rotate quaternions around the unit vectors, like rotate_quaternion for every element.
+
+    Args:
+        quats (np.ndarray): Quaternions [w, x, y, z] of shape (4,) or (N, 4).
+        angles_x (float or np.ndarray, optional): Angle(s) around the x-axis (in radians). Defaults to 0.
+        angles_y (float or np.ndarray, optional): Angle(s) around the y-axis (in radians). Defaults to 0.
+        angles_z (float or np.ndarray, optional): Angle(s) around the z-axis (in radians). Defaults to 0.
+
+    Returns:
+        np.ndarray: The rotated quaternions, broadcast over the quaternions and angles.
+    """
+    rotated = np.asarray(quats, dtype=np.float64)
+    for axis, angles in zip(np.eye(3), (angles_x, angles_y, angles_z)):
+        if np.ndim(angles) or angles:
+            rotated = quaternion_multiply_batch(rotated, axis_angle_quaternions(axis, angles))
+    return rotated
+
+def quaternion_slerp_batch(q1: np.ndarray, q2: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Spherical linear interpolation (slerp) between quaternions over a vector of parameters.
+
+    Matches quaternion_slerp element for element, but falls back to linear interpolation when the
+    quaternions are equal instead of dividing by zero.
+
+    Args:
+        q1 (np.ndarray): Start quaternion(s) [w, x, y, z] of shape (4,) or (N, 4).
+        q2 (np.ndarray): End quaternion(s) of shape (4,) or (N, 4).
+        t (np.ndarray): Interpolation parameters in [0, 1] of shape (N,).
+
+    Returns:
+        np.ndarray: The interpolated quaternions of shape (N, 4).
+    """
+    q1 = np.asarray(q1, dtype=np.float64)
+    q2 = np.asarray(q2, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)[..., None]
+
+    # Ensure quaternions are normalized
+    q1 = q1 / np.linalg.norm(q1, axis=-1, keepdims=True)
+    q2 = q2 / np.linalg.norm(q2, axis=-1, keepdims=True)
+
+    # Take the short way around
+    dot_product = np.sum(q1 * q2, axis=-1, keepdims=True)
+    q1 = np.where(dot_product < 0.0, -q1, q1)
+    dot_product = np.clip(np.abs(dot_product), -1.0, 1.0)
+
+    theta_0 = np.arccos(dot_product)
+    sin_theta_0 = np.sin(theta_0)
+    close = sin_theta_0 < 1e-12
+    sin_theta_0 = np.where(close, 1.0, sin_theta_0)
+
+    s0 = np.where(close, 1 - t, np.sin((1 - t) * theta_0) / sin_theta_0)
+    s1 = np.where(close, t, np.sin(t * theta_0) / sin_theta_0)
+    return s0 * q1 + s1 * q2
+
+def quaternions_to_rotation_matrices(quaternions: np.ndarray) -> np.ndarray:
+    """
+    Convert quaternions into rotation matrices.
+
+    Args:
+        quaternions (np.ndarray): Quaternions [w, x, y, z] of shape (N, 4).
+
+    Returns:
+        np.ndarray: Rotation matrices of shape (N, 3, 3).
+    """
+    q = np.asarray(quaternions, dtype=np.float64)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack((np.stack((1 - 2*y*y - 2*z*z, 2*x*y - 2*w*z, 2*x*z + 2*w*y), axis=-1),
+                     np.stack((2*x*y + 2*w*z, 1 - 2*x*x - 2*z*z, 2*y*z - 2*w*x), axis=-1),
+                     np.stack((2*x*z - 2*w*y, 2*y*z + 2*w*x, 1 - 2*x*x - 2*y*y), axis=-1)), axis=-2)
+
+def rotation_matrices_to_quaternions(rotation_matrices: np.ndarray) -> np.ndarray:
+    """
+    Convert rotation matrices into quaternions, taking the same branch as rotation_matrix_to_quaternion.
+
+    Args:
+        rotation_matrices (np.ndarray): Rotation matrices of shape (N, 3, 3).
+
+    Returns:
+        np.ndarray: Quaternions [w, x, y, z] of shape (N, 4).
+    """
+    R = np.asarray(rotation_matrices, dtype=np.float64)
+    r00, r11, r22 = R[..., 0, 0], R[..., 1, 1], R[..., 2, 2]
+    trace = r00 + r11 + r22
+
+    # Pick the numerically safest component to divide by, in the same order as the scalar version
+    branch = np.where(trace > 0, 0, np.where((r00 > r11) & (r00 > r22), 1, np.where(r11 > r22, 2, 3)))
+    diagonal = np.stack((trace, 2 * r00 - trace, 2 * r11 - trace, 2 * r22 - trace), axis=-1)
+    S = 2.0 * np.sqrt(np.maximum(1.0 + np.take_along_axis(diagonal, branch[..., None], axis=-1)[..., 0], 0.0))
+
+    # Differences and sums of the off-diagonal pairs
+    d_x, d_y, d_z = R[..., 2, 1] - R[..., 1, 2], R[..., 0, 2] - R[..., 2, 0], R[..., 1, 0] - R[..., 0, 1]
+    s_xy, s_xz, s_yz = R[..., 0, 1] + R[..., 1, 0], R[..., 0, 2] + R[..., 2, 0], R[..., 1, 2] + R[..., 2, 1]
+
+    numerators = np.stack((np.stack((0.25 * S * S, d_x, d_y, d_z), axis=-1),
+                           np.stack((d_x, 0.25 * S * S, s_xy, s_xz), axis=-1),
+                           np.stack((d_y, s_xy, 0.25 * S * S, s_yz), axis=-1),
+                           np.stack((d_z, s_xz, s_yz, 0.25 * S * S), axis=-1)), axis=-2)
+    return np.take_along_axis(numerators, branch[..., None, None], axis=-2)[..., 0, :] / S[..., None]
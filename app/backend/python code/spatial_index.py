@@ -0,0 +1,111 @@
+import numpy as np
+
+class RectangleIndex:
+    """Uniform grid index over axis-aligned rectangles.
+
+    Rectangle bounds live in one (n, 4) array of x0, y0, x1, y1 and every grid cell lists the
+    rectangles that touch it, so a query only tests the rectangles near it however many are stored.
+    """
+
+    CELL_SIZE = 0.1
+
+    def __init__(self, cell_size: float = None):
+        """Initialize an empty RectangleIndex.
+
+        Args:
+            cell_size (float, optional): Side of a grid cell, about the size of the rectangles queried. Defaults to CELL_SIZE.
+        """
+        self.cell_size = cell_size or self.CELL_SIZE
+        self.bounds = np.empty((16, 4))
+        self.count = 0
+        self.cells = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _cell_range(self, x0: float, y0: float, x1: float, y1: float) -> tuple:
+        """Return the ranges of cell columns and rows a box touches."""
+        return (range(int(np.floor(x0/self.cell_size)), int(np.floor(x1/self.cell_size)) + 1),
+                range(int(np.floor(y0/self.cell_size)), int(np.floor(y1/self.cell_size)) + 1))
+
+    def insert(self, x: float, y: float, width: float, height: float) -> int:
+        """Add a rectangle to the index.
+
+        Args:
+            x (float): X-coordinate of the rectangle.
+            y (float): Y-coordinate of the rectangle.
+            width (float): Width of the rectangle.
+            height (float): Height of the rectangle.
+
+        Returns:
+            int: Index of the rectangle, in insertion order.
+        """
+        if self.count == len(self.bounds):
+            self.bounds = np.concatenate((self.bounds, np.empty_like(self.bounds)))
+
+        index = self.count
+        self.bounds[index] = (x, y, x + width, y + height)
+        self.count += 1
+
+        columns, rows = self._cell_range(*self.bounds[index])
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append(index)
+        return index
+
+    def candidates(self, x: float, y: float, width: float, height: float) -> np.ndarray:
+        """Return the rectangles sharing a grid cell with a box.
+
+        Args:
+            x (float): X-coordinate of the box.
+            y (float): Y-coordinate of the box.
+            width (float): Width of the box.
+            height (float): Height of the box.
+
+        Returns:
+            np.ndarray: Sorted indices of the nearby rectangles.
+        """
+        columns, rows = self._cell_range(x, y, x + width, y + height)
+        found = set()
+        for column in columns:
+            for row in rows:
+                found.update(self.cells.get((column, row), ()))
+        return np.array(sorted(found), dtype=int)
+
+    def overlapping(self, x: float, y: float, width: float, height: float) -> np.ndarray:
+        """Return the rectangles a box overlaps, the way BoxPlacer.is_overlap defines it.
+
+        A box overlaps a rectangle when their interiors intersect, unless the box lies entirely inside it.
+
+        Args:
+            x (float): X-coordinate of the box.
+            y (float): Y-coordinate of the box.
+            width (float): Width of the box.
+            height (float): Height of the box.
+
+        Returns:
+            np.ndarray: Indices of the overlapped rectangles, in insertion order.
+        """
+        if not self.count:
+            return np.empty(0, dtype=int)
+
+        indices = self.candidates(x, y, width, height)
+        if not len(indices):
+            return indices
+
+        x0, y0, x1, y1 = self.bounds[indices].T
+        intersects = (x < x1) & (x + width > x0) & (y < y1) & (y + height > y0)
+        inside = (x >= x0) & (y >= y0) & (x + width <= x1) & (y + height <= y1)
+        return indices[intersects & ~inside]
+
+    def rectangle(self, index: int) -> tuple:
+        """Return a stored rectangle.
+
+        Args:
+            index (int): Index returned by insert.
+
+        Returns:
+            tuple: (x, y, width, height) of the rectangle.
+        """
+        x0, y0, x1, y1 = self.bounds[index]
+        return x0, y0, x1 - x0, y1 - y0
@@ -1,9 +1,24 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
 from DP_parts import *
 from ik_solver import *
 from intrerpolation import *
 from MotorManager import *
 from Motors import *
 from VelocityPFP import *
+from quaternions import *
+from plan_compiler import *
+from moshionPlanning import *
+from Messager import *
+from AsyncMessager import *
+from VirtualTeensy import *
+from spatial_index import *
+import Packing
 
 def test_PartsDatabase():
     try:
@@ -42,6 +57,181 @@ def test_PartsDatabase():
         parts_db.conn.commit()
         parts_db.disconnect()
 
+def test_connection_manager():
+    try:
+        # Test persistent connections are reused, in WAL mode and separate per thread
+        connections = ConnectionManager("test_connections.db")
+        conn = connections.connect()
+        assert connections.connect() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        connections.release()
+        assert connections.conn is conn
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(connections.connect()))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
+        connections.close_all()
+        assert connections.conn is None
+
+        # Test the per-call option closes on release
+        connections = ConnectionManager("test_connections.db", persistent=False)
+        conn = connections.connect()
+        connections.release()
+        assert connections.conn is None
+        try:
+            conn.execute("SELECT 1")
+            assert False, "connection was left open"
+        except sqlite3.ProgrammingError:
+            pass
+
+    except AssertionError as e:
+        print(f"ConnectionManager Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"ConnectionManager Test Unexpected Error: {e}")
+    finally:
+        remove_db_files("test_connections.db")
+
+def test_parts_schema():
+    try:
+        # Build a legacy table with the position and orientation stored as text
+        conn = sqlite3.connect("test_schema.db")
+        conn.execute("""CREATE TABLE Parts (ID TEXT NOT NULL, Name TEXT NOT NULL, Width REAL NOT NULL, Height REAL NOT NULL,
+                        FullWeight REAL NOT NULL, HalfWeight REAL NOT NULL, EmptyWeight REAL NOT NULL, CurrentWeight REAL,
+                        InService INTEGER, Position TEXT NOT NULL, Orientation TEXT NOT NULL)""")
+        conn.execute("INSERT INTO Parts VALUES ('a227b', 'Clamp', 0.1, 0.092, 14, 9, 5, 8, 0, '[-0.6, 0.73, 0.0]', '(0.0, 1.0, 0.0)')")
+        conn.commit()
+        conn.close()
+
+        # Test opening the database migrates it to typed columns with indexes
+        parts_db = PartsDatabase("test_schema.db")
+        part = parts_db.get_part_by_name("Clamp")
+        assert part.position == (-0.6, 0.73, 0.0) and part.orientation == (0.0, 1.0, 0.0)
+        parts_db.connect()
+        assert parts_db.cursor.execute("PRAGMA user_version").fetchone()[0] == PARTS_SCHEMA_VERSION
+        indexes = {row[1] for row in parts_db.cursor.execute("PRAGMA index_list(Parts)")}
+        assert {"Parts_Name", "Parts_InService"} <= indexes
+        assert migrate_parts_db("test_schema.db")
+
+        # Test IDs are unique
+        box = Box("b1", "Bolt", 0.1, 0.092, 12, 8, 2, 5, False, [-0.2, 0.73, 0.5], (0.0, 1.0, 0.0))
+        assert parts_db.store_part(box)
+        assert not parts_db.store_part(box)
+        assert parts_db.get_part_by_ID("b1").position == (-0.2, 0.73, 0.5)
+
+        # Test the failed write does not keep the database locked for another thread
+        assert not parts_db.conn.in_transaction
+        stored = []
+        other = Box("b2", "Nut", 0.1, 0.092, 12, 8, 2, 5, False, [-0.4, 0.73, 0.5], (0.0, 1.0, 0.0))
+        thread = threading.Thread(target=lambda: stored.append(parts_db.store_part(other)))
+        thread.start()
+        thread.join()
+        assert stored == [True]
+        parts_db.close()
+
+    except AssertionError as e:
+        print(f"Parts schema Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Parts schema Test Unexpected Error: {e}")
+    finally:
+        remove_db_files("test_schema.db")
+
+def test_bulk_part_fetch():
+    try:
+        parts_db = PartsDatabase("test_bulk.db")
+        names = [f"Part {index}" for index in range(600)]
+        for index, name in enumerate(names):
+            parts_db.store_part(Box(f"id{index}", name, 0.1, 0.092, 12, 8, 2, 5, False, [index, 0.73, 0.5], (0.0, 1.0, 0.0)))
+
+        # Test a large order comes back complete, in order, across query chunks
+        wanted = names[::-1] + ["Missing"]
+        parts = parts_db.get_parts_by_names(wanted)
+        assert list(parts) == names[::-1]
+        assert all(part.name == name for name, part in parts.items())
+        assert parts["Part 7"].position == (7.0, 0.73, 0.5)
+
+        # Test the lookup by ID matches the single part lookup
+        parts = parts_db.get_parts_by_ids(["id3", "id1"])
+        assert list(parts) == ["id3", "id1"]
+        assert parts["id1"].name == parts_db.get_part_by_ID("id1").name
+        assert parts_db.get_parts_by_names([]) == {}
+        parts_db.close()
+
+    except AssertionError as e:
+        print(f"Bulk part fetch Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Bulk part fetch Test Unexpected Error: {e}")
+    finally:
+        remove_db_files("test_bulk.db")
+
+def test_part_search():
+    try:
+        parts_db = PartsDatabase("test_search.db")
+        for ID, name in (("b7c01", "Bolt M6"), ("a1b2c", "Hex Bolt"), ("bo123", "Washer"), ("c0ffe", "Boltless Clip"), ("d00d5", "Nut")):
+            parts_db.store_part(Box(ID, name, 0.1, 0.092, 12, 8, 2, 5, False, [0, 0.73, 0.5], (0.0, 1.0, 0.0)))
+
+        # Test names starting with the text rank first, then IDs, then names or IDs containing it
+        assert [part.name for part in parts_db.search_parts("bolt")] == ["Bolt M6", "Boltless Clip", "Hex Bolt"]
+        assert [part.name for part in parts_db.search_parts("bo")] == ["Bolt M6", "Boltless Clip", "Washer"]
+        assert [part.name for part in parts_db.search_parts("bolt", limit=1)] == ["Bolt M6"]
+        assert [part.ID for part in parts_db.search_parts("1b2")] == ["a1b2c"]
+        assert parts_db.search_parts("") == []
+
+        # Test the index follows updates
+        parts_db.update_part_by_name("Nut", Name="Lock Nut Bolt")
+        assert [part.name for part in parts_db.search_parts("nut bolt")] == ["Lock Nut Bolt"]
+        parts_db.close()
+
+        # Test a database without the index gets it built from its parts
+        conn = sqlite3.connect("test_search.db")
+        conn.execute("DROP TABLE PartsSearch")
+        conn.commit()
+        conn.close()
+        parts_db = PartsDatabase("test_search.db")
+        assert [part.name for part in parts_db.search_parts("less")] == ["Boltless Clip"]
+        parts_db.close()
+
+        # Test the index is keyed on PartKey, which VACUUM keeps, and still matches after deletes
+        parts_db.connect()
+        parts_db.cursor.execute("DELETE FROM Parts WHERE Name IN ('Bolt M6', 'Hex Bolt')")
+        parts_db.conn.commit()
+        parts_db.cursor.execute("VACUUM")
+        keys = parts_db.cursor.execute("SELECT PartKey FROM Parts ORDER BY PartKey").fetchall()
+        assert parts_db.cursor.execute("SELECT rowid FROM PartsSearch ORDER BY rowid").fetchall() == keys
+        parts_db.disconnect()
+        assert [part.name for part in parts_db.search_parts("bo")] == ["Boltless Clip", "Washer"]
+        parts_db.close()
+
+        # Test a table from before PartKey, with its index and triggers on the implicit rowid, is migrated
+        conn = sqlite3.connect("test_search.db")
+        search_schema = [sql.replace("PartKey", "rowid") for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'PartsSearch' OR type = 'trigger'")]
+        conn.execute("DROP TABLE PartsSearch")
+        conn.execute(f"CREATE TABLE Parts_v3 AS SELECT {PART_COLUMNS} FROM Parts")
+        conn.execute("DROP TABLE Parts")
+        conn.execute("ALTER TABLE Parts_v3 RENAME TO Parts")
+        for sql in search_schema:
+            conn.execute(sql)
+        conn.execute("PRAGMA user_version = 3")
+        conn.commit()
+        conn.close()
+        parts_db = PartsDatabase("test_search.db")
+        assert [part.name for part in parts_db.search_parts("less")] == ["Boltless Clip"]
+        parts_db.update_part_by_name("Washer", Name="Spring Washer")
+        assert [part.name for part in parts_db.search_parts("ring")] == ["Spring Washer"]
+        parts_db.connect()
+        assert parts_db.cursor.execute("PRAGMA user_version").fetchone()[0] == PARTS_SCHEMA_VERSION
+        parts_db.disconnect()
+        parts_db.close()
+
+    except AssertionError as e:
+        print(f"Part search Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Part search Test Unexpected Error: {e}")
+    finally:
+        remove_db_files("test_search.db")
+
 def test_PathPlanner():
     try:
         # Initialize PathPlanner
@@ -74,6 +264,213 @@ def test_PathPlanner():
     except Exception as e:
         print(f"PathPlanner Test Unexpected Error: {e}")
 
+def test_saved_path_retention():
+    try:
+        start_point = (0.3, 0, 0)
+        end_point = (0.5, 0.2, 0.1)
+
+        # Test the ring keeps only the newest paths
+        ring_planner = PathPlanner(1.0, 0.5, retention="ring", max_saved_paths=3)
+        for _ in range(5):
+            ring_planner.generate_path(start_point, end_point, True)
+        assert len(ring_planner.saved_paths) == 3
+
+        # Test linear moves are kept as their trajectory and sampled back to the same points
+        planner = PathPlanner(1.0, 0.5)
+        path = planner.generate_path(start_point, end_point, True)
+        assert isinstance(planner.saved_paths[-1], LinearTrajectory)
+        np.testing.assert_allclose(planner.materialize(planner.saved_paths[-1]), path)
+
+        # Test the decimated copies keep both endpoints
+        decimated_planner = PathPlanner(1.0, 0.5, retention="decimated", decimation=10)
+        path = decimated_planner.generate_path(start_point, end_point, True)
+        saved = decimated_planner.materialize(decimated_planner.saved_paths[-1])
+        assert abs(len(saved) - len(path) / 10) <= 2
+        np.testing.assert_allclose(saved[[0, -1]], path[[0, -1]])
+        path = decimated_planner.generate_path(start_point, end_point, False)
+        saved = decimated_planner.materialize(decimated_planner.saved_paths[-1])
+        assert len(saved) == (len(path) - 2) // 10 + 2
+        np.testing.assert_allclose(saved[[0, -1]], path[[0, -1]])
+
+        # Test the streamed file reads back with retention turned off
+        with PathWriter("test_paths.bin") as writer:
+            off_planner = PathPlanner(1.0, 0.5, retention="off", path_writer=writer)
+            paths = [off_planner.generate_path(start_point, end_point, linear) for linear in (True, False)]
+        assert len(off_planner.saved_paths) == 0
+        read_paths = list(PathWriter.read_paths("test_paths.bin"))
+        assert len(read_paths) == 2
+        for path, read_path in zip(paths, read_paths):
+            np.testing.assert_allclose(read_path, path, atol=1e-6)
+
+    except AssertionError as e:
+        print(f"Saved path retention Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Saved path retention Test Unexpected Error: {e}")
+    finally:
+        if os.path.exists("test_paths.bin"):
+            os.remove("test_paths.bin")
+
+def test_MotionProfileGenerator():
+    try:
+        # Initialize MotionProfileGenerator
+        profile = MotionProfileGenerator(180, 90, "test_profile")
+        profile.Set_displacement(90)
+        time_values = np.linspace(0, profile.move_time, 1001)
+
+        # Test the full pass
+        profile.Generator_profile(time_values)
+        assert len(profile.accelerations) == len(profile.velocity) == len(profile.displacements) == 1001
+        np.testing.assert_allclose(profile.displacements[-1], 90)
+        np.testing.assert_allclose(np.max(profile.velocity), profile.max_vel)
+
+        # Test the velocity is the derivative of the displacement
+        np.testing.assert_allclose(np.gradient(profile.displacements, time_values), profile.velocity, atol=1e-2 * profile.max_vel)
+
+        # Test the displacement only mode
+        displacements = profile.displacements
+        profile.Generator_profile(time_values, displacement_only=True)
+        assert len(profile.accelerations) == 0
+        np.testing.assert_allclose(profile.displacements, displacements)
+
+    except AssertionError as e:
+        print(f"MotionProfileGenerator Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"MotionProfileGenerator Test Unexpected Error: {e}")
+
+def test_synchronized_profiles():
+    try:
+        displacements = [30.0, -12.0, 0.0, 5.0]
+        max_acc = [13, 13, 13, 26]
+        max_vel = [12, 12, 12, 24]
+
+        # Test the batch profiles against one MotionProfileGenerator per axis
+        time_values, profiles = generate_synchronized_profiles(displacements, max_acc, max_vel, sample_time=0.01)
+        assert profiles.shape == (4, len(time_values))
+
+        generators = [MotionProfileGenerator(acc, vel) for acc, vel in zip(max_acc, max_vel)]
+        for generator, displacement in zip(generators, displacements):
+            generator.Set_displacement(abs(displacement))
+        sys_time = max(generator.move_time for generator in generators)
+        np.testing.assert_allclose(synchronized_move_time(displacements, max_acc, max_vel), sys_time)
+
+        for generator, displacement, profile in zip(generators, displacements, profiles):
+            generator.Set_move_time(sys_time)
+            generator.Generator_profile(time_values, displacement_only=True)
+            np.testing.assert_allclose(profile, np.sign(displacement) * generator.displacements, atol=1e-9)
+
+    except AssertionError as e:
+        print(f"Synchronized profiles Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Synchronized profiles Test Unexpected Error: {e}")
+
+def test_linear_trajectory():
+    try:
+        planner = PathPlanner(1, 0.5)
+        trajectory = planner.linear_trajectory((0, 0, 0), (1, 2, 2))
+
+        # Test the lazy evaluation against the profile and the endpoints
+        assert trajectory.length == 3
+        np.testing.assert_allclose(trajectory.position(0), [0, 0, 0])
+        np.testing.assert_allclose(trajectory.position(trajectory.move_time + 1), [1, 2, 2])
+        np.testing.assert_allclose(trajectory.position(trajectory.move_time / 2), [0.5, 1, 1])
+        np.testing.assert_allclose(np.linalg.norm(trajectory.velocity(trajectory.move_time / 2)), 0.5)
+
+        # Test the sampled path ends exactly on the end point, including zero length moves
+        points = planner.points_on_linear_path_3d((0, 0, 0), (1, 2, 2))
+        np.testing.assert_allclose(points[-1], [1, 2, 2])
+        assert planner.points_on_linear_path_3d((1, 1, 1), (1, 1, 1)).shape == (1, 3)
+
+    except AssertionError as e:
+        print(f"Linear trajectory Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Linear trajectory Test Unexpected Error: {e}")
+
+def test_quaternions():
+    try:
+        rng = np.random.default_rng(0)
+        quaternions = rng.normal(size=(200, 4))
+        quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+        angles = rng.uniform(-np.pi, np.pi, (200, 3))
+        t = np.linspace(0, 1, 200)
+
+        # Test the batched helpers against the scalar ones element for element
+        np.testing.assert_allclose(rotate_quaternion_batch(quaternions, *angles.T),
+                                   [rotate_quaternion(q, *a) for q, a in zip(quaternions, angles)], atol=1e-12)
+        np.testing.assert_allclose(quaternion_slerp_batch(quaternions[0], quaternions[1], t),
+                                   [quaternion_slerp(quaternions[0], quaternions[1], value) for value in t], atol=1e-12)
+        matrices = quaternions_to_rotation_matrices(quaternions)
+        np.testing.assert_allclose(matrices, [quaternion_to_rotation_matrix(q) for q in quaternions], atol=1e-12)
+        np.testing.assert_allclose(rotation_matrices_to_quaternions(matrices),
+                                   [rotation_matrix_to_quaternion(m) for m in matrices], atol=1e-12)
+
+        # Test slerp between equal quaternions stays finite
+        assert np.all(np.isfinite(quaternion_slerp_batch(quaternions[0], quaternions[0], t)))
+
+    except AssertionError as e:
+        print(f"Quaternions Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Quaternions Test Unexpected Error: {e}")
+
+def test_plan_compiler():
+    try:
+        planner = PathPlanner(1000, 1000)
+        drop_off_orientation = rotate_quaternion([1, 0, 0, 0], np.pi/2, 0, np.pi)
+        idle_orientation = [0.00211846, -0.70549629, -0.02529774, 0.7082588]
+        settings = dict(idle_position=(-0.088, 0.471, -0.225), idle_orientation=idle_orientation,
+                        working_position=(-0.088, 0.471, -0.003), jogging_start=(-0.588, 0, 0.177),
+                        jogging_orientation=idle_orientation, drop_off_orientation=drop_off_orientation,
+                        weighting_position=(-0.2, -0.73, 0.115), weighting_orientation=drop_off_orientation,
+                        insertion_distance=0.2, lifting_distance=0.015, drop_off_height=0.1,
+                        gripper_offset=(0, -0.3, 0.006))
+        compiler = PlanCompiler(planner, **settings)
+
+        # Test the plan layout: one contiguous array, continuous across the segment boundaries
+        plan = compiler.compile({"part": (0.4, 0.5, 0.1)}, (0, -0.73, 0.03), True)
+        assert len(plan) == 13
+        assert plan.boundaries[-1] == len(plan.positions) == len(plan.quaternions)
+        np.testing.assert_allclose(plan.positions[[0, -1]], [(-0.088, 0.471, -0.225)] * 2)
+        assert np.linalg.norm(np.diff(plan.positions, axis=0), axis=1).max() < 0.05
+
+        # Test the vectorized wrist sweep against rotate_quaternion
+        positions, quaternions = plan.segment(2)
+        expected = [rotate_quaternion(idle_orientation, angle, 0, 0) for angle in np.linspace(0, np.pi/2, len(positions))]
+        np.testing.assert_allclose(quaternions, expected, atol=1e-12)
+        np.testing.assert_allclose(plan.rotation_matrices()[10], quaternion_to_rotation_matrix(plan.quaternions[10]), atol=1e-12)
+
+        # Test the return plan pauses on the scale
+        travle_paths, travle_orientation, travle_alinements, travle_stop = compiler.compile({"part": (0.4, 0.5, 0.1)}, (0, -0.73, 0.03), False).as_lists()
+        assert travle_stop == [5]
+        np.testing.assert_allclose(travle_paths[5][-1], (-0.2, -0.73, 0.115))
+        assert len(travle_alinements) == len(travle_paths) == len(travle_orientation)
+
+        # Test homing after every part leaves the idle position through the hub again for the next part
+        jogging_orientation = rotate_quaternion(idle_orientation, 0, np.pi/4, 0)
+        settings.update(jogging_orientation=jogging_orientation, pick_axis="y", home_each_part=True)
+        homing = PlanCompiler(planner, **settings)
+        locations = {"part 1": (0.4, 0.5, 0.1), "part 2": (-0.5, -0.4, 0.2), "part 3": (0.6, 0.2, 0.2)}
+        for pickip_dropoff in (True, False):
+            plan = homing.compile(locations, (0, -0.73, 0.03), pickip_dropoff)
+            paths, orientations = plan.paths(), plan.orientations()
+            for previous, path in zip(paths, paths[1:]):
+                np.testing.assert_allclose(path[0], previous[-1], atol=1e-12)
+            assert np.linalg.norm(np.diff(plan.positions, axis=0), axis=1).max() < 0.05
+            assert np.abs(np.sum(plan.quaternions[1:] * plan.quaternions[:-1], axis=1)).min() > 0.999
+
+            # Each part goes idle -> working -> hub -> ... -> idle, and arrives idle in the idle orientation
+            ends = np.array([path[-1] for path in paths])
+            at_idle = np.flatnonzero(np.linalg.norm(ends - settings["idle_position"], axis=1) < 1e-9)
+            at_hub = np.flatnonzero(np.linalg.norm(ends - settings["jogging_start"], axis=1) < 1e-9)
+            assert len(at_idle) == len(locations) and at_idle[-1] == len(plan) - 1
+            assert all(index + 2 in at_hub for index in [-1, *at_idle[:-1]])
+            for index in at_idle:
+                assert abs(abs(np.dot(orientations[index][-1], idle_orientation)) - 1) < 1e-6
+            np.testing.assert_allclose(ends[at_idle - 1], [settings["working_position"]] * len(locations), atol=1e-12)
+
+    except AssertionError as e:
+        print(f"Plan compiler Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Plan compiler Test Unexpected Error: {e}")
+
 def test_IK():
     try:
         # Initialize RobotArm
@@ -98,6 +495,180 @@ def test_IK():
     except Exception as e:
         print(f"RobotArm Test Unexpected Error: {e}")
 
+def test_FK_batch():
+    try:
+        # Initialize RobotArm
+        robot_arm = RobotArm("urdf_tes2.urdf")
+
+        # Random joint vectors with the inactive links left at zero
+        joint_angles = np.random.uniform(-np.pi, np.pi, (50, 9))
+        joint_angles[:, [0, 3, 6]] = 0
+
+        # Test the batched FK against the per-sample ikpy FK
+        batch_fk = robot_arm.calculate_fk_batch(joint_angles)
+        assert batch_fk.shape == (50, 4, 4)
+        for joints, fk in zip(joint_angles, batch_fk):
+            np.testing.assert_allclose(fk, robot_arm.my_chain.forward_kinematics(joints), atol=1e-9)
+
+    except AssertionError as e:
+        print(f"RobotArm FK batch Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RobotArm FK batch Test Unexpected Error: {e}")
+
+def test_IK_analytic():
+    try:
+        # Initialize RobotArm
+        robot_arm = RobotArm("urdf_tes2.urdf")
+
+        # Reachable target poses from random joint vectors
+        joint_angles = np.zeros((20, 9))
+        joint_angles[:, [1, 2, 4, 5, 7, 8]] = np.random.uniform(-np.pi / 2, np.pi / 2, (20, 6))
+        targets = robot_arm.calculate_fk_batch(joint_angles)
+
+        # Test that every returned branch reaches the target pose
+        branches = robot_arm.calculate_ik_analytic(targets[:, :3, 3], targets[:, :3, :3])
+        assert branches.shape == (20, 16, 9)
+        for target, target_branches in zip(targets, branches):
+            valid = target_branches[np.all(np.isfinite(target_branches), axis=1)]
+            assert len(valid) > 0
+            for fk in robot_arm.calculate_fk_batch(valid):
+                np.testing.assert_allclose(fk, target, atol=1e-6)
+
+        # Test a pose whose reachable wrist range is narrower than the grid spacing
+        joint_angles = np.zeros((1, 9))
+        joint_angles[0, [1, 2, 4, 5, 7, 8]] = [0.2219, 0.035, 0.0913, 0.0729, 1.3568, -0.7962]
+        target = robot_arm.calculate_fk_batch(joint_angles)
+        branches = robot_arm.calculate_ik_analytic(target[:, :3, 3], target[:, :3, :3])
+        assert np.all(np.isfinite(branches[0]), axis=1).sum() == 4
+
+        # Test the analytic backend of calculate_ik
+        robot_arm.last_angles = None
+        for target, (ik, position_error, orientation_error) in zip(targets, robot_arm.calculate_ik(list(targets[:, :3, 3]), list(targets[:, :3, :3]), ["all"] * 20, batch_size=10, solver="analytic")):
+            assert np.linalg.norm(position_error) < 1e-6
+            assert np.max(np.abs(orientation_error)) < 1e-6
+
+    except AssertionError as e:
+        print(f"RobotArm analytic IK Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RobotArm analytic IK Test Unexpected Error: {e}")
+
+def test_IK_segments():
+    try:
+        # Initialize RobotArm
+        robot_arm = RobotArm("urdf_tes2.urdf", np.zeros(9))
+
+        # Three short segments along a joint space line, the middle one empty
+        joint_angles = np.zeros((30, 9))
+        joint_angles[:, [1, 2, 4, 5, 7, 8]] = np.linspace(0.1, 0.8, 30)[:, None]
+        targets = robot_arm.calculate_fk_batch(joint_angles)
+        segment_positions = [list(targets[:20, :3, 3]), [], list(targets[20:, :3, 3])]
+        segment_orientations = [list(targets[:20, :3, :3]), [], list(targets[20:, :3, :3])]
+
+        # Test the parallel solve keeps the segment order and reaches every target
+        robot_arm.last_angles = None
+        segment_angles = robot_arm.calculate_ik_segments(segment_positions, segment_orientations, processes=2, solver="analytic")
+        assert [len(angles) for angles in segment_angles] == [20, 0, 10]
+        fk = robot_arm.calculate_fk_batch(np.concatenate(segment_angles))
+        np.testing.assert_allclose(fk, targets, atol=1e-6)
+
+        # Test a failed target without a seed is left NaN and the rest are still solved
+        robot_arm = RobotArm("urdf_tes2.urdf")
+        segment_positions[0][0] = np.array([np.nan, 0, 0])
+        segment_angles = robot_arm.calculate_ik_segments(segment_positions, segment_orientations, processes=1, solver="analytic")
+        assert np.all(np.isnan(segment_angles[0][0]))
+        fk = robot_arm.calculate_fk_batch(np.concatenate(segment_angles)[1:])
+        np.testing.assert_allclose(fk, targets[1:], atol=1e-6)
+        np.testing.assert_allclose(robot_arm.last_angles, segment_angles[2][-1])
+
+    except AssertionError as e:
+        print(f"RobotArm IK segments Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RobotArm IK segments Test Unexpected Error: {e}")
+
+def test_IK_stream():
+    try:
+        # Initialize RobotArm
+        robot_arm = RobotArm("urdf_tes2.urdf")
+
+        # Densely sampled path from a joint space line
+        joint_angles = np.zeros((100, 9))
+        joint_angles[:, [1, 2, 4, 5, 7, 8]] = np.linspace([0.1, 0.2, 0.3, 0.4, 0.5, 0.6], [0.2, 0.1, 0.4, 0.3, 0.6, 0.5], 100)
+        targets = robot_arm.calculate_fk_batch(joint_angles)
+
+        # Test the DLS stream tracks the path without the full solver
+        robot_arm.last_angles = joint_angles[0].copy()
+        results = list(robot_arm.calculate_ik_stream((target[:3, 3], target[:3, :3]) for target in targets))
+        assert len(results) == 100
+        for ik, iterations, residual, fallback in results:
+            assert iterations <= 3
+            assert residual < 1e-3
+            assert fallback == False
+        np.testing.assert_allclose(robot_arm.calculate_fk_batch(np.array([result[0] for result in results])), targets, atol=1e-4)
+
+        # Test the orientation error keeps its full size near a half turn
+        for angle in (np.pi, np.pi - 1e-3, np.pi / 2):
+            flipped = targets[0][:3, :3] @ R.from_euler("z", angle).as_matrix()
+            error = pose_error(targets[0][:3, 3], flipped, targets[0])
+            np.testing.assert_allclose(np.linalg.norm(error[3:]), angle, atol=1e-9)
+            assert np.linalg.norm(error[:3]) == 0
+
+    except AssertionError as e:
+        print(f"RobotArm IK stream Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RobotArm IK stream Test Unexpected Error: {e}")
+
+def test_IK_cache():
+    try:
+        # Initialize RobotArm with a small cache
+        robot_arm = RobotArm("urdf_tes2.urdf", np.zeros(9), ik_cache_size=2)
+
+        joint_angles = np.zeros((3, 9))
+        joint_angles[:, [1, 2, 4, 5, 7, 8]] = [[0.1] * 6, [0.2] * 6, [0.3] * 6]
+        targets = robot_arm.calculate_fk_batch(joint_angles)
+
+        # Test hits and misses from the same warm-start branch
+        for target in [targets[0], targets[1], targets[0]]:
+            robot_arm.last_angles = np.zeros(9)
+            list(robot_arm.calculate_ik([target[:3, 3]], [target[:3, :3]], ["all"], solver="analytic"))
+        assert robot_arm.ik_cache_info()["hits"] == 1
+        assert robot_arm.ik_cache_info()["misses"] == 2
+
+        # Test the least recently used entry is evicted
+        robot_arm.last_angles = np.zeros(9)
+        list(robot_arm.calculate_ik([targets[2][:3, 3]], [targets[2][:3, :3]], ["all"], solver="analytic"))
+        assert robot_arm.ik_cache_info()["size"] == 2
+
+        # Test persistence and invalidation when the URDF changes
+        assert robot_arm.save_ik_cache("test_ik_cache.json") == True
+        reloaded = RobotArm("urdf_tes2.urdf", np.zeros(9), ik_cache_size=IK_CACHE_SIZE, ik_cache_file="test_ik_cache.json")
+        assert reloaded.ik_cache_info()["size"] == 2
+
+        # Test the cache is off unless asked for, so a file is neither loaded nor saved
+        assert RobotArm("urdf_tes2.urdf", ik_cache_file="test_ik_cache.json").ik_cache_info()["size"] == 0
+
+        shutil.copy("urdf_tes2.urdf", "test_changed.urdf")
+        with open("test_changed.urdf", "a") as urdf_file:
+            urdf_file.write("\n")
+        changed = RobotArm("test_changed.urdf", np.zeros(9), ik_cache_size=IK_CACHE_SIZE, ik_cache_file="test_ik_cache.json")
+        assert changed.ik_cache_info()["size"] == 0
+
+        # Test a cache with a file is saved when the interpreter exits
+        subprocess.run([sys.executable, "-c", "import numpy as np\n"
+                        "from ik_solver import RobotArm, IK_CACHE_SIZE\n"
+                        "robot_arm = RobotArm('urdf_tes2.urdf', np.zeros(9), ik_cache_size=IK_CACHE_SIZE, ik_cache_file='test_exit_cache.json')\n"
+                        "target = robot_arm.calculate_fk_batch(np.full((1, 9), 0.1))[0]\n"
+                        "list(robot_arm.calculate_ik([target[:3, 3]], [target[:3, :3]], ['all'], solver='analytic'))"], check=True)
+        assert RobotArm("urdf_tes2.urdf", np.zeros(9), ik_cache_size=IK_CACHE_SIZE, ik_cache_file="test_exit_cache.json").ik_cache_info()["size"] == 1
+
+    except AssertionError as e:
+        print(f"RobotArm IK cache Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RobotArm IK cache Test Unexpected Error: {e}")
+    finally:
+        for file_path in ["test_ik_cache.json", "test_changed.urdf", "test_exit_cache.json"]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
 def test_motorManager():
     try:
         # Create some motors for testing
@@ -201,3 +772,418 @@ def test_Motors():
         print(f"StepperMotor Class Test Assertion Error: {e}")
     except Exception as e:
         print(f"StepperMotor Class Test Unexpected Error: {e}")
+
+def test_compile_moves():
+    try:
+        controller = MoshionController()
+        controller.manager = motorManager({
+            f"motor{index}": StepperMotor(f"Motor {index}", index, 2, 9.5493, 40.0, steps)
+            for index, steps in enumerate((680400, 793800, 680400, 597196.8, 597196.8, 597196.8))
+        })
+
+        # Test motors are synchronized and packed in firmware order, motor 5 first
+        moves = controller.compile_moves([(0, 0, 0, 0, 0, 0), (45, 45, 0, 0, 0, 0)])
+        assert moves.tolist() == [[0, 0, 0, 0, 26460, 22680, 3750000]]
+
+        # Test a motor too slow to step is held and made up once at full speed after the last segment
+        moves = controller.compile_moves([(0, 0, 0, 0, 0, 0), (90, 0, 0.01, 0, 0, 0), (135, 0, 0.01, 0, 0, 0)])
+        assert moves.tolist() == [[0, 0, 0, 0, 0, 22680, 7500000],
+                                  [0, 0, 0, 0, 0, 22680, 3750000],
+                                  [0, 0, 0, 22680, 0, 0, 833]]
+
+        # Test formatting is a separate step and move_motors still returns text points
+        assert format_moves(moves)[0] == "0, 0, 0, 0, 0, 22680, 7500000\n"
+        assert controller.move_motors([(0, 0, 0, 0, 0, 0), (45, 45, 0, 0, 0, 0)]) == ["0, 0, 0, 0, 26460, 22680, 3750000\n"]
+        assert controller.compile_moves([(0, 0, 0, 0, 0, 0)]).shape == (0, 7)
+
+        # Test step-accurate moves follow dense points to within a step and append no tail moves
+        angles = 30 * np.sin(np.linspace(0, 2 * np.pi, 2001)[:, None] * np.array([1, 0.5, 0.25, 2, 1, 0.1]))
+        moves = controller.compile_moves(angles, step_accurate=True)
+        assert moves.shape == (2000, 7)
+        frequencies = np.abs(moves[:, :-1])
+        assert np.all((frequencies == 0) | ((frequencies > 100) & (frequencies <= 26460)))
+        steps = np.cumsum(moves[:, -2::-1] * moves[:, -1:] / 1e6, axis=0)
+        targets = (angles[1:] - angles[0]) * np.array([680400, 793800, 680400, 597196.8, 597196.8, 597196.8]) / 360
+        assert np.abs(steps - targets).max() < 1
+
+    except AssertionError as e:
+        print(f"Compile Moves Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Compile Moves Test Unexpected Error: {e}")
+
+def test_decimate_angles():
+    try:
+        # Test collinear points collapse to the ends and a corner is kept
+        line = np.linspace((0, 0, 0, 0, 0, 0), (10, 20, 30, 40, 50, 60), 50)
+        assert decimate_angles(line, 0.01).tolist() == [0, 49]
+        corner = np.vstack((line, np.linspace((10, 20, 30, 40, 50, 60), (0, 20, 30, 40, 50, 60), 50)[1:]))
+        assert decimate_angles(corner, 0.01).tolist() == [0, 49, 98]
+
+        # Test every dropped point stays within the tolerance of the chord that replaced it
+        angles = 30 * np.sin(np.linspace(0, 2 * np.pi, 2001)[:, None] * np.array([1, 0.5, 0.25, 2, 1, 0.1]))
+        kept = decimate_angles(angles, 0.05)
+        assert kept[0] == 0 and kept[-1] == 2000 and len(kept) < 200
+        for start, end in zip(kept[:-1], kept[1:]):
+            chord = angles[end] - angles[start]
+            offsets = angles[start:end + 1] - angles[start]
+            along = np.clip(offsets @ chord / (chord @ chord), 0, 1)
+            assert np.abs(offsets - along[:, None] * chord).max() <= 0.05
+
+        # Test the controller reports the compression
+        controller = MoshionController()
+        assert len(controller.decimate(line)) == 2
+        assert controller.decimation_stats == {"points": 50, "kept": 2, "ratio": 25.0}
+
+    except AssertionError as e:
+        print(f"Decimate Angles Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Decimate Angles Test Unexpected Error: {e}")
+
+def test_rectangle_index():
+    try:
+        rng = np.random.default_rng(0)
+        placer = Packing.BoxPlacer((1.4, 1.1), shelf_height=0.015, margin=0.015, offset=0.01)
+        for x, y, width, height in rng.uniform((0, 0, 0.005, 0.005), (1.4, 1.1, 0.3, 0.3), (200, 4)):
+            placer.add_no_go_rectangle(x, y, width, height)
+
+        # Test the index agrees with is_overlap, including boxes inside a rectangle and zero width probes
+        for x, y, width, height in rng.uniform((-0.1, -0.1, 0, 0), (1.5, 1.2, 0.3, 0.3), (500, 4)):
+            expected = [index for index, rect in enumerate(placer.no_go_rectangles) if placer.is_overlap(x, y, width, height, rect)]
+            assert placer.no_go_index.overlapping(x, y, width, height).tolist() == expected
+        assert placer.no_go_index.overlapping(0.5, 0.5, 0, 0.1).tolist() == \
+            [index for index, rect in enumerate(placer.no_go_rectangles) if placer.is_overlap(0.5, 0.5, 0, 0.1, rect)]
+        assert len(placer.no_go_index) == 200
+        np.testing.assert_allclose(placer.no_go_index.rectangle(3), placer.get_no_go_rectangles()[3])
+
+        # Test placed boxes stay clear of a "NO_GO" zone
+        placer = Packing.BoxPlacer((1.4, 1.1), shelf_height=0.015, margin=0.015, offset=0.01)
+        placer.add_no_go_rectangle(0.3, 0, 0.2, 1.1)
+        placer.boxes.extend(Packing.generate__boxes(8, [0.2] * 8, [0.1] * 8, [f"Box:{index}" for index in range(8)]))
+        assert placer.place_boxes() == []
+        for box in placer.boxes:
+            assert not placer.is_overlap(box.position[0], box.position[1], box.width, box.height, placer.no_go_rectangles[0])
+
+    except AssertionError as e:
+        print(f"RectangleIndex Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"RectangleIndex Test Unexpected Error: {e}")
+
+def test_point_frames():
+    try:
+        # Test the CRC against the CRC-16/CCITT check value
+        assert crc16_ccitt(b"123456789") == 0x29B1
+
+        # Test a text point round trips through a frame
+        frame = pack_point_frame("-29859, 0, 0, 0, 0, 0, 277777\n")
+        assert len(frame) == len(FRAME_SYNC) + FRAME_LENGTH.size + POINT_STRUCT.size + FRAME_CRC.size
+        assert unpack_point_frame(frame) == (-29859, 0, 0, 0, 0, 0, 277777)
+        assert pack_point_frame([-29859, 0, 0, 0, 0, 0, 277777]) == frame
+
+        # Test a corrupted frame is rejected
+        corrupted = bytearray(frame)
+        corrupted[6] ^= 0x01
+        try:
+            unpack_point_frame(bytes(corrupted))
+            assert False, "corrupted frame was accepted"
+        except ValueError:
+            pass
+
+    except AssertionError as e:
+        print(f"Point Frame Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Point Frame Test Unexpected Error: {e}")
+
+class AckingPort:
+    """Stands in for the serial port of firmware that answers BIN2 frames like storeSequencedPoints.
+
+    The first copy of frame 5 is corrupted on the way in to exercise the NAK path.
+    """
+    is_open = True
+
+    def __init__(self):
+        self.output = bytearray()
+        self.lock = threading.Lock()
+        self.stored = []
+        self.naked = -1
+        self.corrupted = False
+
+    @property
+    def in_waiting(self):
+        with self.lock:
+            return len(self.output)
+
+    def read(self, size=1):
+        with self.lock:
+            data = bytes(self.output[:size])
+            del self.output[:size]
+        if not data:
+            time.sleep(0.01)
+        return data
+
+    def close(self):
+        self.is_open = False
+
+    def reply(self, line):
+        with self.lock:
+            self.output += f"{line}\n".encode()
+
+    def write(self, data):
+        frame_size = len(pack_point_frame([0] * 7, 0))
+        for offset in range(0, len(data), frame_size):
+            frame = data[offset:offset + frame_size]
+            try:
+                if not self.corrupted and unpack_point_frame(frame, True)[0] == 5:
+                    self.corrupted = True
+                    frame = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+                sequence, *point = unpack_point_frame(frame, True)
+            except ValueError:
+                sequence = None
+            if sequence == len(self.stored):
+                self.stored.append(tuple(point))
+                self.reply(f"ack {sequence}")
+            elif sequence is not None and sequence < len(self.stored):
+                self.reply(f"ack {len(self.stored) - 1}")
+            elif self.naked != len(self.stored):
+                self.naked = len(self.stored)
+                self.reply(f"nak {self.naked}")
+
+def test_windowed_upload():
+    try:
+        points = [f"{i}, 0, 0, 0, 0, {-i}, {1000 + i}\n" for i in range(40)]
+        MSG = Mesageer("loopback")
+        MSG.serial = AckingPort()
+        MSG.protocol = "BIN2"
+        MSG.read_thread = threading.Thread(target=MSG._read_and_put_data, daemon=True)
+        MSG.read_thread.start()
+        MSG.serial.reply("unrelated")
+
+        # Test every point arrives once and in order despite the corrupted frame
+        stats = MSG.send_moshion(points)
+        assert MSG.serial.stored == [(i, 0, 0, 0, 0, -i, 1000 + i) for i in range(40)]
+        assert stats["points"] == 40 and stats["retransmits"] > 0
+        assert stats["bytes"] > 40 * len(pack_point_frame(points[0], 0))
+
+        # Test unrelated messages are left on the bus
+        assert MSG.message_stack.get(timeout=1) == "unrelated"
+
+    except AssertionError as e:
+        print(f"Windowed Upload Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Windowed Upload Test Unexpected Error: {e}")
+    finally:
+        MSG._stop_reading.set()
+
+def test_async_messager():
+    async def exercise():
+        MSG = AsyncMesageer("loopback")
+        MSG.serial = AckingPort()
+        MSG.protocol = "BIN2"
+        MSG.reader_task = asyncio.create_task(MSG._read_lines())
+        try:
+            # Test the windowed upload through the asyncio reader
+            points = [f"{i}, 1, 2, 3, 4, 5, 600\n" for i in range(20)]
+            stats = await MSG.send_moshion(points)
+            assert MSG.serial.stored == [(i, 1, 2, 3, 4, 5, 600) for i in range(20)]
+            assert stats["points"] == 20 and stats["retransmits"] > 0
+
+            # Test a reply is awaited without blocking other tasks, and a missing one times out
+            asyncio.get_running_loop().call_later(0.05, MSG.serial.reply, "MoshionState changed to: 0")
+            assert await MSG.wait_for("MoshionState changed to: 0", timeout=2) == "MoshionState changed to: 0"
+            try:
+                await MSG.wait_for("never", timeout=0.05)
+                assert False, "wait_for did not time out"
+            except RobotConnectionTimeout:
+                pass
+        finally:
+            await MSG.close_connection()
+
+    try:
+        asyncio.run(exercise())
+
+    except AssertionError as e:
+        print(f"Async Messager Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Async Messager Test Unexpected Error: {e}")
+
+class ManualRoot:
+    """Stands in for a Tk window, after callbacks only run when update is called."""
+
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    def after(self, ms, function):
+        self.next_id += 1
+        self.pending[self.next_id] = function
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def update(self):
+        pending, self.pending = self.pending, {}
+        for function in pending.values():
+            function()
+
+def test_tk_async_bridge():
+    try:
+        root = ManualRoot()
+        bridge = TkAsyncBridge(root)
+        tk_thread = threading.get_ident()
+
+        async def hops():
+            loop = asyncio.get_running_loop()
+            for _ in range(200):
+                await loop.run_in_executor(None, int)
+            return threading.get_ident()
+
+        # Test executor hops run without waiting for Tk, and the callback waits for the Tk thread
+        finished = []
+        future = bridge.submit(hops(), lambda done: finished.append(threading.get_ident()))
+        assert future.result(timeout=2) != tk_thread
+        assert finished == []
+        root.update()
+        assert finished == [tk_thread]
+
+        # Test closing cancels what is still running
+        future = bridge.submit(asyncio.sleep(60))
+        bridge.close()
+        assert future.cancelled() and bridge.loop.is_closed() and not root.pending
+
+    except AssertionError as e:
+        print(f"Tk Async Bridge Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Tk Async Bridge Test Unexpected Error: {e}")
+
+def test_line_framing():
+    try:
+        MSG = Mesageer("loopback")
+
+        # Test lines split across reads and several lines in one read
+        MSG._put_lines(b"storing 3\nMoshionSta")
+        MSG._put_lines(b"te changed to: 2\n\nack 1\nac")
+        assert MSG.get_latest_message() == "storing 3"
+        assert MSG.get_latest_message() == "MoshionState changed to: 2"
+        assert MSG._upload_replies.get_nowait() == "ack 1"
+        assert MSG.get_latest_message() is None
+        assert bytes(MSG._read_buffer) == b"ac"
+
+        # Test the link counters
+        assert MSG.bytes_received == 46
+        assert MSG.lines_received == 3
+        bytes_per_second, lines_per_second = MSG.link_rates()
+        assert bytes_per_second > 0 and lines_per_second > 0
+        assert MSG.link_rates() == (0, 0)
+
+    except AssertionError as e:
+        print(f"Line Framing Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Line Framing Test Unexpected Error: {e}")
+
+def test_message_bus():
+    try:
+        bus = MessageBus(backlog_size=3)
+
+        # Test unclaimed lines come back oldest first and the backlog is bounded
+        for line in ("a", "b", "c", "d"):
+            bus.put(line)
+        assert [bus.get_nowait() for _ in range(3)] == ["b", "c", "d"]
+        assert bus.empty()
+
+        # Test several waiters share one line and claim it from the backlog
+        first = bus.expect("MoshionState changed to: 0")
+        second = bus.expect(prefix="MoshionState")
+        bus.put("MoshionState changed to: 3")
+        assert second.result(0) == "MoshionState changed to: 3" and not first.done()
+        bus.put("MoshionState changed to: 0")
+        assert first.result(0) == "MoshionState changed to: 0"
+        assert bus.empty()
+
+        # Test wait_for is woken by another thread and times out cleanly
+        threading.Timer(0.05, bus.put, ("storing 4",)).start()
+        assert bus.wait_for("storing 4", timeout=2) == "storing 4"
+        try:
+            bus.wait_for("never", timeout=0.01)
+            assert False, "wait_for did not time out"
+        except RobotConnectionTimeout:
+            pass
+
+        # Test subscribers see every matching line until unsubscribed
+        received = []
+        handle = bus.subscribe(("ack ", "nak "), received.append)
+        bus.put("ack 0")
+        bus.put("nak 1")
+        bus.unsubscribe(handle)
+        bus.put("ack 2")
+        assert received == ["ack 0", "nak 1"]
+        assert bus.get_nowait() == "ack 2"
+
+    except AssertionError as e:
+        print(f"Message Bus Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Message Bus Test Unexpected Error: {e}")
+
+def test_virtual_teensy():
+    try:
+        points = [f"{i * 100}, 0, {-i * 100}, 0, 0, 0, 500\n" for i in range(1, 30)]
+        expected = [(i * 100, 0, -i * 100, 0, 0, 0, 500) for i in range(1, 30)]
+        stream = [f"{i}, 0, 0, 0, 0, 0, 500\n" for i in range(64)]
+
+        # Test a full move in every protocol the firmware offers
+        for protocols, protocol in (((), "TEXT"), (("BIN1",), "BIN1"), (("BIN2", "BIN1"), "BIN2")):
+            device = VirtualTeensy(execute_time_scale=0, protocols=protocols, timeout=0.1)
+            MSG = Mesageer(device)
+            MSG.connect()
+            assert MSG.protocol == protocol
+            MSG.run_moshion(points, timeout=5)
+            assert device.executed == [expected]
+            MSG.close_connection()
+
+        # Test the firmware's state checks and the link model
+        device = VirtualTeensy(baud_rate=115200, execute_time_scale=0, timeout=0.1)
+        MSG = Mesageer(device)
+        MSG.connect(binary=False)
+        assert MSG.request("R_EXECUTE 1", prefix="Motion", timeout=5) == "Motion needs to be prepared"
+        start_time = time.perf_counter()
+        MSG.run_moshion(points, timeout=5)
+        assert time.perf_counter() - start_time > sum(len(point) for point in points) * 10 / 115200
+        MSG.close_connection()
+
+        # Test text points pipelined faster than the firmware parses them are dropped like readPointLine does
+        device = VirtualTeensy(line_latency=0.01, execute_time_scale=0, timeout=0.1)
+        MSG = Mesageer(device)
+        MSG.connect(binary=False)
+        try:
+            MSG.run_moshion(points, timeout=0.5)
+            assert False, "pipelined text points were not dropped"
+        except RobotConnectionTimeout:
+            assert device.points[0] == expected[0] and device.points[1] is None
+        MSG.close_connection()
+
+        # Test frames resent after a timeout that overlaps the last point are not read as commands
+        device = VirtualTeensy(frame_latency=0.02, execute_time_scale=0, timeout=0.1)
+        MSG = Mesageer(device)
+        MSG.ACK_TIMEOUT = 0.015
+        MSG.WINDOW_SIZE = 4
+        MSG.connect()
+        errors = []
+        MSG.message_stack.subscribe("Error", errors.append)
+        stats = MSG.run_moshion(stream[:8], timeout=2)
+        assert stats["retransmits"] > 0 and errors == []
+        assert device.executed == [[(i, 0, 0, 0, 0, 0, 500) for i in range(8)]]
+        MSG.close_connection()
+
+        # Test frames are parsed as they stream in, so a window slower than ACK_TIMEOUT is not resent
+        device = VirtualTeensy(baud_rate=19200, execute_time_scale=0, timeout=0.1)
+        MSG = Mesageer(device)
+        MSG.connect()
+        assert MSG.WINDOW_SIZE * len(pack_point_frame(stream[0], 0)) * 10 / 19200 > MSG.ACK_TIMEOUT
+        stats = MSG.run_moshion(stream, timeout=5)
+        assert stats["retransmits"] == 0 and stats["bytes_per_second"] > 0.9 * 19200 / 10
+        assert device.executed == [[(i, 0, 0, 0, 0, 0, 500) for i in range(64)]]
+        MSG.close_connection()
+
+    except AssertionError as e:
+        print(f"Virtual Teensy Test Assertion Error: {e}")
+    except Exception as e:
+        print(f"Virtual Teensy Test Unexpected Error: {e}")